@@ -0,0 +1,34 @@
+import hmac
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.profiling import list_profiles, top_functions
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_profiling_token(request: Request) -> None:
+    # Profiles expose internals, so they take the same privileged header that requests a profile
+    value = request.headers.get(settings.PROFILING_HEADER)
+    if not settings.PROFILING_TOKEN or value is None or not hmac.compare_digest(value, settings.PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiling_token)])
+async def get_profiles():
+    """Lists the saved request profiles, newest first."""
+    return await run_in_threadpool(list_profiles, settings.PROFILING_DIR)
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling_token)])
+async def get_profile_summary(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "ncalls"] = Query("cumulative", description="Rank functions by this column"),
+    limit: int = Query(30, ge=1, le=500, description="Number of functions to return")
+):
+    """Summarizes one profile as its most expensive functions; download the .prof file from PROFILING_DIR for the full call graph."""
+    summary = await run_in_threadpool(top_functions, settings.PROFILING_DIR, profile_id, sort, limit)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return summary
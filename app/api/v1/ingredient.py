@@ -1,19 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status # Added status
-from app.models.ingredient import Ingredient, IngredientCreate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status # Added status
+from fastapi.responses import StreamingResponse
+from app.models.ingredient import Ingredient, IngredientCreate, IngredientImportReport, IngredientList, IngredientSuggestion, PaginatedIngredients
 from app.services.ingredient import ( # Import service functions
     create_ingredient,
+    get_catalog_version,
     get_ingredients,
+    stream_ingredients,
     search_ingredients
 )
+from app.services.autocomplete import autocomplete_index
+from app.services.ingredient_cache import ingredient_cache
+from app.services.ingredient_import import import_ingredients
+from app.core.config import settings
+from app.core.http_cache import CacheValidators, make_etag
+from app.core.responses import ModelJSONResponse
 from app.dependencies.auth import get_current_user
 from app.dependencies.database import get_db
 from app.exceptions.ingredient import ( # Import specific exceptions
     IngredientCreationError,
     IngredientAlreadyExistsError,
+    IngredientImportError,
     IngredientSearchError,
     IngredientRetrievalError # Added for get/search potentially
 )
-from typing import List
+from app.exceptions.pagination import InvalidCursorError
+from typing import List, Literal, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase # Import db type hint
 
 router = APIRouter(prefix="/ingredients", tags=["ingredients"])
@@ -45,17 +56,63 @@ async def create_new_ingredient(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
 
 
-@router.get("/", response_model=List[Ingredient])
+@router.post("/bulk", response_model=IngredientImportReport)
+async def bulk_import_ingredients(
+    request: Request,
+    format: Literal["csv", "json"] = Query(..., description="Body format: CSV with one food per row, or a JSON array of FDC foods"),
+    on_conflict: Literal["skip", "replace"] = Query("skip", description="Report ('skip') or overwrite ('replace') ingredients whose name exists"),
+    chunk_size: int = Query(settings.INGREDIENT_IMPORT_CHUNK_SIZE, ge=1, le=settings.INGREDIENT_IMPORT_MAX_CHUNK_SIZE, description="Records per validation and write batch"),
+    user_id: str = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Imports ingredients from the raw request body, streamed rather than buffered.
+
+    Rows that fail are listed in the report and do not stop the import.
+    """
+    try:
+        return await import_ingredients(db, request.stream(), format, on_conflict=on_conflict, chunk_size=chunk_size)
+    except IngredientImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/", response_model=PaginatedIngredients)
 async def list_ingredients(
+    request: Request,
+    limit: int = Query(settings.INGREDIENT_PAGE_DEFAULT_LIMIT, ge=1, le=settings.INGREDIENT_PAGE_MAX_LIMIT, description="Number of ingredients per page"),
+    after: Optional[str] = Query(None, description="Opaque cursor taken from the previous page's next_cursor"),
+    order_by: Literal["_id", "name"] = Query("_id", description="Sort key for the catalog"),
+    stream: bool = Query(False, description="Stream the catalog as NDJSON instead of returning a single page (limit is ignored)"),
     user_id: str = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
-    Retrieves a list of all ingredients.
+    Retrieves the ingredient catalog, one keyset-paginated page at a time or as an NDJSON stream.
+
+    Responses carry an ETag derived from the catalog version; a matching If-None-Match is
+    answered with 304 without reading the page.
     """
     try:
+        # Read the version before the page: a write in between yields an older tag, never a stale body
+        version, updated_at = await get_catalog_version(db)
+        validators = CacheValidators(make_etag("ingredients", version, limit, after, order_by, stream), updated_at)
+        if validators.matches(request):
+            return validators.not_modified()
+        if stream:
+            return StreamingResponse(
+                stream_ingredients(db, after=after, order_by=order_by),
+                media_type="application/x-ndjson",
+                headers=validators.headers()
+            )
         # Call the service layer function
-        return await get_ingredients(db)
+        ingredients, next_cursor = await get_ingredients(db, limit=limit, after=after, order_by=order_by)
+        # Already validated by the service; serialize without a second response_model pass
+        return ModelJSONResponse(
+            PaginatedIngredients(ingredients=ingredients, next_cursor=next_cursor, limit=limit),
+            headers=validators.headers()
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except IngredientRetrievalError as e: # Use a more specific exception if defined
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     except Exception as e:
@@ -64,20 +121,66 @@ async def list_ingredients(
 
 @router.get("/search", response_model=List[Ingredient])
 async def search_ingredients_endpoint(
+    request: Request,
     query: str,
+    limit: int = Query(settings.INGREDIENT_SEARCH_DEFAULT_LIMIT, ge=1, le=settings.INGREDIENT_SEARCH_MAX_LIMIT, description="Maximum number of results"),
     user_id: str = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
-    Searches for ingredients by name (case-insensitive).
+    Searches for ingredients by name (case- and accent-insensitive), best matches first.
+
+    Revalidates like the catalog listing: the ETag follows the catalog version.
     """
     if not query:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query cannot be empty")
     try:
+        version, updated_at = await get_catalog_version(db)
+        validators = CacheValidators(make_etag("ingredients/search", version, query, limit), updated_at)
+        if validators.matches(request):
+            return validators.not_modified()
         # Call the service layer function
-        return await search_ingredients(db, query=query) # Pass query explicitly
+        ingredients = await search_ingredients(db, query=query, limit=limit) # Pass query explicitly
+        return ModelJSONResponse(ingredients, adapter=IngredientList, headers=validators.headers())
+    except IngredientRetrievalError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     except IngredientSearchError as e:
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     except Exception as e:
         # Catch unexpected errors
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred: {e}")
+
+@router.get("/autocomplete", response_model=List[IngredientSuggestion])
+async def autocomplete_ingredients(
+    query: str,
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    user_id: str = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Typo-tolerant name suggestions served from the in-memory trigram index.
+    Falls back to the database search while the index is disabled or still building.
+    """
+    if not query.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query cannot be empty")
+    if autocomplete_index.ready:
+        return autocomplete_index.search(query, limit=limit)
+    try:
+        ingredients = await search_ingredients(db, query=query, limit=limit)
+        return [IngredientSuggestion(_id=ing.id, name=ing.name) for ing in ingredients]
+    except IngredientSearchError as e:
+         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.get("/autocomplete/stats")
+async def autocomplete_stats(user_id: str = Depends(get_current_user)):
+    """
+    Size, memory footprint and build time of the in-memory autocomplete index.
+    """
+    return {"enabled": settings.AUTOCOMPLETE_INDEX_ENABLED, **autocomplete_index.stats()}
+
+@router.get("/cache/stats")
+async def ingredient_cache_stats(user_id: str = Depends(get_current_user)):
+    """
+    Size and hit ratios of the ingredient cache tiers, and how many lookups fell through to Mongo.
+    """
+    return ingredient_cache.stats()
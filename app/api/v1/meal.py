@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from app.models.meal import Meal, MealListItem, PaginatedMeals
-from app.services.meal import create_meal_entry, get_last_meal_entry_by_user, get_paginated_meals_by_user, get_detailed_meal
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from app.core.config import settings
+from app.core.http_cache import CacheValidators, make_etag
+from app.core.responses import ModelJSONResponse
+from app.models.meal import Meal, MealBatchResult, MealListItem, PaginatedMeals
+from app.services.meal import create_meal_entry, create_meal_entries, get_last_meal_entry_by_user, get_paginated_meals_by_user, get_meals_after_by_user, encode_meal_cursor, get_detailed_meal, get_meal_version
+from app.services.nutrition import get_meal_nutrients, get_meals_nutrients
+from app.services.rollup import get_nutrient_summary
 from app.dependencies.auth import get_current_user
 from app.dependencies.database import get_db
 from app.exceptions.meal import MealNotFoundError, MealCreationError, MealValidationError
+from app.exceptions.pagination import InvalidCursorError
 from bson import ObjectId
 
 router = APIRouter(prefix="/meals", tags=["meals"])
@@ -19,6 +27,27 @@ async def create_meal(meal: Meal, user_id: str = Depends(get_current_user), db=D
         raise HTTPException(status_code=422, detail=str(e))
 
 
+@router.post("/batch", response_model=MealBatchResult)
+async def create_meals_batch(
+    meals: List[Meal] = Body(..., min_length=1, max_length=settings.MEAL_BATCH_MAX_SIZE),
+    user_id: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Creates several meals at once (e.g. when a client syncs after being offline).
+
+    Each meal succeeds or fails on its own; the response lists one result per meal in request order.
+    """
+    try:
+        results = await create_meal_entries(db, meals, user_id)
+    except MealCreationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except MealValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    created = sum(result["status"] == "created" for result in results)
+    return ModelJSONResponse(MealBatchResult(created=created, failed=len(results) - created, results=results))
+
+
 @router.get("/last", response_model=MealListItem)
 async def get_last_meal_by_user(user_id: str = Depends(get_current_user), db=Depends(get_db)):
     try:
@@ -35,27 +64,108 @@ async def get_last_meal_by_user(user_id: str = Depends(get_current_user), db=Dep
 async def get_meals(
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     page_size: int = Query(10, ge=1, le=100, description="Number of meals per page, default 10, max 100"),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor; takes precedence over page"),
+    with_total: bool = Query(True, description="Include the user's total meal count (page mode only)"),
+    exact_total: bool = Query(False, description="Count meals exactly instead of reading the per-user counter"),
     user_id: str = Depends(get_current_user),
     db=Depends(get_db)
 ):
     try:
-        meals, total = await get_paginated_meals_by_user(db, user_id, page, page_size)
-        return PaginatedMeals(meals=meals, total=total, page=page, page_size=page_size)
+        if after is not None:
+            meals, next_cursor = await get_meals_after_by_user(db, user_id, page_size, after)
+            return ModelJSONResponse(PaginatedMeals(meals=meals, page_size=page_size, next_cursor=next_cursor))
+        total_mode = ("exact" if exact_total else "counter") if with_total else "none"
+        meals, total = await get_paginated_meals_by_user(db, user_id, page, page_size, total=total_mode)
+        has_more = len(meals) == page_size if total is None else page * page_size < total
+        next_cursor = encode_meal_cursor(meals[-1]) if meals and has_more else None
+        return ModelJSONResponse(PaginatedMeals(meals=meals, total=total, page=page, page_size=page_size, next_cursor=next_cursor))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except MealCreationError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except MealValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
 
+@router.get("/summary", response_model=dict)
+async def get_meal_summary(
+    start: date = Query(..., alias="from", description="First day (YYYY-MM-DD, UTC), inclusive"),
+    end: date = Query(..., alias="to", description="Last day (YYYY-MM-DD, UTC), inclusive"),
+    period: Literal["day", "week"] = Query("day", description="Group totals per day or per ISO week"),
+    user_id: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    if end < start:
+        raise HTTPException(status_code=422, detail="'to' must not be before 'from'")
+    if (end - start).days >= settings.SUMMARY_MAX_DAYS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.SUMMARY_MAX_DAYS} days per summary")
+    try:
+        return await get_nutrient_summary(db, user_id, start, end, period)
+    except MealCreationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _meal_validators(db, view: str, meal_id: ObjectId, user_id: str) -> CacheValidators:
+    version, last_modified = await get_meal_version(db, meal_id, user_id)
+    return CacheValidators(make_etag(view, version), last_modified)
+
+
 @router.get("/{meal_id}/detailed", response_model=dict)
 async def get_detailed_meal_entry(
     meal_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user),
     db=Depends(get_db)
 ):
+    if not ObjectId.is_valid(meal_id):
+        raise HTTPException(status_code=404, detail=f"Meal {meal_id} not found")
     try:
+        validators = await _meal_validators(db, "meal/detailed", ObjectId(meal_id), user_id)
+        if validators.matches(request):
+            return validators.not_modified()
+        response.headers.update(validators.headers())
         return await get_detailed_meal(db, ObjectId(meal_id), user_id)
     except MealNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except MealCreationError as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/nutrients", response_model=dict)
+async def get_meals_nutrient_totals(
+    meal_id: List[str] = Query(..., description="Meal IDs to total; repeat the parameter for each meal"),
+    user_id: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    if len(meal_id) > settings.NUTRIENT_BATCH_MAX_MEALS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.NUTRIENT_BATCH_MAX_MEALS} meals per request")
+    invalid = [value for value in meal_id if not ObjectId.is_valid(value)]
+    if invalid:
+        raise HTTPException(status_code=422, detail=f"Invalid meal IDs: {invalid}")
+    try:
+        return await get_meals_nutrients(db, [ObjectId(value) for value in meal_id], user_id)
+    except MealCreationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{meal_id}/nutrients", response_model=dict)
+async def get_meal_nutrient_totals(
+    meal_id: str,
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    if not ObjectId.is_valid(meal_id):
+        raise HTTPException(status_code=404, detail=f"Meal {meal_id} not found")
+    try:
+        validators = await _meal_validators(db, "meal/nutrients", ObjectId(meal_id), user_id)
+        if validators.matches(request):
+            return validators.not_modified()
+        response.headers.update(validators.headers())
+        return await get_meal_nutrients(db, ObjectId(meal_id), user_id)
+    except MealNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except MealCreationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -2,17 +2,30 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.models.user import UserCreate, UserLogin, UserOut
 from app.services.user import register_user, login_user
 from app.dependencies.database import get_db
+from app.dependencies.auth import get_current_user
+from app.core.security import token_cache
 # from  fastapi_limiter.depends import RateLimiter
 from app.core.logger import logger
+from app.exceptions.user import PasswordHashingBusyError
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("/register", response_model=UserOut) # ADD RATE LIMITING WHEN REDIS IS UP: dependencies=[Depends(RateLimiter(times=10, seconds=60))]
 async def register(user: UserCreate, db = Depends(get_db)):
-    logger.info(f"Registering user: {user.username}")
-    return await register_user(db, user)
+    logger.info("Registering user: {}", user.username)
+    try:
+        return await register_user(db, user)
+    except PasswordHashingBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
 @router.post("/login")
 async def login(user: UserLogin, db = Depends(get_db)):
-    token = await login_user(db, user.username, user.password)
-    return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    try:
+        token = await login_user(db, user.username, user.password)
+    except PasswordHashingBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return {"access_token": token, "token_type": "bearer"}
+
+@router.get("/token-cache/stats")
+async def get_token_cache_stats(user_id: str = Depends(get_current_user)):
+    return token_cache.stats()
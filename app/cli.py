@@ -0,0 +1,116 @@
+"""
+Maintenance commands, run against the configured database (MONGO_URI / DB_NAME).
+
+    python -m app.cli rebuild-rollups [--user USER_ID]
+    python -m app.cli rebuild-meal-counts [--user USER_ID]
+    python -m app.cli verify-indexes
+    python -m app.cli migrate-nutrients --to packed|map
+    python -m app.cli import-ingredients FILE [--format csv|json] [--on-conflict skip|replace]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from pymongo.errors import PyMongoError
+
+from app.dependencies.database import close_mongo_connection, get_database
+from app.repositories.indexes import INDEXES, ensure_indexes, find_collection_scans
+from app.repositories.ingredient import migrate_nutrient_storage
+from app.services.ingredient_import import import_ingredients
+from app.services.meal import rebuild_meal_counts
+from app.services.rollup import rebuild_daily_rollups
+
+
+async def _rebuild_rollups(args: argparse.Namespace) -> None:
+    written = await rebuild_daily_rollups(get_database(), user_id=args.user, batch_size=args.batch_size)
+    print(f"Rebuilt {written} daily rollups")
+
+
+async def _rebuild_meal_counts(args: argparse.Namespace) -> None:
+    written = await rebuild_meal_counts(get_database(), user_id=args.user)
+    print(f"Rebuilt {written} meal counters")
+
+
+async def _verify_indexes(args: argparse.Namespace) -> None:
+    db = get_database()
+    # Unlike maintain_indexes in "log" mode, indexes or plans that could not be checked fail the command
+    failed = sorted(set(INDEXES) - set(await ensure_indexes(db)))
+    if failed:
+        print(f"Could not create indexes on: {', '.join(failed)}")
+        sys.exit(2)
+    try:
+        scans = await find_collection_scans(db)
+    except PyMongoError as e:
+        print(f"Could not verify query plans: {e}")
+        sys.exit(2)
+    if scans:
+        print(f"COLLSCAN: {', '.join(scans)}")
+        sys.exit(1)
+    print("All hot queries use an index")
+
+
+async def _migrate_nutrients(args: argparse.Namespace) -> None:
+    written = await migrate_nutrient_storage(get_database(), args.to, batch_size=args.batch_size)
+    print(f"Rewrote nutrients of {written} ingredients to {args.to} storage")
+
+
+async def _read_chunks(path: Path, chunk_size: int = 1 << 20):
+    with path.open("rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+async def _import_ingredients(args: argparse.Namespace) -> None:
+    path = Path(args.file)
+    file_format = args.format or ("csv" if path.suffix.lower() == ".csv" else "json")
+    report = await import_ingredients(
+        get_database(), _read_chunks(path), file_format, on_conflict=args.on_conflict, chunk_size=args.chunk_size
+    )
+    print(
+        f"{report['rows']} rows: {report['inserted']} inserted, {report['updated']} replaced, {report['failed']} failed "
+        f"in {report['elapsed_seconds']:.1f}s ({report['rows_per_second']:.0f} rows/s)"
+    )
+    for error in report["errors"]:
+        print(f"  row {error['row']} ({error['name'] or '-'}): {error['error']}")
+    if report["errors_truncated"]:
+        print(f"  ... {report['failed'] - len(report['errors'])} more")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="Recompute daily nutrient rollups from meal history")
+    rebuild.add_argument("--user", help="Only rebuild this user's rollups")
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+    rebuild.set_defaults(handler=_rebuild_rollups)
+
+    counts = commands.add_parser("rebuild-meal-counts", help="Recompute per-user meal counters used for listing totals")
+    counts.add_argument("--user", help="Only rebuild this user's counter")
+    counts.set_defaults(handler=_rebuild_meal_counts)
+
+    verify = commands.add_parser("verify-indexes", help="Create registered indexes; exit 1 if a hot query needs a COLLSCAN, 2 if indexes or plans could not be checked")
+    verify.set_defaults(handler=_verify_indexes)
+
+    migrate = commands.add_parser("migrate-nutrients", help="Rewrite stored ingredient nutrients into another storage format")
+    migrate.add_argument("--to", choices=("packed", "map"), required=True)
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.set_defaults(handler=_migrate_nutrients)
+
+    importer = commands.add_parser("import-ingredients", help="Bulk import ingredients from a CSV or FDC JSON file")
+    importer.add_argument("file")
+    importer.add_argument("--format", choices=("csv", "json"), help="Defaults to csv for .csv files, json otherwise")
+    importer.add_argument("--on-conflict", choices=("skip", "replace"), default="skip")
+    importer.add_argument("--chunk-size", type=int, default=None, help="Records per write (INGREDIENT_IMPORT_CHUNK_SIZE)")
+    importer.set_defaults(handler=_import_ingredients)
+
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(args.handler(args))
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    main()
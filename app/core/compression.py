@@ -0,0 +1,109 @@
+from typing import Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Optional: responses fall back to gzip
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding: str, codings: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Picks "br" (when brotli is installed) or "gzip" from an Accept-Encoding header.
+
+    Codings listed with q=0 are refused; brotli wins ties since it compresses JSON better.
+    `codings` restricts the choice to those available, e.g. the precompressed variants
+    of a static file.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = quality
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    if codings is not None:
+        candidates = [coding for coding in candidates if coding in codings]
+        if not candidates:
+            return None
+    best = max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*", 0.0)))
+    return best if accepted.get(best, accepted.get("*", 0.0)) > 0 else None
+
+
+class _WeakETagMixin:
+    # A compressed body is a different byte sequence, so a strong ETag computed for the
+    # identity body is downgraded to a weak one; If-None-Match compares weakly, so
+    # either form revalidates
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def send_with_weak_etag(message: Message) -> None:
+            if message["type"] == "http.response.start" and not self.content_encoding_set:
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and headers.get("content-encoding") == self.content_encoding:
+                    headers["etag"] = f"W/{etag}"
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_weak_etag)
+
+
+class _GZipResponder(_WeakETagMixin, GZipResponder):
+    pass
+
+
+class _BrotliResponder(_WeakETagMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # Flush every chunk so that streamed responses (NDJSON) keep streaming
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with brotli or gzip, whichever
+    the client prefers (brotli only when the `brotli` package is installed).
+
+    Responses that already carry a Content-Encoding and event streams pass through
+    untouched, as does everything under `exclude_prefixes` (apps that negotiate their
+    own encoding, like the precompressed static assets).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 4,
+        brotli_quality: int = 4,
+        exclude_prefixes: Tuple[str, ...] = (),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_prefixes = exclude_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = _BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = _GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -1,9 +1,112 @@
+import os
+
+
 class Settings:
-    MONGO_URI = "mongodb://localhost:27017"
-    DB_NAME = "meal_tracker"
-    REDIS_URL = "redis://localhost:6379"
+    MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    DB_NAME = os.getenv("DB_NAME", "meal_tracker")
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
     SECRET_KEY = "your-secret-key"  # Generate a secure key
     JWT_ALGORITHM = "HS256"
+    JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")  # "jose" (python-jose) or "pyjwt"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-settings = Settings()
\ No newline at end of file
+    # Verified-token cache (skips signature checks for recently verified tokens until they expire)
+    TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+    # Password hashing (bcrypt on a dedicated thread pool)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Existing hashes are upgraded on login when this changes
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))  # 0 = unbounded
+
+    # Logging (app.core.logger). LOG_WRITER is "thread" (sinks written by a background
+    # thread), "enqueue" (loguru's multiprocess-safe queue) or "sync" (on the caller);
+    # LOG_SAMPLE_RATES keeps a share of the DEBUG/INFO records of noisy modules, e.g.
+    # "app.services.ingredient=0.1,app.repositories=0.01"; LOG_FORMAT is "text" or "json"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")  # Empty disables the file sink
+    LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "DEBUG")
+    LOG_WRITER = os.getenv("LOG_WRITER", "thread")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+    # Mongo connection pool (shared client created in app.main.lifespan)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")  # e.g. "zstd,snappy,zlib"; empty disables compression
+    MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", "4"))  # concurrent pings at startup
+
+    # Index maintenance at startup: "log" builds indexes in the background and warns about
+    # hot queries planned as a COLLSCAN, "fail" builds them before serving and aborts startup
+    # on a COLLSCAN, "off" builds them in the background without checking plans
+    INDEX_PLAN_CHECK = os.getenv("INDEX_PLAN_CHECK", "log")
+
+    # Nutrient storage for newly written ingredients: "map" ({name: value}) or "packed"
+    # (a float array plus a presence mask, see app.core.nutrients). Reads accept both;
+    # `python -m app.cli migrate-nutrients --to packed|map` converts existing documents.
+    # float32 halves the packed values again but is rounded to 7 significant digits and
+    # decodes more slowly than float64 (see benchmarks/nutrient_storage.py)
+    INGREDIENT_NUTRIENT_STORAGE = os.getenv("INGREDIENT_NUTRIENT_STORAGE", "map")
+    INGREDIENT_NUTRIENT_PACKED_PRECISION = os.getenv("INGREDIENT_NUTRIENT_PACKED_PRECISION", "float64")
+
+    # Ingredient catalog listing
+    INGREDIENT_PAGE_DEFAULT_LIMIT = int(os.getenv("INGREDIENT_PAGE_DEFAULT_LIMIT", "100"))
+    INGREDIENT_PAGE_MAX_LIMIT = int(os.getenv("INGREDIENT_PAGE_MAX_LIMIT", "1000"))
+    INGREDIENT_STREAM_BATCH_SIZE = int(os.getenv("INGREDIENT_STREAM_BATCH_SIZE", "500"))
+
+    # Bulk ingredient import (CLI and POST /ingredients/bulk)
+    INGREDIENT_IMPORT_CHUNK_SIZE = int(os.getenv("INGREDIENT_IMPORT_CHUNK_SIZE", "1000"))
+    INGREDIENT_IMPORT_MAX_CHUNK_SIZE = int(os.getenv("INGREDIENT_IMPORT_MAX_CHUNK_SIZE", "10000"))
+    INGREDIENT_IMPORT_MAX_ERRORS = int(os.getenv("INGREDIENT_IMPORT_MAX_ERRORS", "1000"))  # Row errors listed in a report
+
+    # Ingredient name search
+    INGREDIENT_SEARCH_DEFAULT_LIMIT = int(os.getenv("INGREDIENT_SEARCH_DEFAULT_LIMIT", "20"))
+    INGREDIENT_SEARCH_MAX_LIMIT = int(os.getenv("INGREDIENT_SEARCH_MAX_LIMIT", "100"))
+    INGREDIENT_SEARCH_SUBSTRING_FALLBACK = os.getenv("INGREDIENT_SEARCH_SUBSTRING_FALLBACK", "true").lower() == "true"
+
+    # In-memory trigram autocomplete index (optional, built in the background at startup)
+    AUTOCOMPLETE_INDEX_ENABLED = os.getenv("AUTOCOMPLETE_INDEX_ENABLED", "false").lower() == "true"
+    AUTOCOMPLETE_MIN_SIMILARITY = float(os.getenv("AUTOCOMPLETE_MIN_SIMILARITY", "0.5"))
+
+    # Read-through ingredient cache: an in-process TTL/LRU tier, optionally backed by a
+    # shared Redis tier (REDIS_URL) so that several workers warm each other's lookups
+    INGREDIENT_CACHE_ENABLED = os.getenv("INGREDIENT_CACHE_ENABLED", "true").lower() == "true"
+    INGREDIENT_CACHE_SIZE = int(os.getenv("INGREDIENT_CACHE_SIZE", "10000"))
+    INGREDIENT_CACHE_TTL_SECONDS = float(os.getenv("INGREDIENT_CACHE_TTL_SECONDS", "300"))
+    INGREDIENT_CACHE_REDIS_ENABLED = os.getenv("INGREDIENT_CACHE_REDIS_ENABLED", "false").lower() == "true"
+    INGREDIENT_CACHE_REDIS_TTL_SECONDS = int(os.getenv("INGREDIENT_CACHE_REDIS_TTL_SECONDS", "3600"))
+
+    # Response compression: brotli when the optional `brotli` package is installed and the
+    # client accepts it, gzip otherwise. Smaller responses are not worth the CPU
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "4"))  # 4 is ~40% cheaper than 6 for ~10% more bytes
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Prometheus metrics at /metrics: per-route request counts and latencies, Mongo command
+    # and connection checkout timings (pymongo listeners), and the components' stats()
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Request profiling (app.core.profiling), off unless PROFILING_ENABLED is set. Requests
+    # carrying PROFILING_HEADER: PROFILING_TOKEN, plus a PROFILING_SAMPLE_RATE share of all
+    # requests, are profiled with cProfile into PROFILING_DIR; /api/v1/admin/profiles
+    # (same header) lists them and summarizes their top functions
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")  # Empty: no request can ask for a profile
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+    PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "100"))
+
+    # Static assets (app/static): precompressed at startup, fingerprinted URLs cached this long
+    STATIC_MAX_AGE_SECONDS = int(os.getenv("STATIC_MAX_AGE_SECONDS", "31536000"))
+
+    # Meal views
+    NUTRIENT_ANNOTATION_CACHE_SIZE = int(os.getenv("NUTRIENT_ANNOTATION_CACHE_SIZE", "4096"))
+    MEAL_BATCH_MAX_SIZE = int(os.getenv("MEAL_BATCH_MAX_SIZE", "200"))  # Meals per POST /meals/batch
+    NUTRIENT_BATCH_MAX_MEALS = int(os.getenv("NUTRIENT_BATCH_MAX_MEALS", "500"))
+    SUMMARY_MAX_DAYS = int(os.getenv("SUMMARY_MAX_DAYS", "366"))
+
+settings = Settings()
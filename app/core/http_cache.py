@@ -0,0 +1,60 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Authenticated, per-user data: clients may keep a copy but must revalidate it
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from everything that determines a representation."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Mongo returns naive datetimes that are already in UTC
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+class CacheValidators(NamedTuple):
+    """ETag and Last-Modified of a representation, checked before it is built."""
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(_as_utc(self.last_modified).replace(microsecond=0), usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """
+        Whether the client's copy is current (RFC 9110 section 13.2.2).
+
+        If-None-Match takes precedence; If-Modified-Since is only consulted when
+        the request carries no If-None-Match.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            # If-None-Match uses the weak comparison
+            return any(tag.strip().removeprefix("W/") == self.etag for tag in if_none_match.split(","))
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(self.last_modified).replace(microsecond=0) <= _as_utc(since)
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
@@ -1,6 +1,174 @@
-from loguru import logger
+import asyncio
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from typing import Dict, Optional, TextIO
+
+from loguru import logger
+
+from app.core.config import settings
+
+LOG_ROTATION_BYTES = 500 * 1024 * 1024
+STDOUT_FORMAT = "{time} | {level} | {message}"
+
+
+class SamplingFilter:
+    """
+    Loguru filter keeping only a fraction of the low-severity records of chosen modules.
+
+    `rates` maps module prefixes ("app.repositories") to the share of their records
+    to keep; the longest matching prefix wins and unlisted modules are kept in
+    full. Records above `max_level` (warnings and errors by default) are never
+    dropped.
+    """
+
+    def __init__(self, rates: Dict[str, float], max_level: str = "INFO"):
+        self.rates = rates
+        self.max_level_no = logger.level(max_level).no
+        self._rate_by_module: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._rate_by_module.get(name)
+        if rate is None:
+            matches = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + ".")]
+            rate = self._rate_by_module[name] = self.rates[max(matches, key=len)] if matches else 1.0
+        return rate
+
+    def __call__(self, record) -> bool:
+        if record["level"].no > self.max_level_no:
+            return True
+        rate = self.rate_for(record["name"] or "")
+        return rate >= 1.0 or random.random() < rate
+
+
+class BackgroundWriter:
+    """
+    Loguru sink that hands formatted messages to a daemon thread for writing.
+
+    The thread appends to the file at `path` and rotates it once it reaches
+    `rotation_bytes`, or writes to `stream`; without either it writes to whatever
+    `sys.stdout` is at the time, so a replaced stdout (test output capture, a
+    closed redirect) is never written after the fact. Logging calls only pay for
+    a queue put; when the queue is full (the disk has stalled) messages are
+    dropped and counted rather than blocking the event loop. Loguru calls `stop`
+    when the handler is removed and awaits `complete` from `logger.complete()`.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: Optional[str] = None, stream: Optional[TextIO] = None,
+                 rotation_bytes: int = LOG_ROTATION_BYTES, max_queue: int = 100_000):
+        self.path = path
+        self.stream = stream
+        self.rotation_bytes = rotation_bytes
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(max_queue)
+        self._file: Optional[TextIO] = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is waiting so that each flush covers many records
+            while batch[-1] is not self._STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is self._STOP
+            self._write_batch(batch[:-1] if stopping else batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stopping:
+                return
+
+    def _write_batch(self, messages: list) -> None:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            # A new list: _run counts the batch it passed in for task_done
+            messages = [f"{time.strftime('%Y-%m-%dT%H:%M:%S')} | WARNING | Log queue full: dropped {dropped} records\n", *messages]
+        target = self._file if self._file is not None else self.stream or sys.stdout
+        try:
+            target.write("".join(messages))
+            target.flush()
+            if self._file is not None and self._file.tell() >= self.rotation_bytes:
+                self._rotate()
+        except (OSError, ValueError) as e:
+            # Never let a logging failure kill the writer thread
+            sys.stderr.write(f"Log writer failed: {e}\n")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        root, extension = os.path.splitext(self.path)
+        stamp = time.strftime('%Y-%m-%d_%H-%M-%S')
+        target, n = f"{root}.{stamp}{extension}", 1
+        while os.path.exists(target):  # Several rotations within one second
+            target, n = f"{root}.{stamp}.{n}{extension}", n + 1
+        os.replace(self.path, target)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def stop(self) -> None:
+        self._queue.put(self._STOP)
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+
+    async def complete(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._queue.join)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parses LOG_SAMPLE_RATES: "app.services.ingredient=0.1,app.repositories=0.01"."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        module, _, rate = item.partition("=")
+        rates[module.strip()] = float(rate)
+    return rates
+
+
+def configure_logging() -> None:
+    """
+    (Re)configures the stdout and file sinks from settings.
+
+    LOG_WRITER picks who writes the sinks: "thread" (a BackgroundWriter per sink, so
+    a slow disk never blocks the event loop), "enqueue" (loguru's own queue, which
+    pickles every record but also works across processes) or "sync" (the caller).
+    Call `await logger.complete()` before exiting to flush queued records.
+
+    Messages should pass their values as arguments (`logger.debug("Found {} ingredients",
+    count)`) so that they are only formatted when some sink accepts the level.
+    """
+    rates = parse_sample_rates(settings.LOG_SAMPLE_RATES)
+    options = {
+        "serialize": settings.LOG_FORMAT == "json",
+        "filter": SamplingFilter(rates) if rates else None,
+    }
+    logger.remove()
+    if settings.LOG_WRITER == "thread":
+        logger.add(BackgroundWriter(), format=STDOUT_FORMAT, level=settings.LOG_LEVEL, **options)
+        if settings.LOG_FILE:
+            logger.add(BackgroundWriter(path=settings.LOG_FILE), level=settings.LOG_FILE_LEVEL, **options)
+        return
+    enqueue = settings.LOG_WRITER == "enqueue"
+    logger.add(sys.stdout, format=STDOUT_FORMAT, level=settings.LOG_LEVEL, enqueue=enqueue, **options)
+    if settings.LOG_FILE:
+        logger.add(settings.LOG_FILE, rotation="500 MB", level=settings.LOG_FILE_LEVEL, enqueue=enqueue, **options)
+
 
-logger.remove()
-logger.add(sys.stdout, format="{time} | {level} | {message}", level="INFO")
-logger.add("logs/app.log", rotation="500 MB", level="DEBUG")
\ No newline at end of file
+configure_logging()
@@ -0,0 +1,293 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. HTTP requests and Mongo commands share the scale: sub-millisecond index
+# hits up to multi-second imports
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label for requests that matched no route, so unknown paths cannot grow the label set
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds, as Prometheus expects."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        separator = "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{le}"}} {cumulative}')
+        braces = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{braces} {self.sum!r}")
+        lines.append(f"{name}_count{braces} {self.count}")
+        return lines
+
+
+def _labels(**values: Any) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values.values())
+    return ",".join(f'{name}="{value}"' for name, value in zip(values, escaped))
+
+
+def _flatten(prefix: str, values: Dict[str, Any]) -> List[Tuple[str, float]]:
+    # Numeric leaves of a stats() dict become gauges: {"local": {"hits": 3}} -> prefix_local_hits
+    flat = []
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            flat.extend(_flatten(name, value))
+        elif isinstance(value, (bool, int, float)):
+            flat.append((name, float(value)))
+    return flat
+
+
+class MetricsRegistry:
+    """
+    Process-wide request, Mongo and pool metrics, rendered in Prometheus text format.
+
+    HTTP metrics are only updated on the event loop and need no lock. Mongo and pool
+    events arrive on the driver's threads and update their metrics under `_lock`.
+    Components that already keep counters expose them through `register_stats`,
+    which reads their `stats()` dict at scrape time.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.commands: Dict[Tuple[str, str], Histogram] = {}
+        self.command_failures: Dict[Tuple[str, str], int] = {}
+        self.checkout_wait = Histogram(buckets)
+        self.checkout_failures: Dict[str, int] = {}
+        self.connections_open = 0
+        self.connections_checked_out = 0
+        self._stats: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.request_latency.get((method, route))
+        if histogram is None:
+            histogram = self.request_latency[(method, route)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def observe_command(self, collection: str, command: str, seconds: float, failed: bool = False) -> None:
+        key = (collection, command)
+        with self._lock:
+            histogram = self.commands.get(key)
+            if histogram is None:
+                histogram = self.commands[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if failed:
+                self.command_failures[key] = self.command_failures.get(key, 0) + 1
+
+    def register_stats(self, name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Exports the numeric values of `stats()` as `app_<name>_<key>` gauges."""
+        self._stats[name] = stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.request_latency.clear()
+            self.commands.clear()
+            self.command_failures.clear()
+            self.checkout_wait = Histogram(self.buckets)
+            self.checkout_failures.clear()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total HTTP requests by method, route template and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for method, count in sorted(self.in_flight.items()):
+            lines.append(f"http_requests_in_flight{{{_labels(method=method)}}} {count}")
+        lines += [
+            "# HELP http_request_duration_seconds Time until the last response byte was sent.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.request_latency.items()):
+            lines += histogram.samples("http_request_duration_seconds", _labels(method=method, route=route))
+
+        with self._lock:
+            lines += [
+                "# HELP mongodb_command_duration_seconds Mongo command round trips by collection and command.",
+                "# TYPE mongodb_command_duration_seconds histogram",
+            ]
+            for (collection, command), histogram in sorted(self.commands.items()):
+                lines += histogram.samples("mongodb_command_duration_seconds", _labels(collection=collection, command=command))
+            lines += [
+                "# HELP mongodb_command_failures_total Mongo commands that returned an error.",
+                "# TYPE mongodb_command_failures_total counter",
+            ]
+            for (collection, command), count in sorted(self.command_failures.items()):
+                lines.append(f"mongodb_command_failures_total{{{_labels(collection=collection, command=command)}}} {count}")
+            lines += [
+                "# HELP mongodb_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+                "# TYPE mongodb_pool_checkout_wait_seconds histogram",
+            ]
+            lines += self.checkout_wait.samples("mongodb_pool_checkout_wait_seconds", "")
+            lines += [
+                "# HELP mongodb_pool_checkout_failures_total Connection checkouts that failed, by reason.",
+                "# TYPE mongodb_pool_checkout_failures_total counter",
+            ]
+            for reason, count in sorted(self.checkout_failures.items()):
+                lines.append(f"mongodb_pool_checkout_failures_total{{{_labels(reason=reason)}}} {count}")
+            lines += [
+                "# TYPE mongodb_pool_connections_open gauge",
+                f"mongodb_pool_connections_open {self.connections_open}",
+                "# TYPE mongodb_pool_connections_checked_out gauge",
+                f"mongodb_pool_connections_checked_out {self.connections_checked_out}",
+            ]
+
+        for name, stats in self._stats.items():
+            for metric, value in _flatten(f"app_{name}", stats()):
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value!r}"]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and times them until the last response byte is sent.
+
+    Requests are labelled with the template of the route that served them
+    ("/api/v1/meals/{meal_id}"), which the router stores in the shared scope, rather
+    than the raw path; requests that matched no route share UNMATCHED_ROUTE.
+    Errors that escape the app are recorded as 500s.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None) -> None:
+        self.app = app
+        self.registry = registry if registry is not None else metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight[method] = registry.in_flight.get(method, 0) + 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.in_flight[method] -= 1
+            route = scope.get("route")
+            registry.observe_request(method, getattr(route, "path", UNMATCHED_ROUTE), status, elapsed)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every Mongo command by collection and command name."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        self.registry = registry if registry is not None else metrics
+        # The collection is only in the started event; pymongo request ids are unique
+        # per process, so they pair it with the matching succeeded/failed event
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):  # getMore names its collection separately
+            target = event.command.get("collection", "")
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        self.registry.observe_command(collection, event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        self.registry.observe_command(collection, event.command_name, event.duration_micros / 1e6, failed=True)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Records connection checkout waits and pool occupancy."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        self.registry = registry if registry is not None else metrics
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        registry = self.registry
+        with registry._lock:
+            registry.checkout_wait.observe(event.duration or 0.0)
+            registry.connections_checked_out += 1
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        registry = self.registry
+        with registry._lock:
+            registry.checkout_wait.observe(event.duration or 0.0)
+            registry.checkout_failures[event.reason] = registry.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self.registry._lock:
+            self.registry.connections_checked_out -= 1
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self.registry._lock:
+            self.registry.connections_open += 1
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self.registry._lock:
+            self.registry.connections_open -= 1
+
+    # pymongo calls every pool event; the rest carry nothing we export
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+
+# Process-wide registry, served at /metrics by app.main
+metrics = MetricsRegistry()
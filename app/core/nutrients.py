@@ -0,0 +1,103 @@
+import struct
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.constants import NUTRIENT_UNITS
+
+# Fixed vector slot for every known nutrient, in NUTRIENT_UNITS order. Slots must
+# stay stable: new nutrients are appended to NUTRIENT_UNITS, never inserted or reordered.
+NUTRIENT_NAMES: Tuple[str, ...] = tuple(NUTRIENT_UNITS)
+NUTRIENT_SLOTS: Dict[str, int] = {name: slot for slot, name in enumerate(NUTRIENT_NAMES)}
+NUTRIENT_COUNT = len(NUTRIENT_NAMES)
+NUTRIENT_UNIT_LIST: Tuple[str, ...] = tuple(NUTRIENT_UNITS[name] for name in NUTRIENT_NAMES)
+
+# Which nutrients a value set carries is tracked as a bitmask with bit `slot` set per nutrient
+if NUTRIENT_COUNT > 64:
+    raise RuntimeError(f"{NUTRIENT_COUNT} nutrients do not fit a 64-bit presence mask")
+_SLOT_SHIFTS = np.arange(NUTRIENT_COUNT, dtype=np.uint64)
+
+
+def mask_to_slots(mask: int) -> np.ndarray:
+    """Slots whose bit is set in a presence mask, in slot order."""
+    return np.flatnonzero((np.uint64(mask) >> _SLOT_SHIFTS) & np.uint64(1))
+
+
+def vector_to_dict(vector: np.ndarray, mask: int) -> Dict[str, float]:
+    """Turns a vector back into {nutrient: value} for the slots set in presence `mask`."""
+    return {NUTRIENT_NAMES[slot]: float(vector[slot]) for slot in mask_to_slots(mask)}
+
+
+def annotate_vector(vector: np.ndarray, mask: int) -> Dict[str, Dict[str, object]]:
+    """Turns a vector back into {nutrient: {"value", "unit"}} for the slots set in presence `mask`."""
+    return {
+        NUTRIENT_NAMES[slot]: {"value": float(vector[slot]), "unit": NUTRIENT_UNIT_LIST[slot]}
+        for slot in mask_to_slots(mask)
+    }
+
+
+# Packed storage: registered nutrients as little-endian floats in slot order for the
+# bits set in a presence mask, stored as {"mask": int64, "values": bytes} in this field.
+# Nutrients outside the registry stay in the plain "nutrients" map. The element width
+# is implied by len(values) / popcount(mask), so float32 and float64 documents can coexist.
+PACKED_NUTRIENTS_FIELD = "nutrients_packed"
+_PACKED_FORMATS = {"float32": "f", "float64": "d"}
+# float32 carries a little over 7 significant digits; its values are rounded back to 7
+# on decode so that e.g. 0.3 does not come back as 0.30000001192092896
+_FLOAT32_SIGNIFICANT_DIGITS = 7
+
+
+@lru_cache(maxsize=4096)
+def _mask_names(mask: int) -> Tuple[str, ...]:
+    # Catalogs reuse a small number of nutrient combinations, so this is nearly always a hit
+    return tuple(NUTRIENT_NAMES[slot] for slot in mask_to_slots(mask))
+
+
+def pack_nutrients(nutrients: Dict[str, float], precision: str = "float64") -> Tuple[Dict[str, object], Dict[str, float]]:
+    """Splits a nutrient map into its packed form and the nutrients outside the registry."""
+    by_slot = {}
+    unregistered = {}
+    for name, value in nutrients.items():
+        slot = NUTRIENT_SLOTS.get(name)
+        if slot is None:
+            unregistered[name] = value
+        else:
+            by_slot[slot] = value
+    slots = sorted(by_slot)
+    values = struct.pack(f"<{len(slots)}{_PACKED_FORMATS[precision]}", *(by_slot[slot] for slot in slots))
+    return {"mask": sum(1 << slot for slot in slots), "values": values}, unregistered
+
+
+def _round_float32(raw: bytes) -> List[float]:
+    values = np.frombuffer(raw, dtype="<f4").astype(np.float64)
+    exponents = np.floor(np.log10(np.abs(values), where=values != 0, out=np.zeros_like(values)))
+    scale = 10.0 ** (_FLOAT32_SIGNIFICANT_DIGITS - 1 - exponents)
+    return (np.round(values * scale) / scale).tolist()
+
+
+def unpack_nutrients(packed: Dict[str, object]) -> Dict[str, float]:
+    """Turns the packed form back into {nutrient: value}."""
+    names = _mask_names(packed["mask"])
+    raw = packed["values"]
+    if len(raw) == 8 * len(names):
+        return dict(zip(names, struct.unpack(f"<{len(names)}d", raw)))
+    return dict(zip(names, _round_float32(raw)))
+
+
+def pack_document_nutrients(document: Dict[str, object], precision: str = "float64") -> Dict[str, object]:
+    """Returns a copy of an ingredient document with its nutrients in packed form."""
+    packed, unregistered = pack_nutrients(document.get("nutrients") or {}, precision)
+    document = {key: value for key, value in document.items() if key != "nutrients"}
+    document[PACKED_NUTRIENTS_FIELD] = packed
+    if unregistered:
+        document["nutrients"] = unregistered
+    return document
+
+
+def unpack_document_nutrients(document: Dict[str, object]) -> Dict[str, object]:
+    """Restores the plain nutrients map of an ingredient document in place, whichever format it was stored in."""
+    packed = document.pop(PACKED_NUTRIENTS_FIELD, None)
+    if packed is not None:
+        document["nutrients"] = {**unpack_nutrients(packed), **(document.get("nutrients") or {})}
+    return document
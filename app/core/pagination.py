@@ -0,0 +1,28 @@
+import base64
+import json
+from typing import Any, Dict
+
+from app.exceptions.pagination import InvalidCursorError
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Encodes keyset position data into an opaque, URL-safe token."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """
+    Decodes a token produced by encode_cursor.
+
+    Raises:
+        InvalidCursorError: If the token is not valid base64 JSON object data.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}")
+    if not isinstance(payload, dict):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return payload
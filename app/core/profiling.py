@@ -0,0 +1,161 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_ID_HEADER = "X-Profile-Id"
+SORT_KEYS = {"cumulative": 3, "tottime": 2, "ncalls": 1}  # Index into pstats' (cc, nc, tt, ct) tuples
+
+
+class ProfilingMiddleware:
+    """
+    Profiles selected requests with cProfile and writes each profile to `directory`.
+
+    A request is profiled when it carries `header` with the value `token` (compared in
+    constant time; an empty token disables the header) or, failing that, with
+    probability `sample_rate`. Each profile is saved as `<id>.prof` (pstats format,
+    for snakeviz or `python -m pstats`) next to `<id>.json` holding the method, route
+    template, status and duration; the id is returned in the X-Profile-Id header.
+    Only the newest `max_files` profiles are kept.
+
+    cProfile follows the event loop thread, so other requests running while a
+    profiled one awaits show up in its profile too, and only one request is
+    profiled at a time. The middleware is only installed when PROFILING_ENABLED is
+    set; when it is not, requests never reach this code.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str,
+        header: str = "X-Profile",
+        token: str = "",
+        sample_rate: float = 0.0,
+        max_files: int = 100,
+    ) -> None:
+        self.app = app
+        self.directory = directory
+        self.header = header.lower()
+        self.token = token
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._active = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        if self.token:
+            value = Headers(scope=scope).get(self.header)
+            if value is not None and hmac.compare_digest(value, self.token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._active or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # Microseconds keep ids in creation order, which is what pruning relies on
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        profiler = cProfile.Profile()
+        self._active = True
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            self._active = False
+            route = getattr(scope.get("route"), "path", scope["path"])
+            metadata = {
+                "id": profile_id,
+                "method": scope["method"],
+                "route": route,
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 3),
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._save, profiler, metadata)
+                logger.info("Profiled {} {} in {:.1f} ms as {}", scope["method"], route, elapsed * 1000, profile_id)
+            except OSError as e:
+                logger.error(f"Failed to save profile {profile_id}: {e}")
+
+    def _save(self, profiler: cProfile.Profile, metadata: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, metadata["id"])
+        profiler.dump_stats(f"{path}.prof")
+        with open(f"{path}.json", "w") as f:
+            json.dump(metadata, f)
+        for stale in list_profiles(self.directory)[self.max_files:]:
+            for extension in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, stale["id"] + extension))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(directory: str) -> List[Dict[str, Any]]:
+    """Metadata of the saved profiles, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return profiles
+
+
+def top_functions(directory: str, profile_id: str, sort: str = "cumulative", limit: int = 30) -> Optional[Dict[str, Any]]:
+    """
+    Summarizes a saved profile as its `limit` most expensive functions.
+
+    Returns:
+        The profile's metadata with "functions" (ncalls, tottime_ms, cumtime_ms and
+        "file:line(function)" per entry) and "total_calls", or None if there is no
+        complete profile with this id (pruning may remove its files at any time).
+    """
+    path = os.path.join(directory, os.path.basename(profile_id))
+    try:
+        with open(f"{path}.json") as f:
+            metadata = json.load(f)
+        stats = pstats.Stats(f"{path}.prof").stats
+    except OSError:
+        return None
+    column = SORT_KEYS[sort]
+    ranked = sorted(stats.items(), key=lambda item: item[1][column], reverse=True)[:limit]
+    metadata["total_calls"] = sum(entry[1] for entry in stats.values())
+    metadata["functions"] = [
+        {
+            "function": pstats.func_std_string(function),
+            "ncalls": ncalls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for function, (_, ncalls, tottime, cumtime, _) in ranked
+    ]
+    return metadata
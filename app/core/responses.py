@@ -0,0 +1,29 @@
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+
+class ModelJSONResponse(Response):
+    """
+    JSON response for values that are already validated Pydantic models.
+
+    Returning a Response skips FastAPI's response_model pass (a second validation,
+    then jsonable_encoder and json.dumps); pydantic-core serializes the models
+    straight to bytes instead, with aliases as response_model would. Keep
+    response_model on the route so the OpenAPI schema stays the same.
+
+    Pass `adapter` for values that are not a model themselves, e.g. a list of models.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, adapter: Optional[TypeAdapter] = None, **kwargs):
+        # Set before Response.__init__, which calls render()
+        self.adapter = adapter
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.adapter is not None:
+            return self.adapter.dump_json(content, by_alias=True)
+        return content.__pydantic_serializer__.to_json(content, by_alias=True)
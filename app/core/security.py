@@ -1,21 +1,202 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import jwt as pyjwt
+from collections import OrderedDict
 from jose import jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
 from app.core.config import settings
+from app.exceptions.user import PasswordHashingBusyError
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes whose cost differs from BCRYPT_ROUNDS are reported by needs_update and
+# upgraded on the next successful login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+class PasswordHashPool:
+    """
+    Runs bcrypt work on a dedicated, bounded thread pool off the event loop.
+
+    bcrypt releases the GIL while hashing, so up to `max_workers` hashes run in
+    parallel while the event loop keeps serving other requests. Jobs beyond that
+    wait in the executor queue; once `max_queue` jobs are waiting, new ones are
+    rejected with PasswordHashingBusyError instead of queueing without bound.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int = 0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _release_slot(self, slot: dict) -> None:
+        # Called with _lock held, by whichever of the worker and the cancelled caller gets there first
+        if not slot["released"]:
+            slot["released"] = True
+            self.queued -= 1
+
+    def _job(self, fn: Callable[..., Any], args: tuple, submitted: float, slot: dict) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._release_slot(slot)
+            self.running += 1
+            self.wait_seconds += started - submitted
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.run_seconds += time.perf_counter() - started
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHashingBusyError("Too many password operations in progress, try again shortly")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        slot = {"released": False}
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._ensure_executor(), self._job, fn, args, time.perf_counter(), slot)
+        finally:
+            # A caller cancelled while the job was still waiting (client disconnect, timeout)
+            # also cancels the job, so _job never runs to give back the queue slot
+            with self._lock:
+                self._release_slot(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "max_queued": self.max_queued,
+                "mean_wait_ms": self.wait_seconds / self.completed * 1000 if self.completed else 0.0,
+                "mean_run_ms": self.run_seconds / self.completed * 1000 if self.completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+async def hash_password(password: str) -> str:
+    return await password_hash_pool.run(pwd_context.hash, password)
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await password_hash_pool.run(pwd_context.verify, plain, hashed)
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True when a stored hash uses a different scheme or cost than currently configured (cheap, no hashing)."""
+    try:
+        return pwd_context.needs_update(hashed)
+    except (ValueError, TypeError):
+        return False
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache from a token to the claims it carried when its signature was verified.
+
+    Entries expire with the token's own `exp` claim, so a cached token is never
+    accepted after it would have failed verification. Tokens without `exp` are
+    not cached. Safe to use from several threads.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return claims
+                self._entries.pop(token, None)
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: dict) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (claims, expires_at)
+            self._entries.move_to_end(token)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {
+            "enabled": settings.TOKEN_CACHE_ENABLED,
+            "size": size,
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE)
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    if settings.JWT_BACKEND == "pyjwt":
+        return pyjwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
\ No newline at end of file
+    """Verifies a token's signature and expiry with the configured backend and returns its claims."""
+    if settings.JWT_BACKEND == "pyjwt":
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+
+def verify_token(token: str) -> dict:
+    """decode_token, served from the verified-token cache when TOKEN_CACHE_ENABLED is set."""
+    if not settings.TOKEN_CACHE_ENABLED:
+        return decode_token(token)
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        token_cache.put(token, claims)
+    return claims
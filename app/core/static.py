@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, NamedTuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.compression import brotli, negotiate_encoding
+from app.core.http_cache import CacheValidators
+
+# Fingerprinted URLs change whenever the content does, so they can be cached for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age={max_age}, immutable"
+# Plain URLs (bookmarks, entry pages) must be revalidated, which is cheap with the ETag
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class StaticAsset(NamedTuple):
+    media_type: str
+    digest: str  # Content hash, used for the fingerprinted name and the ETags
+    bodies: Dict[str, bytes]  # Keyed by content coding; "identity" is always present
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """`app.js` with digest `3f2a...` becomes `app.3f2a....js`."""
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest}{extension}"
+
+
+class StaticAssets:
+    """
+    Serves the files of a directory from memory, precompressed once at startup.
+
+    Every file is reachable under its own name and under a fingerprinted name that
+    embeds a hash of its content (see `url_for`). Fingerprinted URLs are cached as
+    immutable; plain names carry an ETag and must be revalidated. Gzip and (when
+    installed) brotli variants are built at the highest compression level, since
+    that cost is paid once, and only kept when they are actually smaller.
+
+    Meant for a small set of frontend files; the directory is not watched for changes.
+    """
+
+    def __init__(self, directory: str, max_age: int = 31536000, minimum_size: int = 1024) -> None:
+        self.directory = directory
+        self.max_age = max_age
+        self.minimum_size = minimum_size
+        self.assets: Dict[str, StaticAsset] = {}
+        self.fingerprinted: Dict[str, str] = {}  # Fingerprinted path -> plain path
+        self.urls: Dict[str, str] = {}  # Plain path -> fingerprinted path
+        self._load()
+
+    def _load(self) -> None:
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                full_path = os.path.join(root, file_name)
+                path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    content = f.read()
+                digest = hashlib.sha256(content).hexdigest()[:16]
+                self.assets[path] = StaticAsset(
+                    media_type=mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+                    digest=digest,
+                    bodies=self._compress(content),
+                )
+                fingerprinted = fingerprinted_name(path, digest)
+                self.fingerprinted[fingerprinted] = path
+                self.urls[path] = fingerprinted
+
+    def _compress(self, content: bytes) -> Dict[str, bytes]:
+        bodies = {"identity": content}
+        if len(content) < self.minimum_size:
+            return bodies
+        variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(content, quality=11)
+        bodies.update({coding: body for coding, body in variants.items() if len(body) < len(content)})
+        return bodies
+
+    def url_for(self, path: str) -> str:
+        """The fingerprinted path of an asset, relative to the mount point."""
+        return self.urls[path]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+            await response(scope, receive, send)
+            return
+
+        # Mounted apps get the full path, with the mount prefix in root_path
+        request_path = scope["path"].removeprefix(scope.get("root_path", "")).lstrip("/")
+        path = self.fingerprinted.get(request_path, request_path)
+        asset = self.assets.get(path)
+        if asset is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        request = Request(scope)
+        # Only among the variants at hand: a br-capable client may still take gzip
+        coding = negotiate_encoding(request.headers.get("accept-encoding", ""), asset.bodies) or "identity"
+        # Each coding is a distinct representation with its own strong ETag
+        validators = CacheValidators(f'"{asset.digest}"' if coding == "identity" else f'"{asset.digest}-{coding}"')
+        headers = {
+            **validators.headers(),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL.format(max_age=self.max_age) if path != request_path else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if validators.matches(request):
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        response = Response(asset.bodies[coding], media_type=asset.media_type, headers=headers)
+        if scope["method"] == "HEAD":
+            # Headers (including Content-Length) stay those of the GET response
+            response.body = b""
+        await response(scope, receive, send)
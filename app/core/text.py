@@ -0,0 +1,27 @@
+import re
+import unicodedata
+from typing import List
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize_text(value: str) -> str:
+    """
+    Case-folds and accent-strips a string for matching.
+
+    "Crème Brûlée " and "creme brulee" both normalize to "creme brulee".
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", stripped.casefold()).strip()
+
+
+def tokenize(value: str) -> List[str]:
+    """Splits a string into normalized word tokens, dropping punctuation."""
+    return split_words(normalize_text(value))
+
+
+def split_words(normalized: str) -> List[str]:
+    """Splits an already normalized string into word tokens."""
+    return _TOKEN.findall(normalized)
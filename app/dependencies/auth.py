@@ -1,12 +1,14 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from app.core.security import decode_token
+from app.core.security import verify_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+# Async so that FastAPI runs it on the event loop instead of hopping to its threadpool
+# on every authenticated request; verification itself is a few microseconds when cached
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = decode_token(token)
+        payload = verify_token(token)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
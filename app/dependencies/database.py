@@ -1,13 +1,88 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from redis.asyncio import Redis
 from app.core.config import settings
+from app.core.metrics import MongoCommandListener, MongoPoolListener
 from fastapi import Depends
+from loguru import logger
+
+# Process-wide client. Motor keeps its own connection pool per client, so one
+# instance is shared by every request instead of building a new one per call.
+_mongo_client: Optional[AsyncIOMotorClient] = None
+
+
+def _client_options() -> dict:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    if settings.METRICS_ENABLED:
+        options["event_listeners"] = [MongoCommandListener(), MongoPoolListener()]
+    return options
+
+
+async def connect_to_mongo() -> AsyncIOMotorClient:
+    """
+    Creates the shared client (if needed) and warms up its connection pool.
+
+    A handful of concurrent pings forces the driver to finish topology discovery
+    and open sockets before the first request arrives. A failed warm-up is logged
+    but does not abort startup; the pool will connect lazily instead.
+    """
+    client = _ensure_client()
+    warmup = max(settings.MONGO_WARMUP_CONNECTIONS, 1)
+    try:
+        await asyncio.gather(*(client.admin.command("ping") for _ in range(warmup)))
+        logger.info(f"Mongo connection pool warmed up with {warmup} connection(s)")
+    except Exception as e:
+        logger.warning(f"Mongo warm-up ping failed: {e}")
+    return client
+
 
-def get_mongo_client() -> AsyncIOMotorClient:
-    return AsyncIOMotorClient(settings.MONGO_URI)
+def close_mongo_connection() -> None:
+    """Closes the shared client and its pool. Safe to call more than once."""
+    global _mongo_client
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+        logger.info("Mongo client closed")
 
-def get_db(client: AsyncIOMotorClient = Depends(get_mongo_client)):
+
+def set_mongo_client(client: AsyncIOMotorClient) -> None:
+    """
+    Makes `client` the shared client, e.g. an in-memory stand-in for load tests.
+
+    Call before startup; the lifespan then warms it up and closes it like its own.
+    """
+    global _mongo_client
+    _mongo_client = client
+
+
+def _ensure_client() -> AsyncIOMotorClient:
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(settings.MONGO_URI, **_client_options())
+    return _mongo_client
+
+
+# The dependencies are async so FastAPI resolves them on the event loop rather
+# than hopping to its threadpool on every request.
+async def get_mongo_client() -> AsyncIOMotorClient:
+    return _ensure_client()
+
+async def get_db(client: AsyncIOMotorClient = Depends(get_mongo_client)) -> AsyncIOMotorDatabase:
     return client[settings.DB_NAME]
 
-# def get_redis_client() -> Redis:
-#     return Redis.from_url(settings.REDIS_URL, decode_responses=True)
\ No newline at end of file
+def get_database() -> AsyncIOMotorDatabase:
+    """Database handle for code running outside a request (startup, CLI)."""
+    return _ensure_client()[settings.DB_NAME]
+
+def get_redis_client() -> Redis:
+    """A Redis client for REDIS_URL. Connections are opened lazily on first use."""
+    return Redis.from_url(settings.REDIS_URL, decode_responses=True)
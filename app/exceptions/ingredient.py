@@ -28,4 +28,7 @@ class IngredientDeletionError(IngredientError):
 
 class IngredientNotFoundError(IngredientRetrievalError):
      """Raised when a specific ingredient is not found."""
-     pass
\ No newline at end of file
+     pass
+class IngredientImportError(IngredientError):
+     """Raised when an ingredient import file cannot be parsed."""
+     pass
@@ -0,0 +1,3 @@
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor is malformed or was issued for a different ordering."""
+    pass
@@ -8,4 +8,8 @@ class UserCreationError(Exception):
 
 class UserValidationError(Exception):
     """Raised when user data fails validation."""
-    pass
\ No newline at end of file
+    pass
+
+class PasswordHashingBusyError(Exception):
+    """Raised when the password hashing queue is full."""
+    pass
@@ -1,30 +1,98 @@
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi_limiter import FastAPILimiter
-# from app.dependencies.database import get_redis_client
-from app.api.v1 import user, meal, ingredient  # Added import for ingredient router
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from app.api.v1 import admin, user, meal, ingredient  # Added import for ingredient router
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
-from loguru import logger
-from app.dependencies.database import get_db
+from pymongo.errors import PyMongoError
+from app.core.logger import logger
+from app.dependencies.database import connect_to_mongo, close_mongo_connection, get_database, get_redis_client
+from app.repositories.ingredient import backfill_search_fields
+from app.repositories.indexes import maintain_indexes
+from app.services.autocomplete import autocomplete_index, build_autocomplete_index
+from app.services.ingredient_cache import ingredient_cache
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.config import settings
+from app.core.static import StaticAssets
+from app.core.security import password_hash_pool, token_cache
+
+async def _maintain_database(db, plan_check: str) -> None:
+    """Startup work that does not have to finish before serving: index maintenance, then the search-field backfill."""
+    if plan_check != "fail":  # Already done before serving in "fail" mode
+        await maintain_indexes(db, plan_check)
+    try:
+        # Search copes with ingredients written before the normalized fields existed
+        await backfill_search_fields(db)
+    except PyMongoError as e:
+        logger.error(f"Failed to backfill ingredient search fields: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     # redis = get_redis_client()
     # await FastAPILimiter.init(redis)
-    db = await get_db()
-    await db.ingredients.create_index("name", unique=True)
+    await connect_to_mongo()
+    db = get_database()
+    if settings.INDEX_PLAN_CHECK == "fail":
+        await maintain_indexes(db, "fail")
+    maintenance_task = asyncio.create_task(_maintain_database(db, settings.INDEX_PLAN_CHECK))
+    autocomplete_task = None
+    if settings.AUTOCOMPLETE_INDEX_ENABLED:
+        # Until it is ready, /ingredients/autocomplete falls back to the database search
+        autocomplete_task = asyncio.create_task(build_autocomplete_index(db))
+    if settings.INGREDIENT_CACHE_REDIS_ENABLED:
+        ingredient_cache.redis = get_redis_client()
     logger.info("Application startup completed")
     yield
     
     # Shutdown
+    for task in (maintenance_task, autocomplete_task):
+        if task is not None and not task.done():
+            task.cancel()
     # await FastAPILimiter.close()
+    password_hash_pool.shutdown()
+    if ingredient_cache.redis is not None:
+        await ingredient_cache.redis.aclose()
+        ingredient_cache.redis = None
+    close_mongo_connection()
     logger.info("Application shutdown completed")
+    # Flush records still queued for the sinks (LOG_WRITER)
+    await logger.complete()
 
 app = FastAPI(lifespan=lifespan)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Files are read and precompressed here, once; url_path_for("static", path=...) accepts
+# the fingerprinted names from static_assets.url_for(). index.html only loads CDN
+# assets, so nothing links to a fingerprinted name yet.
+static_assets = StaticAssets("app/static", max_age=settings.STATIC_MAX_AGE_SECONDS, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+app.mount("/static", static_assets, name="static")
+if settings.PROFILING_ENABLED:
+    # Innermost, so that profiles cover routing and the handler but not compression
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILING_DIR,
+        header=settings.PROFILING_HEADER,
+        token=settings.PROFILING_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        max_files=settings.PROFILING_MAX_FILES,
+    )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        exclude_prefixes=("/static/",),
+    )
+if settings.METRICS_ENABLED:
+    # Added last so that it is the outermost middleware and its timings include compression
+    app.add_middleware(MetricsMiddleware)
+    metrics.register_stats("password_hash_pool", password_hash_pool.stats)
+    metrics.register_stats("token_cache", token_cache.stats)
+    metrics.register_stats("ingredient_cache", ingredient_cache.stats)
+    metrics.register_stats("autocomplete_index", autocomplete_index.stats)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -35,9 +103,17 @@ async def global_exception_handler(request: Request, exc: Exception):
 async def root():
     return {"message": "Welcome to the Meal Tracker"}
 
+async def get_metrics():
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+if settings.METRICS_ENABLED:
+    app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
+
 app.include_router(user.router, prefix="/api/v1", tags=["User"])
 app.include_router(meal.router, prefix="/api/v1", tags=["Meal"])
 app.include_router(ingredient.router, prefix="/api/v1", tags=["Ingredient"])  # Added ingredient router
+if settings.PROFILING_ENABLED:
+    app.include_router(admin.router, prefix="/api/v1", tags=["Admin"])
 
 if __name__ == "__main__":
     import uvicorn
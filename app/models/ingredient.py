@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Optional, Dict, List
 
 class Ingredient(BaseModel):
     id: str = Field(..., alias='_id')
@@ -11,6 +11,9 @@ class Ingredient(BaseModel):
     reference_unit: str
     nutrients: Dict[str, float]
 
+# Validates or serializes a whole list in one pydantic-core call
+IngredientList = TypeAdapter(List[Ingredient])
+
 class IngredientCreate(BaseModel):
     name: str
     description: Optional[str] = None
@@ -18,4 +21,33 @@ class IngredientCreate(BaseModel):
     unit: float
     reference_quantity: float
     reference_unit: str
-    nutrients: Dict[str, float]
\ No newline at end of file
+    nutrients: Dict[str, float]
+
+class PaginatedIngredients(BaseModel):
+    ingredients: List[Ingredient]
+    next_cursor: Optional[str] = None  # Pass back as 'after' to fetch the next page
+    limit: int
+
+
+class IngredientSuggestion(BaseModel):
+    id: str = Field(..., alias='_id')
+    name: str
+    score: Optional[float] = None  # None when served by the database fallback
+
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based position of the record in the file (header excluded)
+    name: Optional[str] = None
+    error: str
+
+
+class IngredientImportReport(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[ImportRowError]
+    errors_truncated: bool = False  # More rows failed than are listed in errors
+    unmapped_nutrients: Dict[str, int]  # Source nutrient names not in NUTRIENT_UNITS, with their counts
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Union
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Literal, Optional, List, Union
 from datetime import datetime
 from app.models.ingredient import Ingredient
 
@@ -29,8 +29,23 @@ class MealListItem(BaseModel):
     timestamp: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+# Validates a whole page of stored meals in one pydantic-core call
+MealList = TypeAdapter(List[MealListItem])
+
 class PaginatedMeals(BaseModel):
     meals: List[MealListItem]
-    total: int
-    page: int
-    page_size: int
\ No newline at end of file
+    total: Optional[int] = None  # Not computed when paging by cursor
+    page: Optional[int] = None  # None when paging by cursor
+    page_size: int
+    next_cursor: Optional[str] = None  # Pass back as 'after' to fetch the next page
+
+class MealBatchItemResult(BaseModel):
+    index: int  # Position of the meal in the request
+    status: Literal["created", "error"]
+    meal: Optional[MealListItem] = None
+    error: Optional[str] = None
+
+class MealBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[MealBatchItemResult]
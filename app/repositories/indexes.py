@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from bson import ObjectId
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from app.repositories.meal import MEAL_HISTORY_SORT
+
+# Every index the application relies on, per collection. Default index names are
+# kept so that indexes created by earlier releases are recognized as identical.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)]),
+    ],
+    "ingredients": [
+        IndexModel([("name", ASCENDING)], unique=True),
+        IndexModel([("name_normalized", ASCENDING)]),
+        IndexModel([("name_tokens", ASCENDING)]),
+    ],
+    "meals": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "daily_rollups": [
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING)], unique=True),
+    ],
+}
+
+
+class HotQuery(NamedTuple):
+    """The shape of a query issued on a hot path, with placeholder values."""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[tuple]] = None
+
+
+_SAMPLE_ID = ObjectId()
+_SAMPLE_TIME = datetime(2000, 1, 1)
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery("user.get_user_by_username", "users", {"username": "sample"}),
+    HotQuery("meal.get_last_meal_by_user", "meals", {"user_id": "sample"}, MEAL_HISTORY_SORT),
+    HotQuery("meal.get_meals_by_user_page", "meals", {"user_id": "sample"}, MEAL_HISTORY_SORT),
+    HotQuery(
+        "meal.get_meals_by_user_after",
+        "meals",
+        {"user_id": "sample", "$or": [
+            {"timestamp": {"$lt": _SAMPLE_TIME}},
+            {"timestamp": _SAMPLE_TIME, "_id": {"$lt": _SAMPLE_ID}},
+        ]},
+        MEAL_HISTORY_SORT,
+    ),
+    HotQuery("meal.count_meals_by_user", "meals", {"user_id": "sample"}),
+    HotQuery("meal.get_meals_by_ids", "meals", {"_id": {"$in": [_SAMPLE_ID]}, "user_id": "sample"}),
+    HotQuery("ingredient.get_ingredient_ids_by_name", "ingredients", {"name": {"$in": ["sample"]}}),
+    HotQuery("ingredient.get_ingredients(order_by=name)", "ingredients", {"name": {"$gt": "sample"}}, [("name", ASCENDING)]),
+    HotQuery("ingredient.search_ingredients(prefix)", "ingredients", {"name_normalized": {"$regex": "^sample"}}, [("name_normalized", ASCENDING)]),
+    HotQuery("ingredient.search_ingredients(tokens)", "ingredients", {"name_tokens": {"$regex": "^sample"}}),
+    HotQuery("rollup.get_daily_rollups", "daily_rollups", {"user_id": "sample", "date": {"$gte": "2000-01-01", "$lte": "2000-12-31"}}, [("date", ASCENDING)]),
+]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    Creates the registered indexes, one createIndexes command per collection, concurrently.
+
+    Existing identical indexes are left alone. A failure on one collection (for
+    example a unique index over duplicate data) is logged and does not stop the others.
+
+    Args:
+        db: The database connection.
+        collections: Restrict to these collections; defaults to all registered ones.
+
+    Returns:
+        The index names per collection that were ensured successfully.
+    """
+    names = list(collections) if collections is not None else list(INDEXES)
+    results = await asyncio.gather(
+        *(db[name].create_indexes(INDEXES[name]) for name in names),
+        return_exceptions=True,
+    )
+    ensured = {}
+    for name, result in zip(names, results):
+        if isinstance(result, PyMongoError):
+            logger.error(f"Failed to create indexes on '{name}': {result}")
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            ensured[name] = result
+    logger.info(f"Indexes ensured on {len(ensured)}/{len(names)} collections")
+    return ensured
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """All stage names in an explain plan tree (classic or slot-based engine output)."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages += plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages += plan_stages(value)
+    return stages
+
+
+async def find_collection_scans(db: AsyncIOMotorDatabase, queries: Optional[List[HotQuery]] = None) -> List[str]:
+    """
+    Explains each hot query and returns the names of those whose winning plan is a COLLSCAN.
+
+    Only the query planner runs (no documents are read), so this is cheap on any
+    data size.
+    """
+    queries = queries if queries is not None else HOT_QUERIES
+    scans = []
+    for query in queries:
+        command: Dict[str, Any] = {"find": query.collection, "filter": query.filter, "limit": 1}
+        if query.sort:
+            command["sort"] = dict(query.sort)
+        explained = await db.command("explain", command, verbosity="queryPlanner")
+        winning_plan = explained.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in plan_stages(winning_plan):
+            logger.warning(f"Query {query.name} on '{query.collection}' falls back to a COLLSCAN")
+            scans.append(query.name)
+    return scans
+
+
+async def maintain_indexes(db: AsyncIOMotorDatabase, plan_check: str = "log") -> List[str]:
+    """
+    Creates the registered indexes, then checks that no hot query needs a collection scan.
+
+    Args:
+        db: The database connection.
+        plan_check: "log" reports scans as warnings, "fail" raises on them and
+            "off" skips the check.
+
+    Returns:
+        The names of hot queries planned as a COLLSCAN.
+
+    Raises:
+        RuntimeError: If plan_check is "fail" and any hot query is a COLLSCAN.
+        PyMongoError: If plan_check is "fail" and the plans cannot be explained.
+    """
+    await ensure_indexes(db)
+    if plan_check == "off":
+        return []
+    try:
+        scans = await find_collection_scans(db)
+    except PyMongoError as e:
+        if plan_check == "fail":
+            raise
+        logger.error(f"Could not verify query plans: {e}")
+        return []
+    if scans and plan_check == "fail":
+        raise RuntimeError(f"Hot queries fall back to COLLSCAN: {', '.join(scans)}")
+    if not scans:
+        logger.info(f"Verified query plans for {len(HOT_QUERIES)} hot queries: no collection scans")
+    return scans
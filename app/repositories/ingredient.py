@@ -1,9 +1,39 @@
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCursor
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from app.exceptions.ingredient import IngredientAlreadyExistsError
 from bson import ObjectId # Import ObjectId
-from typing import List, Dict, Any # For type hints
+from typing import List, Dict, Any, Optional, Tuple # For type hints
 from loguru import logger # Optional: for logging repo actions
+import re
+from app.core.config import settings
+from app.core.nutrients import PACKED_NUTRIENTS_FIELD, pack_document_nutrients, unpack_document_nutrients
+from app.core.text import normalize_text, tokenize
+
+# Derived fields used only for search; excluded when returning documents
+SEARCH_FIELDS_PROJECTION = {"name_normalized": 0, "name_tokens": 0}
+
+
+def to_storage(ingredient_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Lays out nutrients in the configured storage format (INGREDIENT_NUTRIENT_STORAGE) for writing."""
+    if settings.INGREDIENT_NUTRIENT_STORAGE == "packed" and "nutrients" in ingredient_data:
+        return pack_document_nutrients(ingredient_data, settings.INGREDIENT_NUTRIENT_PACKED_PRECISION)
+    return ingredient_data
+
+
+def from_storage(ingredient: Dict[str, Any]) -> Dict[str, Any]:
+    """Restores the plain nutrients map of a stored ingredient, whichever format it was written in."""
+    ingredient["_id"] = str(ingredient["_id"])
+    return unpack_document_nutrients(ingredient)
+
+
+def search_fields(name: str) -> Dict[str, Any]:
+    """Builds the normalized name fields stored alongside every ingredient for indexed search."""
+    return {
+        "name_normalized": normalize_text(name),
+        "name_tokens": list(dict.fromkeys(tokenize(name))),
+    }
+
 
 async def create_ingredient(db: AsyncIOMotorDatabase, ingredient_data: Dict[str, Any]) -> ObjectId:
     """
@@ -21,9 +51,10 @@ async def create_ingredient(db: AsyncIOMotorDatabase, ingredient_data: Dict[str,
         PyMongoError: For other database-related errors during insertion.
     """
     try:
-        logger.debug(f"Inserting ingredient data: {ingredient_data.get('name')}")
-        result = await db.ingredients.insert_one(ingredient_data)
-        logger.debug(f"Insertion successful, ID: {result.inserted_id}")
+        logger.debug("Inserting ingredient data: {}", ingredient_data.get("name"))
+        document = {**to_storage(ingredient_data), **search_fields(ingredient_data["name"])}
+        result = await db.ingredients.insert_one(document)
+        logger.debug("Insertion successful, ID: {}", result.inserted_id)
         return result.inserted_id # Return the ObjectId directly
     except DuplicateKeyError:
         logger.warning(f"Duplicate key error for ingredient name: {ingredient_data.get('name')}")
@@ -32,45 +63,368 @@ async def create_ingredient(db: AsyncIOMotorDatabase, ingredient_data: Dict[str,
     # Other PyMongoErrors will be caught by the service layer
 
 
-async def get_ingredients(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+async def get_ingredients_by_ids(db: AsyncIOMotorDatabase, ingredient_ids: List[ObjectId]) -> List[Dict[str, Any]]:
+    """
+    Fetches several ingredients by ID in a single $in query.
+
+    Args:
+        db: The database connection.
+        ingredient_ids: The ObjectIds to look up.
+
+    Returns:
+        The documents that exist, without search fields and with _id as a string.
+
+    Raises:
+        PyMongoError: If a database error occurs during the lookup.
+    """
+    if not ingredient_ids:
+        return []
+    cursor = db.ingredients.find({"_id": {"$in": ingredient_ids}}, SEARCH_FIELDS_PROJECTION)
+    return [from_storage(ingredient) for ingredient in await cursor.to_list(length=len(ingredient_ids))]
+
+
+async def get_ingredient_ids_by_name(db: AsyncIOMotorDatabase, names: List[str]) -> Dict[str, ObjectId]:
+    """
+    Looks up ingredient IDs for several names in a single query on the unique name index.
+
+    Args:
+        db: The database connection.
+        names: The ingredient names to resolve.
+
+    Returns:
+        A mapping from each name found to its ObjectId; unknown names are absent.
+
+    Raises:
+        PyMongoError: If a database error occurs during the lookup.
+    """
+    if not names:
+        return {}
+    cursor = db.ingredients.find({"name": {"$in": names}}, {"name": 1})
+    return {ingredient["name"]: ingredient["_id"] for ingredient in await cursor.to_list(length=len(names))}
+
+
+async def insert_missing_ingredients(db: AsyncIOMotorDatabase, ingredients: List[Dict[str, Any]]) -> Dict[str, ObjectId]:
     """
-    Retrieves all ingredient documents from the database.
+    Inserts ingredients by name with one unordered bulk_write of upserts.
+
+    Each operation is an upsert keyed on the unique name with $setOnInsert, so an
+    ingredient that already exists (or is inserted concurrently by another request)
+    is left untouched instead of raising or being duplicated.
 
     Args:
         db: The database connection.
+        ingredients: Ingredient documents to insert, each with a 'name'.
 
     Returns:
-        A list of dictionaries, each representing an ingredient document.
+        A mapping from name to ObjectId for the documents this call inserted. Names
+        that were already present are absent and must be looked up by the caller.
+
+    Raises:
+        PyMongoError: If a database error other than a duplicate name occurs.
+    """
+    if not ingredients:
+        return {}
+    operations = [
+        UpdateOne(
+            {"name": ingredient["name"]},
+            {"$setOnInsert": {
+                **{key: value for key, value in to_storage(ingredient).items() if key not in ("_id", "name")},
+                **search_fields(ingredient["name"]),
+            }},
+            upsert=True,
+        )
+        for ingredient in ingredients
+    ]
+    try:
+        result = await db.ingredients.bulk_write(operations, ordered=False)
+        upserted_ids = result.upserted_ids
+    except BulkWriteError as e:
+        # Two concurrent upserts of a new name can race on the unique index; the
+        # loser reports E11000 and the winner's document is the one to use.
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        upserted_ids = {upsert["index"]: upsert["_id"] for upsert in e.details.get("upserted", [])}
+    logger.debug("Inserted {} of {} ingredients by name", len(upserted_ids), len(ingredients))
+    return {ingredients[index]["name"]: ingredient_id for index, ingredient_id in upserted_ids.items()}
+
+
+async def bulk_write_ingredients(
+    db: AsyncIOMotorDatabase,
+    ingredients: List[Dict[str, Any]],
+    replace: bool = False
+) -> Tuple[Dict[int, ObjectId], int, Dict[int, str]]:
+    """
+    Writes a chunk of ingredients with one unordered bulk_write.
+
+    Without `replace`, each ingredient is inserted and one whose name already exists
+    fails on its own; with it, an existing ingredient of the same name is replaced
+    (keeping its _id). A failing document never stops the rest of the chunk.
+
+    Args:
+        db: The database connection.
+        ingredients: Validated ingredient documents, each with a 'name'.
+        replace: Whether to overwrite ingredients that already exist.
+
+    Returns:
+        The ObjectIds of newly created documents by position in `ingredients`, the
+        number of existing documents replaced, and an error message by position for
+        every document that was not written.
+
+    Raises:
+        PyMongoError: If the bulk write fails as a whole (e.g. the server is unreachable).
+    """
+    if not ingredients:
+        return {}, 0, {}
+    documents = [{**to_storage(ingredient), **search_fields(ingredient["name"])} for ingredient in ingredients]
+    if replace:
+        operations = [ReplaceOne({"name": document["name"]}, document, upsert=True) for document in documents]
+    else:
+        # IDs are assigned here because bulk_write does not report them for inserts
+        for document in documents:
+            document["_id"] = ObjectId()
+        operations = [InsertOne(document) for document in documents]
+    try:
+        details = (await db.ingredients.bulk_write(operations, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+
+    errors = {
+        error["index"]: (
+            f"Ingredient with name '{ingredients[error['index']]['name']}' already exists"
+            if error.get("code") == 11000 else error.get("errmsg", "write failed")
+        )
+        for error in details.get("writeErrors", [])
+    }
+    if replace:
+        created = {upsert["index"]: upsert["_id"] for upsert in details.get("upserted", [])}
+        return created, details.get("nMatched", 0), errors
+    return {index: document["_id"] for index, document in enumerate(documents) if index not in errors}, 0, errors
+
+
+def _keyset_filter(order_by: str, after: Optional[Any]) -> Dict[str, Any]:
+    if after is None:
+        return {}
+    return {order_by: {"$gt": after}}
+
+
+async def get_ingredients(
+    db: AsyncIOMotorDatabase,
+    limit: int,
+    after: Optional[Any] = None,
+    order_by: str = "_id"
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves one page of ingredient documents using keyset pagination.
+
+    Both supported sort keys ('_id' and the unique 'name') are indexed, so each
+    page is an index range scan regardless of how deep into the catalog it is.
+
+    Args:
+        db: The database connection.
+        limit: Maximum number of documents to return.
+        after: The sort key value of the last document of the previous page, or None for the first page.
+        order_by: The field to order by ('_id' or 'name').
+
+    Returns:
+        A list of dictionaries, each representing an ingredient document with '_id' stringified.
 
     Raises:
         PyMongoError: If a database error occurs during retrieval.
     """
-    logger.debug("Finding all ingredients in repository")
-    cursor = db.ingredients.find()
+    logger.debug("Finding ingredients page in repository (order_by={}, limit={})", order_by, limit)
+    cursor = db.ingredients.find(_keyset_filter(order_by, after), SEARCH_FIELDS_PROJECTION).sort(order_by, 1).limit(limit)
     # The service layer will handle potential PyMongoErrors here
-    ingredients = await cursor.to_list(length=None) # Use None for potentially large lists cautiously
-    logger.debug(f"Found {len(ingredients)} ingredients in repository")
+    ingredients = [from_storage(ingredient) for ingredient in await cursor.to_list(length=limit)]
+    logger.debug("Found {} ingredients in repository", len(ingredients))
     return ingredients
 
-async def search_ingredients(db: AsyncIOMotorDatabase, query: str) -> List[Dict[str, Any]]:
+
+def iter_ingredients(
+    db: AsyncIOMotorDatabase,
+    after: Optional[Any] = None,
+    order_by: str = "_id",
+    batch_size: int = 500
+) -> AsyncIOMotorCursor:
     """
-    Finds ingredient documents where the name matches the query (case-insensitive).
+    Returns a cursor over the ingredient catalog that fetches documents in batches.
+
+    Unlike get_ingredients, nothing is buffered beyond the current batch, so callers
+    can stream arbitrarily large catalogs with flat memory use.
+
+    Args:
+        db: The database connection.
+        after: Sort key value to resume after, or None to start from the beginning.
+        order_by: The field to order by ('_id' or 'name').
+        batch_size: Number of documents fetched per round trip.
+
+    Returns:
+        An async cursor yielding raw ingredient documents; pass each through from_storage.
+    """
+    logger.debug("Opening ingredient stream cursor (order_by={}, batch_size={})", order_by, batch_size)
+    return db.ingredients.find(_keyset_filter(order_by, after), SEARCH_FIELDS_PROJECTION).sort(order_by, 1).batch_size(batch_size)
+
+async def search_ingredients(
+    db: AsyncIOMotorDatabase,
+    query: str,
+    limit: int = 20,
+    substring_fallback: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Finds ingredient documents whose name matches the query, best matches first.
+
+    Matching runs against the normalized name fields stored at write time, in tiers
+    that stop as soon as `limit` results are collected:
+
+    1. Names starting with the query (anchored regex on the indexed
+       'name_normalized'; an exact match sorts first within this tier).
+    2. Names where every query word prefixes some word of the name (anchored
+       regex on the indexed multikey 'name_tokens').
+    3. Names containing the query anywhere (optional; walks the
+       'name_normalized' index rather than the documents).
+
+    User input is normalized and escaped before being embedded in any regex.
 
     Args:
         db: The database connection.
         query: The search string for the ingredient name.
+        limit: Maximum number of documents to return.
+        substring_fallback: Whether to run the substring tier when the prefix tiers come up short.
 
     Returns:
-        A list of dictionaries, each representing a matching ingredient document.
+        A list of dictionaries, each representing a matching ingredient document with '_id' stringified.
 
     Raises:
         PyMongoError: If a database error occurs during the search.
     """
-    logger.debug(f"Searching ingredients in repository with query: '{query}'")
-    # Use a case-insensitive regex search
-    search_filter = {"name": {"$regex": query, "$options": "i"}}
-    cursor = db.ingredients.find(search_filter)
-    # The service layer will handle potential PyMongoErrors here
-    ingredients = await cursor.to_list(length=None)
-    logger.debug(f"Found {len(ingredients)} ingredients in repository matching query '{query}'")
-    return ingredients
\ No newline at end of file
+    normalized = normalize_text(query)
+    tokens = tokenize(query)
+    if not normalized:
+        return []
+    logger.debug("Searching ingredients in repository with query: '{}' (limit={})", normalized, limit)
+
+    # Each tier is (filter, sorted_by_index). Only tiers filtering on 'name_normalized'
+    # are sorted in the query, since sorting on another field would steer the planner
+    # away from the index the filter needs; the token tier is ordered by name length.
+    tiers = [({"name_normalized": {"$regex": "^" + re.escape(normalized)}}, True)]
+    if tokens:
+        tiers.append(({"$and": [{"name_tokens": {"$regex": "^" + re.escape(token)}} for token in tokens]}, False))
+    if substring_fallback:
+        tiers.append(({"name_normalized": {"$regex": re.escape(normalized)}}, True))
+
+    ingredients: List[Dict[str, Any]] = []
+    seen: List[ObjectId] = []
+    for tier_filter, sorted_by_index in tiers:
+        remaining = limit - len(ingredients)
+        if remaining <= 0:
+            break
+        if seen:
+            tier_filter = {"$and": [tier_filter, {"_id": {"$nin": list(seen)}}]}
+        cursor = db.ingredients.find(tier_filter, SEARCH_FIELDS_PROJECTION)
+        if sorted_by_index:
+            cursor = cursor.sort("name_normalized", 1)
+        # The service layer will handle potential PyMongoErrors here
+        matches = await cursor.limit(remaining).to_list(length=remaining)
+        if not sorted_by_index:
+            matches.sort(key=lambda ingredient: len(ingredient["name"]))
+        for ingredient in matches:
+            seen.append(ingredient["_id"])
+            ingredients.append(from_storage(ingredient))
+
+    logger.debug("Found {} ingredients in repository matching query '{}'", len(ingredients), normalized)
+    return ingredients
+
+
+async def backfill_search_fields(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    """
+    Adds normalized search fields to ingredient documents written before they existed.
+
+    Args:
+        db: The database connection.
+        batch_size: Number of updates sent per bulk_write.
+
+    Returns:
+        The number of documents updated.
+
+    Raises:
+        PyMongoError: If a database error occurs during the backfill.
+    """
+    cursor = db.ingredients.find({"name_normalized": {"$exists": False}}, {"name": 1}).batch_size(batch_size)
+    updated = 0
+    batch: List[UpdateOne] = []
+    async for ingredient in cursor:
+        batch.append(UpdateOne({"_id": ingredient["_id"]}, {"$set": search_fields(ingredient["name"])}))
+        if len(batch) >= batch_size:
+            result = await db.ingredients.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await db.ingredients.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    if updated:
+        logger.info(f"Backfilled search fields on {updated} ingredients")
+    return updated
+
+
+async def migrate_nutrient_storage(db: AsyncIOMotorDatabase, target: str, batch_size: int = 1000) -> int:
+    """
+    Rewrites ingredient nutrients into the given storage format ("packed" or "map").
+
+    Only documents still in the other format are touched, so the migration can be
+    interrupted and re-run. Readers accept both formats throughout.
+
+    Args:
+        db: The database connection.
+        target: The format to convert to.
+        batch_size: Number of updates sent per bulk_write.
+
+    Returns:
+        The number of documents rewritten.
+
+    Raises:
+        PyMongoError: If a database error occurs during the migration.
+    """
+    if target == "packed":
+        query = {PACKED_NUTRIENTS_FIELD: {"$exists": False}, "nutrients": {"$exists": True}}
+    else:
+        query = {PACKED_NUTRIENTS_FIELD: {"$exists": True}}
+    cursor = db.ingredients.find(query, {"nutrients": 1, PACKED_NUTRIENTS_FIELD: 1}).batch_size(batch_size)
+    updated = 0
+    batch: List[UpdateOne] = []
+    async for ingredient in cursor:
+        if target == "packed":
+            packed = pack_document_nutrients(ingredient, settings.INGREDIENT_NUTRIENT_PACKED_PRECISION)
+            update: Dict[str, Any] = {"$set": {PACKED_NUTRIENTS_FIELD: packed[PACKED_NUTRIENTS_FIELD]}}
+            if "nutrients" in packed:
+                update["$set"]["nutrients"] = packed["nutrients"]
+            else:
+                update["$unset"] = {"nutrients": ""}
+        else:
+            update = {"$set": {"nutrients": unpack_document_nutrients(ingredient)["nutrients"]}, "$unset": {PACKED_NUTRIENTS_FIELD: ""}}
+        batch.append(UpdateOne({"_id": ingredient["_id"]}, update))
+        if len(batch) >= batch_size:
+            result = await db.ingredients.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await db.ingredients.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    logger.info(f"Rewrote nutrients of {updated} ingredients to {target} storage")
+    return updated
+
+
+# Single document in `catalog_versions` tracking the ingredient catalog as a whole
+CATALOG_VERSION_ID = "ingredients"
+
+
+async def get_catalog_version(db: AsyncIOMotorDatabase) -> Optional[Dict[str, Any]]:
+    """The catalog's {"version", "updated_at"} document, or None if the catalog was never written through the app."""
+    return await db.catalog_versions.find_one({"_id": CATALOG_VERSION_ID})
+
+
+async def bump_catalog_version(db: AsyncIOMotorDatabase) -> None:
+    """Increments the catalog version and stamps it with the server's current time."""
+    await db.catalog_versions.update_one(
+        {"_id": CATALOG_VERSION_ID},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+    )
@@ -1,15 +1,37 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+from datetime import datetime
+from app.core.nutrients import unpack_document_nutrients
+
+# Newest first with _id as tie-breaker; served by the (user_id, timestamp, _id) index
+MEAL_HISTORY_SORT = [("timestamp", -1), ("_id", -1)]
 
 async def create_meal(db: AsyncIOMotorDatabase, meal_data: dict) -> str:
     result = await db.meals.insert_one(meal_data)
     return str(result.inserted_id)
 
+async def create_meals(db: AsyncIOMotorDatabase, meals: list[dict]) -> tuple[list[str], dict[int, str]]:
+    # One unordered insert_many: a document that fails does not stop the others.
+    # IDs are assigned up front so each position maps to its ID either way.
+    for meal in meals:
+        meal["_id"] = ObjectId()
+    errors = {}
+    if meals:
+        try:
+            await db.meals.insert_many(meals, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error.get("errmsg", "write failed") for error in e.details.get("writeErrors", [])}
+    return [str(meal["_id"]) for meal in meals], errors
+
 async def get_meals_by_user(db: AsyncIOMotorDatabase, user_id: str) -> list:
     cursor = db.meals.find({"user_id": user_id})
     return await cursor.to_list(length=None)
 
 async def get_last_meal_by_user(db: AsyncIOMotorDatabase, user_id: str) -> dict | None:
-    cursor = db.meals.find({"user_id": user_id}).sort("timestamp", -1).limit(1)
+    cursor = db.meals.find({"user_id": user_id}).sort(MEAL_HISTORY_SORT).limit(1)
     meal_list = await cursor.to_list(length=1)
     if not meal_list:
         return None
@@ -17,11 +39,106 @@ async def get_last_meal_by_user(db: AsyncIOMotorDatabase, user_id: str) -> dict
     meal['_id'] = str(meal['_id'])
     return meal
 
-async def get_meals_by_user_paginated(db: AsyncIOMotorDatabase, user_id: str, page: int, page_size: int) -> tuple[list, int]:
+async def get_meals_by_user_page(db: AsyncIOMotorDatabase, user_id: str, page: int, page_size: int) -> list:
     skip = (page - 1) * page_size
-    cursor = db.meals.find({"user_id": user_id}).skip(skip).limit(page_size)
+    cursor = db.meals.find({"user_id": user_id}).sort(MEAL_HISTORY_SORT).skip(skip).limit(page_size)
     meals = await cursor.to_list(length=page_size)
     for meal in meals:
         meal['_id'] = str(meal['_id'])  # Convert ObjectId to string for consistency
-    total = await db.meals.count_documents({"user_id": user_id})
-    return meals, total
\ No newline at end of file
+    return meals
+
+async def count_meals_by_user(db: AsyncIOMotorDatabase, user_id: str) -> int:
+    return await db.meals.count_documents({"user_id": user_id})
+
+async def get_meals_by_user_paginated(db: AsyncIOMotorDatabase, user_id: str, page: int, page_size: int) -> tuple[list, int]:
+    # The page and the exact count are independent, so run them concurrently
+    meals, total = await asyncio.gather(
+        get_meals_by_user_page(db, user_id, page, page_size),
+        count_meals_by_user(db, user_id),
+    )
+    return meals, total
+
+async def get_meal_count(db: AsyncIOMotorDatabase, user_id: str) -> int | None:
+    counter = await db.meal_counters.find_one({"_id": user_id}, {"count": 1})
+    return counter["count"] if counter else None
+
+async def init_meal_count(db: AsyncIOMotorDatabase, user_id: str, count: int) -> int:
+    # Raises the counter to at least `count` (creating it if needed) and returns the stored value.
+    # $max rather than $setOnInsert: an exact count taken later must not lose to an earlier one
+    counter = await db.meal_counters.find_one_and_update(
+        {"_id": user_id},
+        {"$max": {"count": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["count"]
+
+async def increment_meal_count(db: AsyncIOMotorDatabase, user_id: str, amount: int = 1) -> None:
+    # Counters are created on first read (from an exact count), so only existing ones are bumped
+    await db.meal_counters.update_one({"_id": user_id}, {"$inc": {"count": amount}})
+
+async def set_meal_counts(db: AsyncIOMotorDatabase, counts: dict[str, int], user_id: str | None = None) -> None:
+    # Dropping counters first is safe: a missing counter is re-seeded from an exact count on read
+    await db.meal_counters.delete_many({"_id": user_id} if user_id is not None else {})
+    if counts:
+        await db.meal_counters.bulk_write(
+            [UpdateOne({"_id": user_id}, {"$set": {"count": count}}, upsert=True) for user_id, count in counts.items()],
+            ordered=False,
+        )
+
+async def count_meals_per_user(db: AsyncIOMotorDatabase, user_id: str | None = None) -> dict[str, int]:
+    pipeline = [{"$group": {"_id": "$user_id", "count": {"$sum": 1}}}]
+    if user_id is not None:
+        pipeline.insert(0, {"$match": {"user_id": user_id}})
+    return {group["_id"]: group["count"] async for group in db.meals.aggregate(pipeline)}
+
+async def get_meals_by_user_after(db: AsyncIOMotorDatabase, user_id: str, limit: int, after: tuple[datetime, ObjectId] | None = None) -> list:
+    # Keyset pagination: continue strictly after the (timestamp, _id) of the previous
+    # page's last meal, so every page is an index range scan regardless of depth.
+    query = {"user_id": user_id}
+    if after is not None:
+        timestamp, meal_id = after
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": meal_id}},
+        ]
+    cursor = db.meals.find(query).sort(MEAL_HISTORY_SORT).limit(limit)
+    meals = await cursor.to_list(length=limit)
+    for meal in meals:
+        meal['_id'] = str(meal['_id'])
+    return meals
+
+async def get_meal_with_ingredients(db: AsyncIOMotorDatabase, meal_id: ObjectId, user_id: str) -> dict | None:
+    # Meals store ingredient IDs as strings while ingredients are keyed by ObjectId,
+    # so convert them inside the pipeline and join on the _id index in one round trip.
+    pipeline = [
+        {"$match": {"_id": meal_id, "user_id": user_id}},
+        {"$limit": 1},
+        {"$addFields": {"_ingredient_oids": {"$map": {
+            "input": {"$ifNull": ["$ingredients", []]},
+            "as": "item",
+            "in": {"$convert": {"input": "$$item.ingredient_id", "to": "objectId", "onError": None, "onNull": None}},
+        }}}},
+        {"$lookup": {
+            "from": "ingredients",
+            "localField": "_ingredient_oids",
+            "foreignField": "_id",
+            "as": "_ingredient_docs",
+        }},
+        {"$project": {"_ingredient_oids": 0, "_ingredient_docs.name_normalized": 0, "_ingredient_docs.name_tokens": 0}},
+    ]
+    meals = await db.meals.aggregate(pipeline).to_list(length=1)
+    if not meals:
+        return None
+    meal = meals[0]
+    meal['_id'] = str(meal['_id'])
+    for ingredient in meal.get("_ingredient_docs", []):
+        unpack_document_nutrients(ingredient)
+    return meal
+
+async def get_meals_by_ids(db: AsyncIOMotorDatabase, meal_ids: list[ObjectId], user_id: str, projection: dict | None = None) -> list:
+    cursor = db.meals.find({"_id": {"$in": meal_ids}, "user_id": user_id}, projection)
+    meals = await cursor.to_list(length=len(meal_ids))
+    for meal in meals:
+        meal['_id'] = str(meal['_id'])
+    return meals
@@ -0,0 +1,95 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+from typing import Any, Dict, List, Optional, Tuple
+
+
+async def increment_daily_rollup(db: AsyncIOMotorDatabase, user_id: str, date: str, nutrients: Dict[str, float], meal_count: int = 1) -> None:
+    """
+    Atomically adds one meal's nutrients to the (user_id, date) rollup, creating it if needed.
+
+    Args:
+        db: The database connection.
+        user_id: The owner of the meal.
+        date: The UTC day as YYYY-MM-DD.
+        nutrients: Totals keyed by registry nutrient name (names never contain dots).
+        meal_count: How many meals the nutrients cover.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    await db.daily_rollups.update_one({"user_id": user_id, "date": date}, _increment(nutrients, meal_count), upsert=True)
+
+
+async def increment_daily_rollups(db: AsyncIOMotorDatabase, increments: List[Tuple[str, str, Dict[str, float], int]]) -> None:
+    """
+    Applies several (user_id, date, nutrients, meal_count) increments with one unordered bulk_write.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    if increments:
+        await db.daily_rollups.bulk_write(
+            [
+                UpdateOne({"user_id": user_id, "date": date}, _increment(nutrients, meal_count), upsert=True)
+                for user_id, date, nutrients, meal_count in increments
+            ],
+            ordered=False,
+        )
+
+
+def _increment(nutrients: Dict[str, float], meal_count: int) -> Dict[str, Any]:
+    increments: Dict[str, Any] = {f"nutrients.{name}": value for name, value in nutrients.items()}
+    increments["meal_count"] = meal_count
+    return {"$inc": increments}
+
+
+async def get_daily_rollups(db: AsyncIOMotorDatabase, user_id: str, start: str, end: str) -> List[Dict[str, Any]]:
+    """
+    Fetches a user's rollups for the inclusive date range [start, end], oldest first.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    cursor = db.daily_rollups.find(
+        {"user_id": user_id, "date": {"$gte": start, "$lte": end}},
+        {"_id": 0, "date": 1, "meal_count": 1, "nutrients": 1},
+    ).sort("date", 1)
+    return await cursor.to_list(length=None)
+
+
+async def replace_daily_rollups(db: AsyncIOMotorDatabase, rollups: List[Dict[str, Any]], user_id: Optional[str] = None) -> int:
+    """
+    Replaces the rollups of one user (or of everyone) with freshly computed documents.
+
+    Rollups are overwritten in place with one unordered bulk write that stamps them
+    with a rebuild marker; rollups in scope without the marker (days that no longer
+    have meals) are then removed.
+
+    Args:
+        db: The database connection.
+        rollups: Documents with user_id, date, meal_count and nutrients.
+        user_id: Limit the replacement to this user; None replaces all rollups.
+
+    Returns:
+        The number of rollups written.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    scope = {"user_id": user_id} if user_id is not None else {}
+    rebuild_id = ObjectId()
+    if rollups:
+        await db.daily_rollups.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": rollup["user_id"], "date": rollup["date"]},
+                    {"$set": {"meal_count": rollup["meal_count"], "nutrients": rollup["nutrients"], "rebuild_id": rebuild_id}},
+                    upsert=True,
+                )
+                for rollup in rollups
+            ],
+            ordered=False,
+        )
+    await db.daily_rollups.delete_many({**scope, "rebuild_id": {"$ne": rebuild_id}})
+    return len(rollups)
@@ -5,4 +5,7 @@ async def create_user(db: AsyncIOMotorDatabase, user_data: dict) -> str:
     return str(result.inserted_id)
 
 async def get_user_by_username(db: AsyncIOMotorDatabase, username: str) -> dict:
-    return await db.users.find_one({"username": username})
\ No newline at end of file
+    return await db.users.find_one({"username": username})
+
+async def update_user_password(db: AsyncIOMotorDatabase, user_id, hashed_password: str) -> None:
+    await db.users.update_one({"_id": user_id}, {"$set": {"password": hashed_password}})
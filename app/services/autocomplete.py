@@ -0,0 +1,331 @@
+import asyncio
+import heapq
+import sys
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.text import normalize_text, split_words, tokenize
+
+# Cap on vocabulary words considered per query word (prefix expansions and fuzzy matches)
+_MAX_WORDS_PER_TOKEN = 32
+
+
+def word_trigrams(word: str) -> List[str]:
+    """Distinct trigrams of a single normalized word."""
+    # Two leading spaces let the first letters form trigrams of their own, so
+    # typos later in the word still leave the start of it matchable.
+    padded = f"  {word} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+class TrigramIndex:
+    """
+    In-memory, typo-tolerant autocomplete index over ingredient names.
+
+    Names are split into words. Fuzzy matching runs against the vocabulary of
+    distinct words (much smaller than the catalog) using trigram similarity, and
+    each vocabulary word keeps a posting list of the names containing it, ordered
+    so that names starting with the word come first and shorter names before
+    longer ones. A query therefore walks the postings of its best-matching words
+    in rank order and stops after a bounded number of candidates, so latency does
+    not grow with the catalog size.
+    """
+
+    def __init__(self, min_similarity: float = 0.5, candidate_budget: int = 64):
+        self.min_similarity = min_similarity
+        self.candidate_budget = candidate_budget
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def clear(self) -> None:
+        # Per-name data, indexed by slot
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._normalized: List[str] = []
+        self._name_words: List[Tuple[int, ...]] = []
+        self._slots: Dict[str, int] = {}
+        # Vocabulary data, indexed by word id
+        self._words: List[str] = []
+        self._word_ids: Dict[str, int] = {}
+        self._sorted_words: List[str] = []
+        self._word_postings: List[List[int]] = []
+        self._trigram_words: Dict[str, array] = {}
+        # Adds received between start_build and finish_build
+        self._pending: Optional[List[Tuple[str, str]]] = None
+        self.ready = False
+        self.build_seconds = 0.0
+        self._memory_bytes = 0
+
+    def _posting_rank(self, slot: int, word_id: int) -> Tuple[int, int]:
+        return (0 if self._name_words[slot][0] == word_id else 1, len(self._normalized[slot]))
+
+    def _word_id(self, word: str, keep_sorted: bool = True) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._words)
+            self._words.append(word)
+            self._word_postings.append([])
+            self._memory_bytes += sys.getsizeof(word) + sys.getsizeof(self._word_postings[-1])
+            if keep_sorted:
+                insort(self._sorted_words, word)
+            for gram in word_trigrams(word):
+                posting = self._trigram_words.get(gram)
+                if posting is None:
+                    posting = self._trigram_words[gram] = array("I")
+                    self._memory_bytes += sys.getsizeof(gram) + sys.getsizeof(posting)
+                posting.append(word_id)
+        return word_id
+
+    def _append(self, ingredient_id: str, name: str, keep_sorted: bool) -> None:
+        if ingredient_id in self._slots:
+            return
+        normalized = normalize_text(name)
+        words = tuple(dict.fromkeys(self._word_id(word, keep_sorted) for word in split_words(normalized)))
+        if not words:
+            return
+        slot = len(self._ids)
+        self._slots[ingredient_id] = slot
+        self._ids.append(ingredient_id)
+        self._names.append(name)
+        self._normalized.append(normalized)
+        self._name_words.append(words)
+        self._memory_bytes += sum(sys.getsizeof(value) for value in (ingredient_id, name, normalized, words))
+        for word_id in words:
+            posting = self._word_postings[word_id]
+            if keep_sorted:
+                insort(posting, slot, key=lambda other: self._posting_rank(other, word_id))
+            else:
+                posting.append(slot)
+
+    @property
+    def building(self) -> bool:
+        return self._pending is not None
+
+    def start_build(self) -> None:
+        """Marks a build as under way: until `finish_build`, `add` also queues ingredients to replay into the new contents."""
+        self._pending = []
+
+    def finish_build(self, built: "TrigramIndex") -> None:
+        """Takes over the contents of `built`, a freshly built index, and replays the adds queued since `start_build`."""
+        pending = self._pending or []
+        # A plain attribute swap, so searches see either the old or the new contents
+        vars(self).update(vars(built))
+        self._pending = None
+        for ingredient_id, name in pending:
+            self._append(ingredient_id, name, keep_sorted=True)
+
+    def cancel_build(self) -> None:
+        """Stops queueing adds for a rebuild that will not finish; the current contents stay."""
+        self._pending = None
+
+    def add(self, ingredient_id: str, name: str) -> None:
+        """Indexes one ingredient, keeping postings in rank order. Re-adding a known ID is a no-op."""
+        if self._pending is not None:
+            self._pending.append((ingredient_id, name))
+            if not self.ready:
+                return
+        self._append(ingredient_id, name, keep_sorted=True)
+
+    def build(self, ingredients: Iterable[Tuple[str, str]]) -> None:
+        """
+        Replaces the index contents with (id, name) pairs.
+
+        Postings and the vocabulary are sorted once at the end, which is much
+        cheaper than keeping them ordered on every insert.
+        """
+        start = time.perf_counter()
+        self.clear()
+        for ingredient_id, name in ingredients:
+            self._append(ingredient_id, name, keep_sorted=False)
+        self._sorted_words = sorted(self._words)
+        for word_id, posting in enumerate(self._word_postings):
+            posting.sort(key=lambda slot: self._posting_rank(slot, word_id))
+        self._memory_bytes = self._measure_memory()
+        self.build_seconds = time.perf_counter() - start
+        self.ready = True
+
+    def _match_words(self, token: str, partial: bool) -> Dict[int, float]:
+        """
+        Vocabulary words matching one query token, mapped to a score in (0, 1].
+
+        Exact words score 1.0; for the token being typed, words it prefixes score
+        between 0.5 and 0.9; otherwise words with enough trigram overlap score
+        their (Dice) similarity scaled to at most 0.8.
+        """
+        matches: Dict[int, float] = {}
+        exact = self._word_ids.get(token)
+        if exact is not None:
+            matches[exact] = 1.0
+        if partial:
+            start = bisect_left(self._sorted_words, token)
+            for word in self._sorted_words[start:start + _MAX_WORDS_PER_TOKEN]:
+                if not word.startswith(token):
+                    break
+                matches.setdefault(self._word_ids[word], 0.5 + 0.4 * len(token) / len(word))
+        if len(token) >= 3:
+            grams = word_trigrams(token)
+            overlaps: Counter = Counter()
+            for gram in grams:
+                overlaps.update(self._trigram_words.get(gram, ()))
+            for word_id, overlap in overlaps.items():
+                if word_id in matches:
+                    continue
+                similarity = 2 * overlap / (len(grams) + len(self._words[word_id]) + 1)
+                if similarity >= self.min_similarity:
+                    matches[word_id] = 0.8 * similarity
+        if len(matches) > _MAX_WORDS_PER_TOKEN:
+            matches = dict(heapq.nlargest(_MAX_WORDS_PER_TOKEN, matches.items(), key=lambda item: item[1]))
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, object]]:
+        """
+        Returns up to `limit` suggestions ordered by score.
+
+        Every query word must match some word of the name (exactly, as a prefix
+        for the last, still-typed word, or fuzzily). The score averages the word
+        match scores, plus 1.0 when the name starts with the query and 2.0 when
+        it equals it.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        per_token = []
+        for position, token in enumerate(tokens):
+            matches = self._match_words(token, partial=position == len(tokens) - 1)
+            if not matches:
+                return []
+            per_token.append(matches)
+
+        # Drive from the token whose matched words cover the fewest names
+        driver = min(per_token, key=lambda matches: sum(len(self._word_postings[w]) for w in matches))
+        others = [matches for matches in per_token if matches is not driver]
+
+        normalized_query = normalize_text(query)
+        scored = []
+        seen = set()
+        budget = max(self.candidate_budget, 4 * limit)
+        for word_id, word_score in sorted(driver.items(), key=lambda item: -item[1]):
+            for slot in self._word_postings[word_id]:
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                words = self._name_words[slot]
+                score = word_score
+                for matches in others:
+                    best = 0.0
+                    for other_word in words:
+                        other_score = matches.get(other_word, 0.0)
+                        if other_score > best:
+                            best = other_score
+                    if not best:
+                        break
+                    score += best
+                else:
+                    score /= len(tokens)
+                    normalized_name = self._normalized[slot]
+                    if normalized_name == normalized_query:
+                        score += 2.0
+                    elif normalized_name.startswith(normalized_query):
+                        score += 1.0
+                    # Ties go to names starting with the matched word, then to shorter names
+                    scored.append((score, words[0] == word_id, -len(normalized_name), slot))
+                    if len(scored) >= budget:
+                        break
+            if len(scored) >= budget:
+                break
+
+        return [
+            {"_id": self._ids[slot], "name": self._names[slot], "score": round(score, 4)}
+            for score, _, _, slot in heapq.nlargest(limit, scored)
+        ]
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory held by the index structures, in bytes.
+
+        Measured in full by `build` and grown by `add` for the objects it creates
+        (ignoring container growth), as a full walk is far too slow for /metrics.
+        """
+        return self._memory_bytes
+
+    def _measure_memory(self) -> int:
+        containers = (
+            self._ids, self._names, self._normalized, self._name_words, self._slots,
+            self._words, self._word_ids, self._sorted_words, self._word_postings, self._trigram_words,
+        )
+        size = sum(sys.getsizeof(container) for container in containers)
+        for values in (self._ids, self._names, self._normalized, self._name_words, self._words, self._word_postings):
+            size += sum(sys.getsizeof(value) for value in values)
+        size += sum(sys.getsizeof(gram) + sys.getsizeof(posting) for gram, posting in self._trigram_words.items())
+        return size
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "ready": self.ready,
+            "entries": len(self._ids),
+            "words": len(self._words),
+            "trigrams": len(self._trigram_words),
+            "memory_bytes": self.memory_bytes(),
+            "build_seconds": round(self.build_seconds, 4),
+        }
+
+
+# Process-wide index, built in the background by app.main.lifespan when AUTOCOMPLETE_INDEX_ENABLED is set
+autocomplete_index = TrigramIndex(min_similarity=settings.AUTOCOMPLETE_MIN_SIMILARITY)
+
+
+async def build_autocomplete_index(db: AsyncIOMotorDatabase, index: Optional[TrigramIndex] = None) -> TrigramIndex:
+    """
+    Builds the index from the ingredients collection, reading names only.
+
+    The new index is built in a worker thread (seconds of CPU time for a large
+    catalog) and swapped in when done; until then the current contents keep
+    serving searches, and ingredients indexed in the meantime are replayed into
+    the new index. If the collection cannot be read the error is logged and the
+    index is left as it was, so before the first build autocomplete keeps using
+    the database search.
+
+    Args:
+        db: The database connection.
+        index: The index to (re)build; defaults to the process-wide index.
+
+    Returns:
+        The index.
+    """
+    index = index if index is not None else autocomplete_index
+    index.start_build()
+    try:
+        cursor = db.ingredients.find({}, {"name": 1}).batch_size(5000)
+        names = [(str(ingredient["_id"]), ingredient["name"]) async for ingredient in cursor]
+        built = TrigramIndex(min_similarity=index.min_similarity, candidate_budget=index.candidate_budget)
+        await asyncio.to_thread(built.build, names)
+    except PyMongoError as e:
+        index.cancel_build()
+        logger.error(f"Could not build the autocomplete index: {e}")
+        return index
+    except asyncio.CancelledError:
+        index.cancel_build()
+        raise
+    index.finish_build(built)
+    stats = index.stats()
+    logger.info(
+        f"Autocomplete index built: {stats['entries']} names, {stats['words']} words, "
+        f"{stats['memory_bytes'] / 1_048_576:.1f} MiB in {stats['build_seconds']:.3f}s"
+    )
+    return index
+
+
+def index_ingredient(ingredient_id: str, name: str) -> None:
+    """Adds a newly inserted ingredient to the process-wide index once a build of it has started."""
+    if autocomplete_index.ready or autocomplete_index.building:
+        autocomplete_index.add(ingredient_id, name)
@@ -1,7 +1,11 @@
-from app.models.ingredient import Ingredient, IngredientCreate
+from app.models.ingredient import Ingredient, IngredientCreate, IngredientList
 from app.repositories.ingredient import (
+    bump_catalog_version as repo_bump_catalog_version,
     create_ingredient as repo_create_ingredient,
+    from_storage,
+    get_catalog_version as repo_get_catalog_version,
     get_ingredients as repo_get_ingredients,
+    iter_ingredients as repo_iter_ingredients,
     search_ingredients as repo_search_ingredients
 )
 from app.exceptions.ingredient import (
@@ -13,8 +17,51 @@ from app.exceptions.ingredient import (
 from loguru import logger
 from pymongo.errors import PyMongoError
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List # Removed Dict
+from typing import List, Optional, Tuple, Any, AsyncIterator
+from datetime import datetime
 from bson import ObjectId # Import ObjectId
+from app.core.config import settings
+from app.services.autocomplete import index_ingredient
+from app.services.ingredient_cache import ingredient_cache
+from app.core.pagination import encode_cursor, decode_cursor
+from app.exceptions.pagination import InvalidCursorError
+
+async def get_catalog_version(db: AsyncIOMotorDatabase) -> Tuple[int, Optional[datetime]]:
+    """
+    Returns the ingredient catalog's version and when it last changed.
+
+    The version goes up on every ingredient write made through the services, so
+    clients can revalidate catalog reads with one point lookup instead of a query.
+
+    Returns:
+        A tuple of (version, updated_at); (0, None) if the catalog was never written.
+
+    Raises:
+        IngredientRetrievalError: If a database error occurs.
+    """
+    try:
+        catalog = await repo_get_catalog_version(db)
+    except PyMongoError as e:
+        logger.error(f"Database error while reading the ingredient catalog version: {e}")
+        raise IngredientRetrievalError(f"Failed to read the ingredient catalog version due to a database error: {e}")
+    if catalog is None:
+        return 0, None
+    return catalog.get("version", 0), catalog.get("updated_at")
+
+
+async def bump_catalog_version(db: AsyncIOMotorDatabase) -> None:
+    """
+    Marks the ingredient catalog as changed after a write.
+
+    The write itself has succeeded by then, so a failure is logged rather than
+    raised; clients revalidating in the meantime may keep a stale copy until
+    the next ingredient write.
+    """
+    try:
+        await repo_bump_catalog_version(db)
+    except PyMongoError as e:
+        logger.error(f"Failed to bump the ingredient catalog version: {e}")
+
 
 async def create_ingredient(db: AsyncIOMotorDatabase, ingredient_data: IngredientCreate) -> Ingredient:
     """
@@ -34,12 +81,15 @@ async def create_ingredient(db: AsyncIOMotorDatabase, ingredient_data: Ingredien
     try:
         # Convert Pydantic model to dictionary for the repository layer
         ingredient_dict = ingredient_data.model_dump()
-        logger.info(f"Attempting to create ingredient: {ingredient_dict.get('name')}")
+        logger.info("Attempting to create ingredient: {}", ingredient_dict.get("name"))
 
         # Call repository to insert the ingredient data
         # Repository now returns ObjectId
         ingredient_id_obj = await repo_create_ingredient(db, ingredient_dict)
-        logger.info(f"Ingredient created with ID: {ingredient_id_obj}")
+        logger.info("Ingredient created with ID: {}", ingredient_id_obj)
+        index_ingredient(str(ingredient_id_obj), ingredient_dict["name"])
+        await ingredient_cache.invalidate([str(ingredient_id_obj)], [ingredient_dict["name"]])
+        await bump_catalog_version(db)
 
         # Construct the full data for the Ingredient model, matching its fields
         created_ingredient_data = {
@@ -66,30 +116,59 @@ async def create_ingredient(db: AsyncIOMotorDatabase, ingredient_data: Ingredien
         raise IngredientCreationError(f"An unexpected error occurred while creating ingredient '{ingredient_data.name}'.")
 
 
-async def get_ingredients(db: AsyncIOMotorDatabase) -> List[Ingredient]:
+def _decode_ingredient_cursor(after: Optional[str], order_by: str) -> Optional[Any]:
+    """Turns an opaque 'after' token back into the sort key value it was issued for."""
+    if after is None:
+        return None
+    payload = decode_cursor(after)
+    if payload.get("o") != order_by or "v" not in payload:
+        raise InvalidCursorError(f"Cursor was not issued for ordering by '{order_by}'")
+    if order_by == "_id":
+        if not ObjectId.is_valid(payload["v"]):
+            raise InvalidCursorError("Invalid pagination cursor")
+        return ObjectId(payload["v"])
+    return payload["v"]
+
+
+async def get_ingredients(
+    db: AsyncIOMotorDatabase,
+    limit: int = 100,
+    after: Optional[str] = None,
+    order_by: str = "_id"
+) -> Tuple[List[Ingredient], Optional[str]]:
     """
-    Retrieves all ingredients from the database.
+    Retrieves one page of ingredients from the database.
 
     Args:
         db: The database connection.
+        limit: Maximum number of ingredients in the page.
+        after: Opaque cursor returned as next_cursor by the previous page.
+        order_by: Sort key, either '_id' or 'name'.
 
     Returns:
-        List of Ingredient objects.
+        A tuple of the Ingredient objects in the page and the cursor for the next
+        page (None when this is the last page).
 
     Raises:
+        InvalidCursorError: If the cursor is malformed or issued for another ordering.
         IngredientRetrievalError: If a database error occurs during retrieval.
     """
+    after_value = _decode_ingredient_cursor(after, order_by)
     try:
-        logger.info("Fetching all ingredients")
-        # Fetch the list of ingredient dictionaries from the repository
-        ingredients_data = await repo_get_ingredients(db)
-        logger.info(f"Retrieved {len(ingredients_data)} ingredients from repository")
-
-        # Convert each dictionary to an Ingredient Pydantic model
-        # model_validate handles the '_id' alias automatically
-        ingredients = [Ingredient.model_validate(ing_data) for ing_data in ingredients_data]
-        logger.info(f"Successfully validated {len(ingredients)} Ingredient models")
-        return ingredients
+        logger.debug("Fetching ingredients page (order_by={}, limit={})", order_by, limit)
+        # Ask for one extra document to learn whether another page exists
+        ingredients_data = await repo_get_ingredients(db, limit + 1, after_value, order_by)
+        has_more = len(ingredients_data) > limit
+        ingredients_data = ingredients_data[:limit]
+        logger.info("Retrieved {} ingredients from repository", len(ingredients_data))
+
+        # Validate the whole page in one call; the '_id' alias is handled automatically
+        ingredients = IngredientList.validate_python(ingredients_data)
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor({"o": order_by, "v": ingredients_data[-1][order_by]})
+        return ingredients, next_cursor
 
     except PyMongoError as e:
         logger.error(f"Database error while fetching ingredients: {e}")
@@ -100,29 +179,73 @@ async def get_ingredients(db: AsyncIOMotorDatabase) -> List[Ingredient]:
         raise IngredientRetrievalError(f"An unexpected error occurred while retrieving ingredients.")
 
 
-async def search_ingredients(db: AsyncIOMotorDatabase, query: str) -> List[Ingredient]:
+def stream_ingredients(
+    db: AsyncIOMotorDatabase,
+    after: Optional[str] = None,
+    order_by: str = "_id"
+) -> AsyncIterator[bytes]:
+    """
+    Streams the ingredient catalog as NDJSON, one serialized ingredient per line.
+
+    The cursor is decoded eagerly so that a bad token is reported before the
+    response starts; documents are then validated and serialized one at a time
+    as the Motor cursor delivers each batch.
+
+    Args:
+        db: The database connection.
+        after: Optional opaque cursor to resume after.
+        order_by: Sort key, either '_id' or 'name'.
+
+    Returns:
+        An async iterator of newline-terminated JSON documents.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or issued for another ordering.
+    """
+    after_value = _decode_ingredient_cursor(after, order_by)
+
+    async def generate() -> AsyncIterator[bytes]:
+        count = 0
+        try:
+            cursor = repo_iter_ingredients(db, after_value, order_by, settings.INGREDIENT_STREAM_BATCH_SIZE)
+            async for ing_data in cursor:
+                from_storage(ing_data)
+                yield Ingredient.model_validate(ing_data).model_dump_json(by_alias=True).encode() + b"\n"
+                count += 1
+        except PyMongoError as e:
+            # Headers are already sent at this point, so the stream is simply cut short
+            logger.error(f"Database error while streaming ingredients after {count} documents: {e}")
+            return
+        logger.info("Streamed {} ingredients", count)
+
+    return generate()
+
+
+async def search_ingredients(db: AsyncIOMotorDatabase, query: str, limit: int = 20) -> List[Ingredient]:
     """
-    Searches for ingredients by name matching the query (case-insensitive).
+    Searches for ingredients by name matching the query (case- and accent-insensitive).
 
     Args:
         db: The database connection.
         query: The search query string.
+        limit: Maximum number of results.
 
     Returns:
-        List of Ingredient objects matching the query.
+        List of Ingredient objects matching the query, exact and prefix matches first.
 
     Raises:
         IngredientSearchError: If a database error occurs during search.
     """
-    logger.info(f"Searching ingredients with query: '{query}'")
+    logger.debug("Searching ingredients with query: '{}'", query)
     try:
         # Fetch matching ingredient dictionaries from the repository
-        ingredients_data = await repo_search_ingredients(db, query)
-        logger.info(f"Found {len(ingredients_data)} ingredients matching query '{query}' in repository")
+        ingredients_data = await repo_search_ingredients(
+            db, query, limit=limit, substring_fallback=settings.INGREDIENT_SEARCH_SUBSTRING_FALLBACK
+        )
+        logger.info("Found {} ingredients matching query '{}' in repository", len(ingredients_data), query)
 
-        # Convert each dictionary to an Ingredient Pydantic model
-        ingredients = [Ingredient.model_validate(ing_data) for ing_data in ingredients_data]
-        logger.info(f"Successfully validated {len(ingredients)} matching Ingredient models")
+        ingredients = IngredientList.validate_python(ingredients_data)
+        logger.debug("Successfully validated {} matching Ingredient models", len(ingredients))
         return ingredients
 
     except PyMongoError as e:
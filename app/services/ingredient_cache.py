@@ -0,0 +1,181 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.repositories.ingredient import get_ingredient_ids_by_name, get_ingredients_by_ids
+
+_REDIS_PREFIX = "ingredient:"
+
+
+class IngredientCache:
+    """
+    Read-through, two-tier cache for ingredient documents and name -> ID lookups.
+
+    Lookups try the in-process TTL/LRU tier first, then (when configured) a shared
+    Redis tier with one MGET, and finally Mongo with one $in query; whatever is
+    loaded is written back to both tiers. Ingredients are effectively immutable,
+    so entries are only invalidated by ingredient writes. Another process's writes
+    reach this process's local tier at most `ttl` seconds later.
+
+    Redis failures are logged and counted but never fail a lookup.
+    Returned documents are shared with the cache and must not be mutated.
+    """
+
+    def __init__(self, max_size: int, ttl: float, redis_ttl: int):
+        self.local = TTLCache(max_size, ttl)
+        self.redis: Optional[Redis] = None
+        self.redis_ttl = redis_ttl
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        self.db_loads = 0
+
+    async def _read_through(self, keys: List[str], load) -> Dict[str, Any]:
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+
+        if missing and self.redis is not None:
+            try:
+                values = await self.redis.mget([_REDIS_PREFIX + key for key in missing])
+            except RedisError as e:
+                self.redis_errors += 1
+                logger.warning(f"Ingredient cache Redis read failed: {e}")
+            else:
+                for key, value in zip(missing, values):
+                    if value is None:
+                        self.redis_misses += 1
+                        continue
+                    self.redis_hits += 1
+                    found[key] = json.loads(value)
+                    self.local.set(key, found[key])
+                missing = [key for key in missing if key not in found]
+
+        if missing:
+            loaded = await load(missing)
+            self.db_loads += len(missing)
+            for key, value in loaded.items():
+                found[key] = value
+                self.local.set(key, value)
+            if loaded and self.redis is not None:
+                try:
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        for key, value in loaded.items():
+                            pipe.set(_REDIS_PREFIX + key, json.dumps(value, default=str), ex=self.redis_ttl)
+                        await pipe.execute()
+                except RedisError as e:
+                    self.redis_errors += 1
+                    logger.warning(f"Ingredient cache Redis write failed: {e}")
+        return found
+
+    async def get_many(self, db: AsyncIOMotorDatabase, ingredient_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Ingredient documents (without search fields, `_id` as a string) for the given IDs.
+
+        Args:
+            db: The database connection.
+            ingredient_ids: Ingredient ID strings; malformed IDs are ignored.
+
+        Returns:
+            The documents that exist, keyed by ID string.
+
+        Raises:
+            PyMongoError: If the Mongo fallback fails.
+        """
+        ids = [ingredient_id for ingredient_id in dict.fromkeys(ingredient_ids) if ObjectId.is_valid(ingredient_id)]
+        if not ids:
+            return {}
+        if not settings.INGREDIENT_CACHE_ENABLED:
+            return await self._load_documents(db, ids)
+
+        async def load(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+            documents = await self._load_documents(db, [key[len("id:"):] for key in keys])
+            return {f"id:{ingredient_id}": document for ingredient_id, document in documents.items()}
+
+        found = await self._read_through([f"id:{ingredient_id}" for ingredient_id in ids], load)
+        return {key[len("id:"):]: document for key, document in found.items()}
+
+    async def get_ids_by_name(self, db: AsyncIOMotorDatabase, names: Iterable[str]) -> Dict[str, ObjectId]:
+        """
+        Ingredient IDs for the given exact names, for those that exist.
+
+        Raises:
+            PyMongoError: If the Mongo fallback fails.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        if not settings.INGREDIENT_CACHE_ENABLED:
+            return await get_ingredient_ids_by_name(db, names)
+
+        async def load(keys: List[str]) -> Dict[str, str]:
+            ids = await get_ingredient_ids_by_name(db, [key[len("name:"):] for key in keys])
+            return {f"name:{name}": str(ingredient_id) for name, ingredient_id in ids.items()}
+
+        found = await self._read_through([f"name:{name}" for name in names], load)
+        return {key[len("name:"):]: ObjectId(ingredient_id) for key, ingredient_id in found.items()}
+
+    @staticmethod
+    async def _load_documents(db: AsyncIOMotorDatabase, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        documents = await get_ingredients_by_ids(db, [ObjectId(ingredient_id) for ingredient_id in ids])
+        return {document["_id"]: document for document in documents}
+
+    async def invalidate(self, ingredient_ids: Iterable[str] = (), names: Iterable[str] = ()) -> None:
+        """Drops the given ingredients and name lookups from both tiers."""
+        keys = [f"id:{ingredient_id}" for ingredient_id in ingredient_ids] + [f"name:{name}" for name in names]
+        for key in keys:
+            self.local.delete(key)
+        if keys and self.redis is not None:
+            try:
+                await self.redis.delete(*(_REDIS_PREFIX + key for key in keys))
+            except RedisError as e:
+                self.redis_errors += 1
+                logger.warning(f"Ingredient cache Redis invalidation failed: {e}")
+
+    async def clear(self) -> None:
+        """Empties both tiers, e.g. after a bulk rewrite of the catalog."""
+        self.local.clear()
+        if self.redis is not None:
+            try:
+                batch = []
+                async for key in self.redis.scan_iter(match=_REDIS_PREFIX + "*", count=1000):
+                    batch.append(key)
+                    if len(batch) >= 1000:
+                        await self.redis.delete(*batch)
+                        batch = []
+                if batch:
+                    await self.redis.delete(*batch)
+            except RedisError as e:
+                self.redis_errors += 1
+                logger.warning(f"Ingredient cache Redis clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local.hits + self.local.misses
+        redis_lookups = self.redis_hits + self.redis_misses
+        return {
+            "enabled": settings.INGREDIENT_CACHE_ENABLED,
+            "local": self.local.stats(),
+            "redis": {
+                "enabled": self.redis is not None,
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+                "hit_ratio": self.redis_hits / redis_lookups if redis_lookups else 0.0,
+            },
+            "db_loads": self.db_loads,
+            # Share of lookups answered by either tier
+            "hit_ratio": (lookups - self.db_loads) / lookups if lookups else 0.0,
+        }
+
+
+ingredient_cache = IngredientCache(
+    settings.INGREDIENT_CACHE_SIZE,
+    settings.INGREDIENT_CACHE_TTL_SECONDS,
+    settings.INGREDIENT_CACHE_REDIS_TTL_SECONDS,
+)
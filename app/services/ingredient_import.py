@@ -0,0 +1,344 @@
+import codecs
+import csv
+import io
+import json
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import PyMongoError
+
+from app.constants import NUTRIENT_UNITS
+from app.core.config import settings
+from app.exceptions.ingredient import IngredientImportError
+from app.models.ingredient import IngredientCreate
+from app.repositories.ingredient import bulk_write_ingredients
+from app.services.autocomplete import index_ingredient
+from app.services.ingredient import bump_catalog_version
+from app.services.ingredient_cache import ingredient_cache
+from app.services.meal import clear_nutrient_annotations
+
+ImportFormat = Literal["csv", "json"]
+
+# FDC reports nutrient amounts per 100 g of food
+_FDC_REFERENCE = {"quantity": 100.0, "unit": 1.0, "reference_quantity": 100.0, "reference_unit": "g"}
+_NUTRIENTS_BY_NAME = {name.casefold(): name for name in NUTRIENT_UNITS}
+_UNIT_ALIASES = {"ug": "μg", "µg": "μg", "mcg": "μg"}
+_MASS_IN_GRAMS = {"g": 1.0, "mg": 1e-3, "μg": 1e-6}
+_CSV_NUTRIENT_COLUMN = re.compile(r"^(?P<name>.*?)\s*(?:\((?P<unit>[^()]*)\))?$")
+_INGREDIENTS_ADAPTER = TypeAdapter(List[IngredientCreate])
+
+
+def _normalize_unit(unit: Optional[str]) -> Optional[str]:
+    if not unit:
+        return None
+    unit = unit.strip()
+    return _UNIT_ALIASES.get(unit.lower(), unit if unit in ("IU", "μg") else unit.lower())
+
+
+@lru_cache(maxsize=4096)
+def map_nutrient(name: str, unit: Optional[str]) -> Optional[Tuple[str, float]]:
+    """
+    Maps a source nutrient name and unit onto NUTRIENT_UNITS.
+
+    Returns:
+        The registered name and the factor converting amounts into its unit, or None
+        if the name is not registered or the unit cannot be converted (e.g. energy in kJ).
+    """
+    registered = _NUTRIENTS_BY_NAME.get(name.strip().casefold())
+    if registered is None:
+        return None
+    unit = _normalize_unit(unit)
+    target = NUTRIENT_UNITS[registered]
+    if unit is None or unit == target:
+        return registered, 1.0
+    if unit in _MASS_IN_GRAMS and target in _MASS_IN_GRAMS:
+        return registered, _MASS_IN_GRAMS[unit] / _MASS_IN_GRAMS[target]
+    return None
+
+
+def fdc_food_to_ingredient(food: Any, unmapped: Counter) -> Dict[str, Any]:
+    """
+    Turns one FDC JSON food (Foundation, SR Legacy, Survey or Branded) into ingredient data.
+
+    Raises:
+        ValueError: If the record is not a food with a description, or a mapped
+            nutrient's amount is not a number.
+    """
+    if not isinstance(food, dict) or not food.get("description"):
+        raise ValueError("Record has no description")
+    food_nutrients = food.get("foodNutrients") or []
+    if not isinstance(food_nutrients, list):
+        raise ValueError("foodNutrients is not a list")
+    nutrients: Dict[str, float] = {}
+    for item in food_nutrients:
+        if not isinstance(item, dict):
+            continue
+        # Full downloads nest the nutrient; abridged API results flatten it
+        nutrient = item.get("nutrient")
+        nutrient = nutrient if isinstance(nutrient, dict) else {}
+        name = nutrient.get("name") or item.get("nutrientName") or item.get("name")
+        amount = item.get("amount", item.get("value"))
+        if not isinstance(name, str) or not name or amount is None:
+            continue
+        unit = nutrient.get("unitName") or item.get("unitName")
+        mapped = map_nutrient(name, unit if isinstance(unit, str) else None)
+        if mapped is None:
+            unmapped[name] += 1
+            continue
+        registered, factor = mapped
+        try:
+            value = float(amount) * factor
+        except (TypeError, ValueError):
+            raise ValueError(f"Nutrient '{name}' has a non-numeric amount: {amount!r}")
+        # Energy is listed in both kcal and kJ; only the kcal entry maps, so first wins
+        nutrients.setdefault(registered, value)
+    category = food.get("foodCategory")
+    description = category.get("description") if isinstance(category, dict) else category or food.get("brandedFoodCategory")
+    return {"name": food["description"], "description": description, **_FDC_REFERENCE, "nutrients": nutrients}
+
+
+@lru_cache(maxsize=1024)
+def _csv_column(column: str) -> Optional[Tuple[str, float]]:
+    match = _CSV_NUTRIENT_COLUMN.match(column)
+    return map_nutrient(match["name"], match["unit"])
+
+
+def csv_row_to_ingredient(row: Dict[str, str], unmapped: Counter) -> Dict[str, Any]:
+    """
+    Turns one CSV row into ingredient data.
+
+    The file has one food per row: a 'name' (or FDC 'description') column, optional
+    'description', 'reference_quantity' and 'reference_unit' columns (defaulting to
+    FDC's per-100 g basis), and one column per nutrient named like "Protein" or
+    "Protein (g)". Empty cells are skipped.
+
+    Raises:
+        ValueError: If the row has no name or a non-numeric value.
+    """
+    name = (row["name"] if "name" in row else row.get("description") or "").strip()
+    if not name:
+        raise ValueError("Row has no name")
+    ingredient = {"name": name, "description": row.get("description") if "name" in row else None, **_FDC_REFERENCE}
+    nutrients: Dict[str, float] = {}
+    for column, value in row.items():
+        if column in ("name", "description", "fdc_id") or value is None or not value.strip():
+            continue
+        if column in ("reference_quantity", "reference_unit"):
+            ingredient[column] = value.strip()
+            continue
+        mapped = _csv_column(column)
+        if mapped is None:
+            unmapped[column] += 1
+            continue
+        try:
+            nutrients[mapped[0]] = float(value) * mapped[1]
+        except ValueError:
+            raise ValueError(f"Column '{column}' is not a number: {value!r}")
+    ingredient["nutrients"] = nutrients
+    return ingredient
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        async for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise IngredientImportError(f"File is not valid UTF-8: {e}")
+    if text:
+        yield text
+
+
+def _split_complete_lines(buffer: str) -> Tuple[str, str]:
+    """Splits off the longest prefix of whole CSV records (newlines inside quotes do not end one)."""
+    end = position = quotes = 0
+    while True:
+        newline = buffer.find("\n", position)
+        if newline == -1:
+            return buffer[:end], buffer[end:]
+        quotes += buffer.count('"', position, newline)
+        position = newline + 1
+        if quotes % 2 == 0:
+            end = position
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, str]]:
+    """Yields CSV rows as {column: value}, parsing as the bytes arrive."""
+    header: Optional[List[str]] = None
+    buffer = ""
+    done = False
+    text_chunks = _iter_text(chunks)
+    while not done:
+        try:
+            buffer += await anext(text_chunks)
+            complete, buffer = _split_complete_lines(buffer)
+        except StopAsyncIteration:
+            complete, buffer, done = buffer, "", True
+        try:
+            for values in csv.reader(io.StringIO(complete)):
+                if not values:
+                    continue
+                if header is None:
+                    header = [column.strip() for column in values]
+                    continue
+                yield dict(zip(header, values))
+        except csv.Error as e:
+            raise IngredientImportError(f"Malformed CSV: {e}")
+
+
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Yields the elements of a JSON array one at a time as the bytes arrive.
+
+    The array may be the whole document or the value of the document's first key,
+    as in FDC downloads ({"FoundationFoods": [...]}).
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    async for text in _iter_text(chunks):
+        buffer = buffer[position:] + text
+        position = 0
+        if not started:
+            start = buffer.find("[")
+            if start == -1:
+                continue
+            position, started = start + 1, True
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Most likely cut off at the chunk boundary; wait for more input
+                break
+            yield record
+    if not started:
+        raise IngredientImportError("No JSON array found")
+    try:
+        decoder.raw_decode(buffer, position)
+    except json.JSONDecodeError as e:
+        raise IngredientImportError(f"Malformed JSON: {e}")
+    raise IngredientImportError("Unexpected end of JSON input")
+
+
+def _validate_batch(batch: List[Tuple[int, Dict[str, Any]]], report: Dict[str, Any]) -> List[Tuple[int, Dict[str, Any]]]:
+    try:
+        models = _INGREDIENTS_ADAPTER.validate_python([ingredient for _, ingredient in batch])
+    except ValidationError as e:
+        invalid: Dict[int, str] = {}
+        for error in e.errors():
+            location = ".".join(str(part) for part in error["loc"][1:])
+            invalid.setdefault(error["loc"][0], f"{location}: {error['msg']}")
+        for index, message in invalid.items():
+            row, ingredient = batch[index]
+            _record_failure(report, row, ingredient.get("name"), message)
+        batch = [entry for index, entry in enumerate(batch) if index not in invalid]
+        models = _INGREDIENTS_ADAPTER.validate_python([ingredient for _, ingredient in batch])
+    return [(row, model.model_dump()) for (row, _), model in zip(batch, models)]
+
+
+def _record_failure(report: Dict[str, Any], row: int, name: Optional[str], error: str) -> None:
+    report["failed"] += 1
+    if len(report["errors"]) < settings.INGREDIENT_IMPORT_MAX_ERRORS:
+        report["errors"].append({"row": row, "name": name, "error": error})
+    else:
+        report["errors_truncated"] = True
+
+
+async def _write_batch(db: AsyncIOMotorDatabase, batch: List[Tuple[int, Dict[str, Any]]], replace: bool, report: Dict[str, Any]) -> None:
+    batch = _validate_batch(batch, report)
+    ingredients = [ingredient for _, ingredient in batch]
+    try:
+        created, replaced, errors = await bulk_write_ingredients(db, ingredients, replace)
+    except PyMongoError as e:
+        logger.error(f"Database error while importing a chunk of {len(batch)} ingredients: {e}")
+        created, replaced, errors = {}, 0, {index: "Database error" for index in range(len(batch))}
+    for index, message in errors.items():
+        row, ingredient = batch[index]
+        _record_failure(report, row, ingredient["name"], message)
+    for index, ingredient_id in created.items():
+        index_ingredient(str(ingredient_id), ingredients[index]["name"])
+    report["inserted"] += len(created)
+    report["updated"] += replaced
+
+
+async def import_ingredients(
+    db: AsyncIOMotorDatabase,
+    chunks: AsyncIterator[bytes],
+    file_format: ImportFormat,
+    on_conflict: Literal["skip", "replace"] = "skip",
+    chunk_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Imports ingredients from a CSV or FDC JSON byte stream without buffering the file.
+
+    Records are mapped onto NUTRIENT_UNITS as they are parsed, then validated and
+    written in chunks with one unordered bulk_write each. A record that cannot be
+    mapped, fails validation or cannot be written is reported and skipped; the rest
+    of the file is still imported.
+
+    Args:
+        db: The database connection.
+        chunks: The file contents, e.g. a request body stream.
+        file_format: "csv" (one food per row) or "json" (an array of FDC foods).
+        on_conflict: Whether an ingredient whose name exists is reported ("skip") or overwritten ("replace").
+        chunk_size: Records per validation and write batch (INGREDIENT_IMPORT_CHUNK_SIZE by default).
+
+    Returns:
+        An import report (see IngredientImportReport).
+
+    Raises:
+        IngredientImportError: If the file itself is malformed; rows written before that point stay written.
+    """
+    chunk_size = chunk_size or settings.INGREDIENT_IMPORT_CHUNK_SIZE
+    records = iter_csv_records(chunks) if file_format == "csv" else iter_json_records(chunks)
+    to_ingredient = csv_row_to_ingredient if file_format == "csv" else fdc_food_to_ingredient
+    report: Dict[str, Any] = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    unmapped: Counter = Counter()
+    started = time.perf_counter()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    try:
+        async for record in records:
+            report["rows"] += 1
+            try:
+                batch.append((report["rows"], to_ingredient(record, unmapped)))
+            except ValueError as e:
+                _record_failure(report, report["rows"], None, str(e))
+            if len(batch) >= chunk_size:
+                await _write_batch(db, batch, on_conflict == "replace", report)
+                batch = []
+                logger.info(f"Imported {report['rows']} rows ({report['rows'] / (time.perf_counter() - started):.0f} rows/s)")
+        await _write_batch(db, batch, on_conflict == "replace", report)
+    finally:
+        if report["updated"]:
+            # Replaced documents keep their _id, so cached copies would be stale
+            await ingredient_cache.clear()
+            clear_nutrient_annotations()
+        if report["inserted"] or report["updated"]:
+            await bump_catalog_version(db)
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = elapsed
+    report["rows_per_second"] = report["rows"] / elapsed if elapsed else 0.0
+    report["unmapped_nutrients"] = dict(unmapped.most_common())
+    logger.info(
+        f"Ingredient import finished: {report['rows']} rows, {report['inserted']} inserted, {report['updated']} replaced, "
+        f"{report['failed']} failed in {elapsed:.1f}s ({report['rows_per_second']:.0f} rows/s)"
+    )
+    return report
@@ -1,51 +1,145 @@
-from app.models.meal import Meal, MealListItem
-from app.repositories.meal import create_meal, get_last_meal_by_user, get_meals_by_user_paginated
+import asyncio
+from collections import OrderedDict
+from app.models.meal import Meal, MealIngredient, MealList, MealListItem
+from app.repositories.meal import (
+    count_meals_by_user, count_meals_per_user, create_meal, create_meals, get_last_meal_by_user, get_meal_count, get_meal_with_ingredients, get_meals_by_ids,
+    get_meals_by_user_after, get_meals_by_user_page, get_meals_by_user_paginated, increment_meal_count, init_meal_count,
+    set_meal_counts,
+)
+from app.exceptions.ingredient import IngredientRetrievalError
 from app.exceptions.meal import MealCreationError, MealNotFoundError, MealValidationError
 from loguru import logger
 from datetime import datetime
 from pymongo.errors import PyMongoError
 from pydantic import ValidationError
-from typing import Tuple, List
+from typing import Dict, Literal, Optional, Tuple, List, Union
+from bson.errors import InvalidId
+from app.core.pagination import decode_cursor, encode_cursor
+from app.exceptions.pagination import InvalidCursorError
 from app.constants import NUTRIENT_UNITS
+from app.core.config import settings
 from app.models.ingredient import Ingredient
+from app.repositories.ingredient import insert_missing_ingredients
+from app.services.autocomplete import index_ingredient
+from app.services.ingredient import bump_catalog_version, get_catalog_version
+from app.services.ingredient_cache import ingredient_cache
+from app.services.rollup import record_meal_rollup, record_meal_rollups
 from bson import ObjectId
 
-async def create_meal_entry(db, meal: Meal, user_id: str) -> MealListItem:
-    try:
-        meal_dict = meal.model_dump(exclude_unset=True)
-        meal_dict["user_id"] = user_id
-        if not meal_dict.get("timestamp"):
-            meal_dict["timestamp"] = datetime.utcnow()
-
-        # Process ingredients
-        processed_ingredients = []
-        for meal_ingredient in meal.ingredients:
+async def resolve_meal_ingredients(db, meal_ingredients: List[MealIngredient]) -> List[str]:
+    """
+    Resolves every ingredient of a meal to an ingredient ID in a fixed number of
+    round trips, independent of how many ingredients there are.
+
+    Returns:
+        The ingredient ID for each entry of meal_ingredients, in the same order.
+
+    Raises:
+        MealValidationError: If an ID is malformed or does not exist.
+    """
+    resolved = (await resolve_ingredients_for_meals(db, [meal_ingredients]))[0]
+    if isinstance(resolved, MealValidationError):
+        raise resolved
+    return resolved
+
+
+async def resolve_ingredients_for_meals(
+    db, meals_ingredients: List[List[MealIngredient]]
+) -> List[Union[List[str], MealValidationError]]:
+    """
+    Resolves the ingredients of several meals at once.
+
+    Referenced IDs of all meals are checked with one $in query and inline ingredients
+    are looked up by name with another (both run concurrently, and both are served
+    from the ingredient cache when warm); inline ingredients that do not exist yet
+    are created with one unordered bulk upsert. A meal referencing an ID that is
+    malformed or does not exist fails on its own, and its new inline ingredients are
+    not created unless another meal needs them.
+
+    Returns:
+        For each meal, its ingredient IDs in entry order, or the MealValidationError
+        describing why it cannot be created.
+
+    Raises:
+        MealValidationError: If an ingredient has an unsupported type.
+    """
+    referenced_ids = []
+    inline_by_name: Dict[str, Ingredient] = {}
+    for meal_ingredients in meals_ingredients:
+        for meal_ingredient in meal_ingredients:
             if isinstance(meal_ingredient.ingredient, str):
-                # Existing ingredient ID provided
-                ingredient_id = meal_ingredient.ingredient
-                ingredient = await db.ingredients.find_one({"_id": ObjectId(ingredient_id)})
-                if not ingredient:
-                    raise MealValidationError(f"Ingredient with ID {ingredient_id} not found")
+                referenced_ids.append(meal_ingredient.ingredient)
             elif isinstance(meal_ingredient.ingredient, Ingredient):
-                # New ingredient data provided
-                ingredient_data = meal_ingredient.ingredient
-                # Check if it already exists by name
-                existing = await db.ingredients.find_one({"name": ingredient_data.name})
-                if existing:
-                    ingredient_id = str(existing["_id"])
-                else:
-                    # Add new ingredient to the ingredients collection
-                    new_ingredient = ingredient_data.model_dump(exclude_unset=True)
-                    result = await db.ingredients.insert_one(new_ingredient)
-                    ingredient_id = str(result.inserted_id)
+                inline_by_name.setdefault(meal_ingredient.ingredient.name, meal_ingredient.ingredient)
             else:
                 raise MealValidationError("Invalid ingredient type")
 
-            processed_ingredients.append({"ingredient_id": ingredient_id, "quantity": meal_ingredient.quantity})
+    # Malformed IDs are never found, so they fail the same way as unknown ones
+    existing, ids_by_name = await asyncio.gather(
+        ingredient_cache.get_many(db, referenced_ids),
+        ingredient_cache.get_ids_by_name(db, inline_by_name),
+    )
+    results: List[Union[List[str], MealValidationError, None]] = []
+    new_names: Dict[str, None] = {}
+    for meal_ingredients in meals_ingredients:
+        missing = next((
+            meal_ingredient.ingredient for meal_ingredient in meal_ingredients
+            if isinstance(meal_ingredient.ingredient, str) and meal_ingredient.ingredient not in existing
+        ), None)
+        if missing is not None:
+            results.append(MealValidationError(f"Ingredient with ID {missing} not found"))
+            continue
+        results.append(None)
+        for meal_ingredient in meal_ingredients:
+            if isinstance(meal_ingredient.ingredient, Ingredient) and meal_ingredient.ingredient.name not in ids_by_name:
+                new_names[meal_ingredient.ingredient.name] = None
+
+    if new_names:
+        new_ingredients = [
+            inline_by_name[name].model_dump(exclude_unset=True, exclude={"id"}) for name in new_names
+        ]
+        inserted = await insert_missing_ingredients(db, new_ingredients)
+        for name, ingredient_id in inserted.items():
+            index_ingredient(str(ingredient_id), name)
+        await ingredient_cache.invalidate([str(ingredient_id) for ingredient_id in inserted.values()], inserted)
+        if inserted:
+            await bump_catalog_version(db)
+        ids_by_name.update(inserted)
+        # Names another request inserted between our lookup and upsert
+        raced = [name for name in new_names if name not in inserted]
+        if raced:
+            ids_by_name.update(await ingredient_cache.get_ids_by_name(db, raced))
+
+    return [
+        result if result is not None else [
+            meal_ingredient.ingredient if isinstance(meal_ingredient.ingredient, str)
+            else str(ids_by_name[meal_ingredient.ingredient.name])
+            for meal_ingredient in meal_ingredients
+        ]
+        for result, meal_ingredients in zip(results, meals_ingredients)
+    ]
 
-        meal_dict["ingredients"] = processed_ingredients
+
+def _meal_document(meal: Meal, user_id: str, ingredient_ids: List[str]) -> dict:
+    meal_dict = meal.model_dump(exclude_unset=True)
+    meal_dict["user_id"] = user_id
+    if not meal_dict.get("timestamp"):
+        meal_dict["timestamp"] = datetime.utcnow()
+    # Server-side write time; versions the meal's derived views (see get_meal_version)
+    meal_dict["updated_at"] = datetime.utcnow()
+    meal_dict["ingredients"] = [
+        {"ingredient_id": ingredient_id, "quantity": meal_ingredient.quantity}
+        for ingredient_id, meal_ingredient in zip(ingredient_ids, meal.ingredients)
+    ]
+    return meal_dict
+
+
+async def create_meal_entry(db, meal: Meal, user_id: str) -> MealListItem:
+    try:
+        meal_dict = _meal_document(meal, user_id, await resolve_meal_ingredients(db, meal.ingredients))
         meal_id = await create_meal(db, meal_dict)
         meal_dict["_id"] = meal_id
+        await _update_meal_aggregates(db, meal_dict)
         meal_dict["id"] = str(meal_id)
         return MealListItem(**meal_dict)
 
@@ -56,13 +150,66 @@ async def create_meal_entry(db, meal: Meal, user_id: str) -> MealListItem:
         logger.error(f"Validation error for meal data: {e}")
         raise MealValidationError(f"Invalid meal data: {e}")
 
+
+async def create_meal_entries(db, meals: List[Meal], user_id: str) -> List[dict]:
+    """
+    Creates several meals for a user in a fixed number of round trips.
+
+    Ingredients of the whole batch are resolved in one pass and the meals are stored
+    with one unordered insert_many; rollups and the meal counter are then updated
+    once for everything that was stored. A meal that cannot be created fails on its
+    own without affecting the others.
+
+    Returns:
+        One result per meal, in request order: {"index", "status": "created", "meal"}
+        or {"index", "status": "error", "error"}. A meal that was stored but fails
+        validation on the way out is still "created", with an error and no meal.
+
+    Raises:
+        MealCreationError: If a database error prevents the batch from being processed.
+    """
+    results: List[Optional[dict]] = [None] * len(meals)
+    try:
+        resolved = await resolve_ingredients_for_meals(db, [meal.ingredients for meal in meals])
+        positions, documents = [], []
+        for index, (meal, ingredient_ids) in enumerate(zip(meals, resolved)):
+            if isinstance(ingredient_ids, MealValidationError):
+                results[index] = {"index": index, "status": "error", "error": str(ingredient_ids)}
+            else:
+                positions.append(index)
+                documents.append(_meal_document(meal, user_id, ingredient_ids))
+
+        meal_ids, errors = await create_meals(db, documents)
+        created = []
+        for position, (index, meal_dict, meal_id) in enumerate(zip(positions, documents, meal_ids)):
+            if position in errors:
+                logger.error(f"Failed to store meal {index} of a batch for user {user_id}: {errors[position]}")
+                results[index] = {"index": index, "status": "error", "error": "Failed to store meal"}
+            else:
+                created.append((index, {**meal_dict, "_id": meal_id}))
+        if created:
+            await _update_batch_aggregates(db, [meal_dict for _, meal_dict in created], user_id)
+    except PyMongoError as e:
+        logger.error(f"Database error while creating a batch of {len(meals)} meals for user {user_id}: {e}")
+        raise MealCreationError(f"Failed to create meals due to a database error: {e}")
+    # Built once the aggregates are updated: these meals are stored whatever happens here
+    for index, meal_dict in created:
+        try:
+            results[index] = {"index": index, "status": "created", "meal": MealListItem(**meal_dict)}
+        except ValidationError as e:
+            logger.error(f"Validation error for meal {index} of a batch for user {user_id}: {e}")
+            results[index] = {"index": index, "status": "created", "error": f"Meal stored but could not be returned: {e}"}
+    logger.info("Created {} of {} meals in a batch for user {}", len(created), len(meals), user_id)
+    return results
+
+
 async def get_last_meal_entry_by_user(db, user_id: str) -> MealListItem:
     try:
         meal = await get_last_meal_by_user(db, user_id)
         if not meal:
             raise MealNotFoundError(f"No meals found for user {user_id}")
         meal_out = MealListItem(**meal)
-        logger.info(f"Last meal entry for user {user_id}: {meal_out.name}")
+        logger.info("Last meal entry for user {}: {}", user_id, meal_out.name)
         return meal_out
     except PyMongoError as e:
         logger.error(f"Database error while fetching last meal for user {user_id}: {e}")
@@ -71,11 +218,177 @@ async def get_last_meal_entry_by_user(db, user_id: str) -> MealListItem:
         logger.error(f"Validation error for meal data: {e}")
         raise MealValidationError(f"Invalid meal data retrieved: {e}")
 
-async def get_paginated_meals_by_user(db, user_id: str, page: int = 1, page_size: int = 10) -> Tuple[List[MealListItem], int]:
+async def get_meal_count_by_user(db, user_id: str) -> int:
+    """
+    Returns a user's meal count from their counter document.
+
+    Users without a counter (their meals predate it) get one seeded from an exact
+    count on first read; meal creation keeps it current afterwards.
+
+    Seeding races with meal creation, which inserts the meal first and bumps
+    the counter after. A meal created before the counter exists can be missed
+    (it is not in the first count and its increment finds no counter), so the
+    count is taken a second time once the counter exists. A meal inserted
+    before a seeding count but bumped after it is counted twice. The counter is
+    therefore approximate for users seeded under concurrent creates; pages
+    clamp it (see _clamp_meal_count) and `python -m app.cli rebuild-meal-counts`
+    repairs it.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    count = await get_meal_count(db, user_id)
+    if count is None:
+        await init_meal_count(db, user_id, await count_meals_by_user(db, user_id))
+        count = await init_meal_count(db, user_id, await count_meals_by_user(db, user_id))
+    return count
+
+
+async def get_paginated_meals_by_user(
+    db,
+    user_id: str,
+    page: int = 1,
+    page_size: int = 10,
+    total: Literal["counter", "exact", "none"] = "counter",
+) -> Tuple[List[MealListItem], Optional[int]]:
+    """
+    Retrieves one page of a user's meals, newest first, with an optional total.
+
+    Args:
+        db: The database connection.
+        user_id: The owner of the meals.
+        page: Page number, starting from 1.
+        page_size: Number of meals per page.
+        total: "counter" reads the per-user meal counter, "exact" counts the
+            meals (concurrently with the page query) and "none" skips the total.
+
+    Returns:
+        A tuple of (meals, total); total is None when total="none".
+
+    Raises:
+        MealCreationError: If a database error occurs.
+        MealValidationError: If a stored meal fails validation.
+    """
+    try:
+        if total == "exact":
+            meals, meal_count = await get_meals_by_user_paginated(db, user_id, page, page_size)
+        elif total == "counter":
+            meals, meal_count = await asyncio.gather(
+                get_meals_by_user_page(db, user_id, page, page_size),
+                get_meal_count_by_user(db, user_id),
+            )
+            meal_count = _clamp_meal_count(meal_count, page, page_size, len(meals))
+        else:
+            meals, meal_count = await get_meals_by_user_page(db, user_id, page, page_size), None
+        meals_out = MealList.validate_python(meals)
+        return meals_out, meal_count
+    except PyMongoError as e:
+        logger.error(f"Database error while fetching meals for user {user_id}: {e}")
+        raise MealCreationError(f"Failed to retrieve meals due to a database error: {e}")
+    except ValidationError as e:
+        logger.error(f"Validation error for meal data: {e}")
+        raise MealValidationError(f"Invalid meal data retrieved: {e}")
+
+
+def _clamp_meal_count(count: int, page: int, page_size: int, found: int) -> int:
+    # The page bounds the total whatever the counter says: a full page means at least
+    # page * page_size meals, a short one exactly (page - 1) * page_size + found, and an
+    # empty one at most (page - 1) * page_size. A drifted counter therefore never adds
+    # pages past a short one, and at worst makes one empty page follow a full one.
+    if found >= page_size:
+        return max(count, page * page_size)
+    if found or page == 1:
+        return (page - 1) * page_size + found
+    return min(count, (page - 1) * page_size)
+
+
+async def rebuild_meal_counts(db, user_id: Optional[str] = None) -> int:
+    """
+    Recomputes per-user meal counters from the meals collection.
+
+    Args:
+        db: The database connection.
+        user_id: Rebuild only this user's counter; None rebuilds everyone's.
+
+    Returns:
+        The number of counters written.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    counts = await count_meals_per_user(db, user_id)
+    await set_meal_counts(db, counts, user_id)
+    logger.info(f"Rebuilt {len(counts)} meal counters")
+    return len(counts)
+
+
+async def _update_meal_aggregates(db, meal_dict: dict) -> None:
+    await _apply_aggregate_updates(
+        record_meal_rollup(db, meal_dict),
+        increment_meal_count(db, meal_dict["user_id"]),
+        f"meal {meal_dict['_id']} of user {meal_dict['user_id']}",
+    )
+
+
+async def _update_batch_aggregates(db, meals: List[dict], user_id: str) -> None:
+    await _apply_aggregate_updates(
+        record_meal_rollups(db, meals),
+        increment_meal_count(db, user_id, len(meals)),
+        f"{len(meals)} meals of user {user_id}",
+    )
+
+
+async def _apply_aggregate_updates(rollup, counter, label: str) -> None:
+    # The meals are stored by now; derived data that fails to update is logged
+    # and repaired by `python -m app.cli rebuild-rollups` / `rebuild-meal-counts`
+    results = await asyncio.gather(rollup, counter, return_exceptions=True)
+    for name, result in zip(("daily rollup", "meal counter"), results):
+        if isinstance(result, PyMongoError):
+            logger.error(f"Failed to update {name} for {label}: {result}")
+        elif isinstance(result, BaseException):
+            raise result
+
+
+def encode_meal_cursor(meal: MealListItem) -> Optional[str]:
+    """Opaque token continuing the meal history after `meal`; None for meals without a timestamp."""
+    if meal.timestamp is None:
+        return None
+    return encode_cursor({"t": meal.timestamp.isoformat(), "i": meal.id})
+
+
+def _decode_meal_cursor(after: str) -> Tuple[datetime, ObjectId]:
+    payload = decode_cursor(after)
     try:
-        meals, total = await get_meals_by_user_paginated(db, user_id, page, page_size)
-        meals_out = [MealListItem(**meal) for meal in meals]
-        return meals_out, total
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["i"])
+    except (KeyError, TypeError, ValueError, InvalidId):
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+async def get_meals_after_by_user(db, user_id: str, limit: int = 10, after: Optional[str] = None) -> Tuple[List[MealListItem], Optional[str]]:
+    """
+    Retrieves one page of a user's meals, newest first, using keyset pagination.
+
+    Args:
+        db: The database connection.
+        user_id: The owner of the meals.
+        limit: Maximum number of meals in the page.
+        after: Cursor returned with the previous page; None starts from the newest meal.
+
+    Returns:
+        A tuple of (meals, next_cursor); next_cursor is None on the last page.
+
+    Raises:
+        InvalidCursorError: If `after` is not a cursor issued for meal history.
+        MealCreationError: If a database error occurs.
+        MealValidationError: If a stored meal fails validation.
+    """
+    after_key = _decode_meal_cursor(after) if after is not None else None
+    try:
+        # One extra meal tells whether another page exists
+        meals = await get_meals_by_user_after(db, user_id, limit + 1, after_key)
+        meals_out = MealList.validate_python(meals[:limit])
+        next_cursor = encode_meal_cursor(meals_out[-1]) if len(meals) > limit else None
+        return meals_out, next_cursor
     except PyMongoError as e:
         logger.error(f"Database error while fetching meals for user {user_id}: {e}")
         raise MealCreationError(f"Failed to retrieve meals due to a database error: {e}")
@@ -83,31 +396,109 @@ async def get_paginated_meals_by_user(db, user_id: str, page: int = 1, page_size
         logger.error(f"Validation error for meal data: {e}")
         raise MealValidationError(f"Invalid meal data retrieved: {e}")
 
-async def get_detailed_meal(db, meal_id: str, user_id: str) -> dict:
+async def get_meal_version(db, meal_id: ObjectId, user_id: str) -> Tuple[str, datetime]:
+    """
+    Returns a version key and last-modified time for the views derived from a meal
+    (detailed view, nutrient totals), without building them.
+
+    Only the meal's timestamps and the ingredient catalog version are read, so a
+    client's cached copy can be revalidated with two point lookups. The key changes
+    whenever the meal is written or any ingredient is.
+
+    Raises:
+        MealNotFoundError: If the meal does not exist for the user.
+        MealCreationError: If a database error occurs.
+    """
+    try:
+        meals, (catalog_version, catalog_updated_at) = await asyncio.gather(
+            get_meals_by_ids(db, [meal_id], user_id, {"timestamp": 1, "updated_at": 1}),
+            get_catalog_version(db),
+        )
+    except (PyMongoError, IngredientRetrievalError) as e:
+        logger.error(f"Database error while reading the version of meal {meal_id}: {e}")
+        raise MealCreationError(f"Failed to retrieve meal due to a database error: {e}")
+    if not meals:
+        raise MealNotFoundError(f"Meal {meal_id} not found for user {user_id}")
+    sync_nutrient_annotations(catalog_version)
+    meal = meals[0]
+    # Meals stored before updated_at was maintained fall back to their creation time
+    modified = meal.get("updated_at") or meal.get("timestamp") or meal_id.generation_time.replace(tzinfo=None)
+    last_modified = max(modified, catalog_updated_at) if catalog_updated_at else modified
+    return f"{meal_id}:{modified.isoformat()}:{catalog_version}", last_modified
+
+
+# Annotated nutrient maps keyed by ingredient ID, valid for one catalog version.
+# Ingredients only change through imports, which bump the catalog version, so each
+# one is annotated once per version rather than on every detailed view. The
+# importing worker clears them with clear_nutrient_annotations(); other workers
+# clear them in sync_nutrient_annotations() once get_meal_version reads the new
+# version, before a detailed view is built under the ETag carrying it.
+_annotated_nutrients: "OrderedDict[str, dict]" = OrderedDict()
+_annotations_catalog_version = 0
+
+
+def clear_nutrient_annotations() -> None:
+    _annotated_nutrients.clear()
+
+
+def sync_nutrient_annotations(catalog_version: int) -> None:
+    """Drops the memoized annotations if the catalog version changed since they were made."""
+    global _annotations_catalog_version
+    if catalog_version != _annotations_catalog_version:
+        _annotated_nutrients.clear()
+        _annotations_catalog_version = catalog_version
+
+
+def annotate_nutrients(ingredient_id: str, nutrients: dict) -> dict:
+    """Returns {nutrient: {"value", "unit"}} for an ingredient, memoized per ingredient ID."""
+    annotated = _annotated_nutrients.get(ingredient_id)
+    if annotated is not None:
+        _annotated_nutrients.move_to_end(ingredient_id)
+        return annotated
+    annotated = {
+        nutrient: {"value": value, "unit": NUTRIENT_UNITS.get(nutrient, "unknown")}
+        for nutrient, value in nutrients.items()
+    }
+    _annotated_nutrients[ingredient_id] = annotated
+    if len(_annotated_nutrients) > settings.NUTRIENT_ANNOTATION_CACHE_SIZE:
+        _annotated_nutrients.popitem(last=False)
+    return annotated
+
+
+async def get_detailed_meal(db, meal_id: ObjectId, user_id: str) -> dict:
     """Fetch a meal with detailed ingredient information, including nutrient units."""
     try:
-        meal = await db.meals.find_one({"_id": meal_id, "user_id": user_id})
+        if settings.INGREDIENT_CACHE_ENABLED:
+            # Ingredients usually come from the cache, leaving a plain _id lookup for the meal
+            meals = await get_meals_by_ids(db, [meal_id], user_id)
+            meal = meals[0] if meals else None
+            if meal:
+                ingredients_by_id = await ingredient_cache.get_many(
+                    db, [item["ingredient_id"] for item in meal.get("ingredients") or []]
+                )
+        else:
+            meal = await get_meal_with_ingredients(db, meal_id, user_id)
+            if meal:
+                ingredients_by_id = {str(ingredient["_id"]): ingredient for ingredient in meal.pop("_ingredient_docs", [])}
         if not meal:
             raise MealNotFoundError(f"Meal {meal_id} not found for user {user_id}")
-        
-        meal["_id"] = str(meal["_id"])
-        
+
         detailed_ingredients = []
-        for meal_ingredient in meal["ingredients"]:
-            ingredient = await db.ingredients.find_one({"_id": meal_ingredient["ingredient_id"]})
-            if ingredient:
-                nutrients_with_units = {
-                    nutrient: {"value": value, "unit": NUTRIENT_UNITS.get(nutrient, "unknown")}
-                    for nutrient, value in ingredient["nutrients"].items()
-                }
-                detailed_ingredients.append({
-                    "name": ingredient["name"],
-                    "quantity": meal_ingredient["quantity"],
-                    "nutrients": nutrients_with_units
-                })
-        
+        for meal_ingredient in meal.get("ingredients", []):
+            ingredient_id = meal_ingredient["ingredient_id"]
+            ingredient = ingredients_by_id.get(ingredient_id)
+            if not ingredient:
+                logger.warning(f"Meal {meal_id} references missing ingredient {ingredient_id}")
+                continue
+            detailed_ingredients.append({
+                "ingredient_id": ingredient_id,
+                "name": ingredient["name"],
+                "quantity": meal_ingredient["quantity"],
+                "nutrients": annotate_nutrients(ingredient_id, ingredient.get("nutrients", {}))
+            })
+
         meal["ingredients"] = detailed_ingredients
         return meal
     except PyMongoError as e:
         logger.error(f"Database error while fetching detailed meal {meal_id}: {e}")
-        raise MealCreationError(f"Failed to retrieve meal due to a database error: {e}")
\ No newline at end of file
+        raise MealCreationError(f"Failed to retrieve meal due to a database error: {e}")
@@ -0,0 +1,179 @@
+from itertools import chain
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+from loguru import logger
+from pymongo.errors import PyMongoError
+
+from app.core.nutrients import NUTRIENT_COUNT, NUTRIENT_SLOTS, annotate_vector, mask_to_slots
+from app.exceptions.meal import MealCreationError, MealNotFoundError
+from app.repositories.meal import get_meals_by_ids
+from app.services.ingredient_cache import ingredient_cache
+
+
+def build_ingredient_matrix(ingredients: List[Dict[str, Any]], unknown: Set[str] | None = None) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+    """
+    Lays ingredients out as columns of a per-unit nutrient matrix.
+
+    Each column holds the ingredient's nutrients divided by its reference_quantity,
+    so multiplying it by a meal quantity (in the reference unit) gives that
+    ingredient's contribution. Ingredients without a positive reference_quantity
+    contribute nothing.
+
+    Args:
+        ingredients: Documents with _id, reference_quantity and nutrients.
+        unknown: Optional set collecting nutrient names missing from the registry.
+
+    Returns:
+        A tuple of (column index by ingredient ID string, per-unit values of shape
+        (NUTRIENT_COUNT, n), uint64 presence mask per ingredient).
+    """
+    columns: Dict[str, int] = {}
+    masks = np.zeros(len(ingredients), dtype=np.uint64)
+    column_index: List[int] = []
+    slot_index: List[int] = []
+    scaled: List[float] = []
+    for column, ingredient in enumerate(ingredients):
+        ingredient_id = str(ingredient["_id"])
+        columns[ingredient_id] = column
+        reference_quantity = ingredient.get("reference_quantity") or 0
+        if reference_quantity <= 0:
+            logger.warning(f"Ingredient {ingredient_id} has no positive reference_quantity; counting it as zero")
+            continue
+        mask = 0
+        for name, value in (ingredient.get("nutrients") or {}).items():
+            slot = NUTRIENT_SLOTS.get(name)
+            if slot is None:
+                if unknown is not None:
+                    unknown.add(name)
+                continue
+            column_index.append(column)
+            slot_index.append(slot)
+            scaled.append(value / reference_quantity)
+            mask |= 1 << slot
+        masks[column] = mask
+
+    values = np.zeros((NUTRIENT_COUNT, len(ingredients)))
+    values[slot_index, column_index] = scaled
+    return columns, values, masks
+
+
+def compute_meal_totals(
+    meals: List[Dict[str, Any]],
+    columns: Dict[str, int],
+    values: np.ndarray,
+    masks: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, List[List[str]]]:
+    """
+    Sums the nutrients of every meal as whole-array operations.
+
+    Meal ingredients are flattened into one list of (meal, ingredient column,
+    quantity); the per-unit matrix is gathered and scaled for all of them at once
+    and each nutrient row is then summed per meal with a single bincount.
+
+    Args:
+        meals: Meal documents with an "ingredients" list of {ingredient_id, quantity}.
+        columns, values, masks: The output of build_ingredient_matrix.
+
+    Returns:
+        A tuple of (totals of shape (len(meals), NUTRIENT_COUNT), uint64 presence
+        mask per meal, ingredient IDs that could not be resolved for each meal).
+    """
+    meal_count = len(meals)
+    meal_items = [meal.get("ingredients") or [] for meal in meals]
+    counts = np.fromiter(map(len, meal_items), dtype=np.intp, count=meal_count)
+    items = list(chain.from_iterable(meal_items))
+    gathered = np.fromiter((columns.get(item["ingredient_id"], -1) for item in items), dtype=np.intp, count=len(items))
+    quantities = np.fromiter((item["quantity"] for item in items), dtype=float, count=len(items))
+    item_meals = np.repeat(np.arange(meal_count), counts)
+
+    missing: List[List[str]] = [[] for _ in range(meal_count)]
+    unresolved = np.flatnonzero(gathered < 0)
+    for position in unresolved:
+        missing[item_meals[position]].append(items[position]["ingredient_id"])
+    # Unresolved items point at column 0 with zero quantity and an empty mask
+    gathered[unresolved] = 0
+    quantities[unresolved] = 0.0
+
+    totals = np.zeros((meal_count, NUTRIENT_COUNT))
+    meal_masks = np.zeros(meal_count, dtype=np.uint64)
+    if len(unresolved) == len(items):
+        return totals, meal_masks, missing
+
+    item_masks = masks[gathered]
+    item_masks[unresolved] = 0
+    # Nutrients no gathered ingredient carries stay zero without being summed
+    active = np.bitwise_or.reduce(item_masks)
+    contributions = values[:, gathered] * quantities
+    for slot in mask_to_slots(active):
+        totals[:, slot] = np.bincount(item_meals, weights=contributions[slot], minlength=meal_count)
+    # Each meal's items are contiguous, so a segmented OR gives its mask;
+    # reduceat cannot express empty segments, so empty meals keep mask 0.
+    non_empty = counts > 0
+    starts = (np.cumsum(counts) - counts)[non_empty]
+    meal_masks[non_empty] = np.bitwise_or.reduceat(item_masks, starts)
+    return totals, meal_masks, missing
+
+
+async def get_meals_nutrients(db, meal_ids: List[ObjectId], user_id: str) -> Dict[str, Any]:
+    """
+    Computes nutrient totals for several meals of a user in at most two round trips
+    (one when the ingredients are already in the ingredient cache).
+
+    Args:
+        db: The database connection.
+        meal_ids: The meals to total; IDs not found for the user are reported as missing.
+        user_id: The owner of the meals.
+
+    Returns:
+        A dict with per-meal totals (in request order), the combined totals, the
+        missing meal IDs and any nutrient names outside the registry (not summed).
+
+    Raises:
+        MealCreationError: If a database error occurs.
+    """
+    try:
+        meal_ids = list(dict.fromkeys(meal_ids))
+        meals = await get_meals_by_ids(db, meal_ids, user_id, {"ingredients": 1})
+        ingredient_ids = {item["ingredient_id"] for meal in meals for item in meal.get("ingredients") or []}
+        ingredients = list((await ingredient_cache.get_many(db, ingredient_ids)).values())
+    except PyMongoError as e:
+        logger.error(f"Database error while computing nutrients for user {user_id}: {e}")
+        raise MealCreationError(f"Failed to compute nutrients due to a database error: {e}")
+
+    meals_by_id = {meal["_id"]: meal for meal in meals}
+    ordered = [meals_by_id[str(meal_id)] for meal_id in meal_ids if str(meal_id) in meals_by_id]
+    unknown: Set[str] = set()
+    columns, values, masks = build_ingredient_matrix(ingredients, unknown)
+    totals, meal_masks, missing = compute_meal_totals(ordered, columns, values, masks)
+
+    results = []
+    for meal, meal_totals, meal_mask, meal_missing in zip(ordered, totals, meal_masks, missing):
+        if meal_missing:
+            logger.warning(f"Meal {meal['_id']} references missing ingredients {meal_missing}")
+        results.append({
+            "meal_id": meal["_id"],
+            "nutrients": annotate_vector(meal_totals, int(meal_mask)),
+            "missing_ingredients": meal_missing,
+        })
+    return {
+        "meals": results,
+        "totals": annotate_vector(totals.sum(axis=0), int(np.bitwise_or.reduce(meal_masks, initial=0))),
+        "missing_meals": [str(meal_id) for meal_id in meal_ids if str(meal_id) not in meals_by_id],
+        "unmapped_nutrients": sorted(unknown),
+    }
+
+
+async def get_meal_nutrients(db, meal_id: ObjectId, user_id: str) -> Dict[str, Any]:
+    """
+    Computes nutrient totals for one meal.
+
+    Raises:
+        MealNotFoundError: If the meal does not exist for the user.
+        MealCreationError: If a database error occurs.
+    """
+    result = await get_meals_nutrients(db, [meal_id], user_id)
+    if not result["meals"]:
+        raise MealNotFoundError(f"Meal {meal_id} not found for user {user_id}")
+    return {**result["meals"][0], "unmapped_nutrients": result["unmapped_nutrients"]}
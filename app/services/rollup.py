@@ -0,0 +1,188 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional
+
+import numpy as np
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from app.constants import NUTRIENT_UNITS
+from app.core.nutrients import NUTRIENT_COUNT, vector_to_dict
+from app.exceptions.meal import MealCreationError
+from app.repositories.rollup import get_daily_rollups, increment_daily_rollup, increment_daily_rollups, replace_daily_rollups
+from app.services.ingredient_cache import ingredient_cache
+from app.services.nutrition import build_ingredient_matrix, compute_meal_totals
+
+
+def rollup_date(timestamp: datetime) -> str:
+    """The UTC day a meal counts towards, as YYYY-MM-DD. Naive timestamps are taken as UTC."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date().isoformat()
+
+
+async def _meal_totals(db: AsyncIOMotorDatabase, meals: List[Dict[str, Any]]):
+    ingredient_ids = {item["ingredient_id"] for meal in meals for item in meal.get("ingredients") or []}
+    ingredients = list((await ingredient_cache.get_many(db, ingredient_ids)).values())
+    totals, masks, _ = compute_meal_totals(meals, *build_ingredient_matrix(ingredients))
+    return totals, masks
+
+
+async def record_meal_rollup(db: AsyncIOMotorDatabase, meal: Dict[str, Any]) -> None:
+    """
+    Adds a newly created meal to its owner's daily rollup.
+
+    Args:
+        db: The database connection.
+        meal: The stored meal document (user_id, timestamp and resolved ingredients).
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    totals, masks = await _meal_totals(db, [meal])
+    await increment_daily_rollup(db, meal["user_id"], rollup_date(meal["timestamp"]), vector_to_dict(totals[0], int(masks[0])))
+
+
+async def record_meal_rollups(db: AsyncIOMotorDatabase, meals: List[Dict[str, Any]]) -> None:
+    """
+    Adds several newly created meals to their owners' daily rollups: one ingredient
+    lookup for all of them and one bulk increment per distinct (user, day).
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    days = _DailyTotals()
+    days.add(meals, *await _meal_totals(db, meals))
+    await increment_daily_rollups(db, [(key[0], key[1], nutrients, meal_count) for key, nutrients, meal_count in days.items()])
+
+
+class _DailyTotals:
+    """Per-(user_id, day) nutrient sums, presence masks and meal counts."""
+
+    def __init__(self):
+        self.sums: Dict[tuple, np.ndarray] = defaultdict(lambda: np.zeros(NUTRIENT_COUNT))
+        self.masks: Dict[tuple, int] = defaultdict(int)
+        self.counts: Dict[tuple, int] = defaultdict(int)
+
+    def add(self, meals: List[Dict[str, Any]], totals: np.ndarray, masks: np.ndarray) -> None:
+        for meal, meal_totals, meal_mask in zip(meals, totals, masks):
+            key = (meal["user_id"], rollup_date(meal["timestamp"]))
+            self.sums[key] += meal_totals
+            self.masks[key] |= int(meal_mask)
+            self.counts[key] += 1
+
+    def items(self):
+        for key, sums in self.sums.items():
+            yield key, vector_to_dict(sums, self.masks[key]), self.counts[key]
+
+
+async def rebuild_daily_rollups(db: AsyncIOMotorDatabase, user_id: Optional[str] = None, batch_size: int = 1000) -> int:
+    """
+    Recomputes daily rollups from meal history.
+
+    Meals are streamed in batches and totalled with the vectorized nutrient engine;
+    the per-day sums are then written in one bulk replacement. Meals created while
+    a rebuild runs may be missed, so run it when the application is quiet.
+
+    Args:
+        db: The database connection.
+        user_id: Rebuild only this user's rollups; None rebuilds everyone's.
+        batch_size: Meals totalled per batch.
+
+    Returns:
+        The number of rollups written.
+
+    Raises:
+        PyMongoError: If a database error occurs.
+    """
+    days = _DailyTotals()
+
+    async def add_batch(batch: List[Dict[str, Any]]) -> None:
+        days.add(batch, *await _meal_totals(db, batch))
+
+    scope = {"user_id": user_id} if user_id is not None else {}
+    cursor = db.meals.find(
+        {**scope, "timestamp": {"$ne": None}},
+        {"user_id": 1, "timestamp": 1, "ingredients": 1},
+    ).batch_size(batch_size)
+    batch = []
+    async for meal in cursor:
+        batch.append(meal)
+        if len(batch) >= batch_size:
+            await add_batch(batch)
+            batch = []
+    if batch:
+        await add_batch(batch)
+
+    rollups = [
+        {"user_id": key[0], "date": key[1], "meal_count": meal_count, "nutrients": nutrients}
+        for key, nutrients, meal_count in days.items()
+    ]
+    written = await replace_daily_rollups(db, rollups, user_id)
+    logger.info(f"Rebuilt {written} daily rollups from {sum(days.counts.values())} meals")
+    return written
+
+
+def _period_start(day: str, period: str) -> str:
+    if period == "week":
+        parsed = date.fromisoformat(day)
+        return (parsed - timedelta(days=parsed.weekday())).isoformat()
+    return day
+
+
+def _annotate(nutrients: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    return {name: {"value": value, "unit": NUTRIENT_UNITS.get(name, "unknown")} for name, value in nutrients.items()}
+
+
+async def get_nutrient_summary(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    start: date,
+    end: date,
+    period: Literal["day", "week"] = "day",
+) -> Dict[str, Any]:
+    """
+    Summarizes a user's nutrient intake per day or per ISO week from the daily rollups.
+
+    Reads one document per day with meals, independent of how many meals there are.
+
+    Args:
+        db: The database connection.
+        user_id: The user to summarize.
+        start: First day of the range (inclusive).
+        end: Last day of the range (inclusive).
+        period: "day" or "week" (weeks start on Monday).
+
+    Returns:
+        A dict with the range, one entry per period that has meals, and the overall totals.
+
+    Raises:
+        MealCreationError: If a database error occurs.
+    """
+    try:
+        rollups = await get_daily_rollups(db, user_id, start.isoformat(), end.isoformat())
+    except PyMongoError as e:
+        logger.error(f"Database error while summarizing meals for user {user_id}: {e}")
+        raise MealCreationError(f"Failed to summarize meals due to a database error: {e}")
+
+    periods: Dict[str, Dict[str, Any]] = {}
+    totals: Dict[str, float] = defaultdict(float)
+    meal_count = 0
+    for rollup in rollups:
+        key = _period_start(rollup["date"], period)
+        entry = periods.setdefault(key, {"start": key, "meal_count": 0, "nutrients": defaultdict(float)})
+        entry["meal_count"] += rollup.get("meal_count", 0)
+        meal_count += rollup.get("meal_count", 0)
+        for name, value in (rollup.get("nutrients") or {}).items():
+            entry["nutrients"][name] += value
+            totals[name] += value
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "period": period,
+        "meal_count": meal_count,
+        "periods": [{**entry, "nutrients": _annotate(entry["nutrients"])} for entry in periods.values()],
+        "totals": _annotate(totals),
+    }
@@ -1,22 +1,34 @@
 from app.models.user import UserCreate, UserOut
-from app.repositories.user import create_user, get_user_by_username
-from app.core.security import hash_password, verify_password, create_access_token
+from app.repositories.user import create_user, get_user_by_username, update_user_password
+from app.core.security import hash_password, verify_password, password_needs_rehash, create_access_token
 from fastapi import HTTPException
 from loguru import logger
+from pymongo.errors import PyMongoError
+from app.exceptions.user import PasswordHashingBusyError
 
 async def register_user(db, user: UserCreate) -> UserOut:
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     user_dict = user.model_dump()  # Updated from user.dict()
     user_dict["password"] = hashed_password
     user_id = await create_user(db, user_dict)
-    logger.info(f"User registered: {user.username}")
+    logger.info("User registered: {}", user.username)
     return UserOut(id=user_id, username=user.username, email=user.email)
 
 async def login_user(db, username: str, password: str) -> str:
     user = await get_user_by_username(db, username)
-    if not user or not verify_password(password, user["password"]):
+    if not user or not await verify_password(password, user["password"]):
         logger.warning(f"Login failed for username: {username}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if password_needs_rehash(user["password"]):
+        # The plain password is only available here, so upgrade the hash to the configured cost now
+        try:
+            await update_user_password(db, user["_id"], await hash_password(password))
+            logger.info("Rehashed password for username: {}", username)
+        except PasswordHashingBusyError:
+            # The credentials are already verified; keep the old hash and retry on a later login
+            logger.warning("Skipped password rehash for username {}: hashing pool is busy", username)
+        except PyMongoError as e:
+            logger.error(f"Failed to store rehashed password for username {username}: {e}")
     token = create_access_token({"sub": str(user["_id"])})
-    logger.info(f"User logged in: {username}")
+    logger.info("User logged in: {}", username)
     return token
\ No newline at end of file
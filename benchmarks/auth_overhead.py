@@ -0,0 +1,51 @@
+"""
+Benchmark: per-request authentication overhead of get_current_user.
+
+Issues tokens for a pool of users and times the auth dependency for each JWT
+backend (python-jose and PyJWT) with the verified-token cache off and on. Each
+sample is one dependency call, i.e. the auth work every protected request pays.
+No database is needed.
+
+    python -m benchmarks.auth_overhead --users 100 --requests 20000
+"""
+import argparse
+import random
+from unittest.mock import patch
+
+from app.core import security
+from app.core.config import settings
+from app.dependencies.auth import get_current_user
+from benchmarks.common import print_table, summarize, time_sync
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="Distinct tokens in rotation")
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = {}
+    for backend in ("jose", "pyjwt"):
+        with patch.object(settings, "JWT_BACKEND", backend):
+            tokens = [security.create_access_token({"sub": f"user-{i}"}) for i in range(args.users)]
+            sequence = [rng.choice(tokens) for _ in range(args.requests)]
+            for cached in (False, True):
+                security.token_cache.clear()
+                calls = iter(sequence)
+                with patch.object(settings, "TOKEN_CACHE_ENABLED", cached):
+                    samples = time_sync(lambda: get_current_user(next(calls)), args.requests)
+                label = f"{backend:<6} cache {'on' if cached else 'off'}"
+                rows[label] = summarize(samples)
+                if cached:
+                    stats = security.token_cache.stats()
+                    rows[label]["hit_ratio"] = stats["hit_ratio"]
+
+    print_table(f"get_current_user per request ({args.users} users, {args.requests} requests)", rows)
+    for label, stats in rows.items():
+        if "hit_ratio" in stats:
+            print(f"  {label}: hit ratio {stats['hit_ratio']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: bandwidth and latency of GET /ingredients/ with and without compression.
+
+Calls the real application in-process (httpx ASGI transport) for one page of
+synthetic ingredients, once per Accept-Encoding, with the database reads replaced
+by canned results so that only routing, serialization and compression are timed.
+Reports the bytes on the wire, the server-side time and the estimated time until
+the last byte arrives over a link of --mbps megabits per second.
+
+    python -m benchmarks.compression --limit 1000 --mbps 10
+"""
+import argparse
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from app.core.compression import brotli
+from app.dependencies.auth import get_current_user
+from app.main import app
+from app.models.ingredient import IngredientList
+from benchmarks.common import print_table, summarize, time_async
+from benchmarks.response_serialization import make_documents
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=1_000, help="Ingredients in the page")
+    parser.add_argument("--nutrients", type=int, default=40)
+    parser.add_argument("--mbps", type=float, default=10.0, help="Link bandwidth used for the transfer estimate")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    page = IngredientList.validate_python(make_documents(args.limit, args.nutrients))
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+    async def current_user():
+        return "bench-user"
+
+    app.dependency_overrides[get_current_user] = current_user
+    transport = httpx.ASGITransport(app=app)
+    url = f"/api/v1/ingredients/?limit={args.limit}"
+    rows, wire = {}, {}
+    try:
+        with patch("app.api.v1.ingredient.get_catalog_version", new_callable=AsyncMock, return_value=(1, None)), \
+             patch("app.api.v1.ingredient.get_ingredients", new_callable=AsyncMock, return_value=(page, None)):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for encoding in encodings:
+                    headers = {"Accept-Encoding": encoding}
+                    response = await client.get(url, headers=headers)
+                    assert response.headers.get("content-encoding", "identity") == encoding
+                    wire[encoding] = response.num_bytes_downloaded
+                    rows[encoding] = summarize(await time_async(lambda: client.get(url, headers=headers), args.repeat))
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    print_table(f"GET /ingredients/ with {args.limit} ingredients (server side)", rows)
+    bytes_per_second = args.mbps * 1e6 / 8
+    print(f"\n{'encoding':<10} {'bytes':>12} {'ratio':>7} {'est. last byte at ' + str(args.mbps) + ' Mbit/s':>30}")
+    for encoding in encodings:
+        total_ms = rows[encoding]["p50_ms"] + wire[encoding] / bytes_per_second * 1000
+        print(f"{encoding:<10} {wire[encoding]:>12,} {wire['identity'] / wire[encoding]:>6.1f}x {total_ms:>27.1f} ms")
+    if brotli is None:
+        print("\n(brotli is not installed; `pip install brotli` to include it)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
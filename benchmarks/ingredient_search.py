@@ -0,0 +1,116 @@
+"""
+Benchmark: indexed ingredient name search vs. the legacy unanchored regex scan.
+
+Seeds a scratch database with synthetic ingredients (100k by default), creates the
+same indexes the application creates at startup and times both query paths over a
+fixed set of autocomplete-style queries. Requires a running mongod.
+
+    python -m benchmarks.ingredient_search --count 100000 --uri mongodb://localhost:27017
+
+The scratch database is dropped afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import random
+import re
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.text import normalize_text
+from app.repositories.indexes import ensure_indexes
+from app.repositories.ingredient import search_fields, search_ingredients
+from benchmarks.common import print_table, summarize, time_async
+
+ADJECTIVES = ["raw", "roasted", "dried", "frozen", "canned", "smoked", "organic", "fresh", "boiled", "fried"]
+FOODS = [
+    "apple", "banana", "chicken", "beef", "salmon", "rice", "oats", "lentils", "spinach", "tomato",
+    "crème fraîche", "jalapeño", "yogurt", "almond", "broccoli", "potato", "quinoa", "tofu", "cheddar", "egg",
+]
+FORMS = ["whole", "sliced", "diced", "puree", "juice", "powder", "fillet", "breast", "leaves", "flakes"]
+QUERIES = ["ap", "apple", "chick", "creme", "jalapeno", "roasted sal", "powder", "e", "xyz", "oats whole"]
+
+
+def make_ingredient(i: int, rng: random.Random) -> dict:
+    name = f"{rng.choice(FOODS).capitalize()}, {rng.choice(ADJECTIVES)} {rng.choice(FORMS)} #{i}"
+    return {
+        "name": name,
+        "description": None,
+        "quantity": 100.0,
+        "unit": 1.0,
+        "reference_quantity": 100.0,
+        "reference_unit": "g",
+        "nutrients": {"Energy": rng.uniform(0, 900), "Protein": rng.uniform(0, 40)},
+        **search_fields(name),
+    }
+
+
+async def seed(db, count: int) -> None:
+    rng = random.Random(42)
+    await db.ingredients.drop()
+    batch = []
+    for i in range(count):
+        batch.append(make_ingredient(i, rng))
+        if len(batch) == 5000:
+            await db.ingredients.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.ingredients.insert_many(batch, ordered=False)
+    await ensure_indexes(db, ["ingredients"])
+
+
+async def legacy_search(db, query: str) -> list:
+    # The pre-change repository query, kept verbatim for comparison
+    cursor = db.ingredients.find({"name": {"$regex": query, "$options": "i"}})
+    return await cursor.to_list(length=None)
+
+
+async def docs_examined(db, filter_: dict, limit: int = 0) -> int:
+    command = {"find": "ingredients", "filter": filter_}
+    if limit:
+        command["limit"] = limit
+    plan = await db.command("explain", command, verbosity="executionStats")
+    return plan["executionStats"]["totalDocsExamined"]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="meal_tracker_bench_search")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client[args.db]
+    try:
+        print(f"Seeding {args.count} ingredients into '{args.db}'...")
+        await seed(db, args.count)
+
+        legacy_samples, indexed_samples = [], []
+        rows = {}
+        for query in QUERIES:
+            legacy = await time_async(lambda: legacy_search(db, query), args.repeat)
+            indexed = await time_async(lambda: search_ingredients(db, query, limit=args.limit), args.repeat)
+            legacy_samples += legacy
+            indexed_samples += indexed
+            rows[f"legacy regex   '{query}'"] = summarize(legacy)
+            rows[f"indexed search '{query}'"] = summarize(indexed)
+        rows["legacy regex   (all queries)"] = summarize(legacy_samples)
+        rows["indexed search (all queries)"] = summarize(indexed_samples)
+        print_table(f"Ingredient search over {args.count} documents (limit={args.limit})", rows)
+
+        print("\nDocuments examined per query (explain executionStats)")
+        for query in QUERIES:
+            legacy = await docs_examined(db, {"name": {"$regex": query, "$options": "i"}})
+            prefix = await docs_examined(db, {"name_normalized": {"$regex": "^" + re.escape(normalize_text(query))}}, args.limit)
+            print(f"  '{query}': legacy={legacy} indexed prefix tier={prefix}")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.db)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,296 @@
+"""
+Load test: the main user flows end to end, against a seeded database.
+
+Runs the real application, either in-process (httpx ASGI transport, lifespan
+included) or under uvicorn on a local port, against a mongod at --uri or, with
+--backend memory, an in-memory Motor stand-in (mongomock-motor; no query
+planner, so the startup plan check is skipped and timings say little about
+index use). A scratch database is seeded with --users users, --ingredients
+ingredients and --meals-per-user meals per user, then each flow is driven for
+--requests requests by --concurrency concurrent clients:
+
+    register            POST /users/register with a new user
+    login               POST /users/login as a seeded user
+    meal_create         POST /meals/ with 1-5 seeded ingredients
+    meal_list           GET /meals/ (first page, counter total)
+    meal_detailed       GET /meals/{id}/detailed of a seeded meal
+    ingredient_search   GET /ingredients/search for a seeded name
+
+Throughput and latency percentiles are printed and, with --output, written as
+JSON so that runs can be compared (see --compare).
+
+    python -m benchmarks.load_test --backend memory --requests 500 --output before.json
+    python -m benchmarks.load_test --uri mongodb://localhost:27017 --server uvicorn --output after.json --compare before.json
+
+The scratch database is dropped afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import platform
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.core.security import create_access_token, hash_password
+from app.dependencies.database import set_mongo_client
+from app.main import app
+from app.models.meal import Meal
+from app.repositories.ingredient import search_fields
+from app.services.meal import create_meal_entries
+from benchmarks.common import print_table, summarize
+
+FLOWS = ("register", "login", "meal_create", "meal_list", "meal_detailed", "ingredient_search")
+PASSWORD = "load-test-password"
+FOODS = ["rice", "chicken", "lentil", "oat", "apple", "salmon", "tofu", "spinach", "yogurt", "almond", "bean", "potato"]
+STYLES = ["raw", "boiled", "roasted", "brown", "white", "smoked", "whole", "dried", "fresh", "canned"]
+
+
+def ingredient_name(i: int) -> str:
+    return f"{STYLES[i % len(STYLES)]} {FOODS[(i // len(STYLES)) % len(FOODS)]} {i}"
+
+
+async def seed(db, args, rng: random.Random) -> dict:
+    """Seeds ingredients, users (sharing one password hash) and their meals."""
+    for collection in await db.list_collection_names():
+        await db[collection].drop()
+
+    ingredients = []
+    for i in range(args.ingredients):
+        name = ingredient_name(i)
+        ingredients.append({
+            "name": name,
+            "quantity": 100.0,
+            "unit": 1.0,
+            "reference_quantity": 100.0,
+            "reference_unit": "g",
+            "nutrients": {"Energy": rng.uniform(0, 900), "Protein": rng.uniform(0, 40), "Fat": rng.uniform(0, 60)},
+            **search_fields(name),
+        })
+    ingredient_ids = [str(i) for i in (await db.ingredients.insert_many(ingredients)).inserted_ids]
+
+    password_hash = await hash_password(PASSWORD)
+    users = [{"username": f"load-user-{i}", "email": f"load-user-{i}@example.com", "password": password_hash} for i in range(args.users)]
+    user_ids = [str(i) for i in (await db.users.insert_many(users)).inserted_ids]
+
+    meals = []  # (user index, meal id)
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    for index, user_id in enumerate(user_ids):
+        batch = [make_meal(rng, ingredient_ids, start + timedelta(hours=8 * n)) for n in range(args.meals_per_user)]
+        for offset in range(0, len(batch), settings.MEAL_BATCH_MAX_SIZE):
+            results = await create_meal_entries(db, batch[offset:offset + settings.MEAL_BATCH_MAX_SIZE], user_id)
+            meals += [(index, result["meal"].id) for result in results if result["status"] == "created"]
+
+    return {
+        "ingredient_ids": ingredient_ids,
+        "usernames": [user["username"] for user in users],
+        "tokens": [create_access_token({"sub": user_id}) for user_id in user_ids],
+        "meals": meals,
+    }
+
+
+def make_meal(rng: random.Random, ingredient_ids: list, timestamp=None) -> Meal:
+    return Meal(**{
+        "_id": "",
+        "user_id": "",
+        "name": f"{rng.choice(STYLES)} {rng.choice(FOODS)} bowl",
+        "timestamp": timestamp,
+        "ingredients": [
+            {"ingredient": rng.choice(ingredient_ids), "quantity": round(rng.uniform(5, 300), 1)}
+            for _ in range(rng.randint(1, 5))
+        ],
+    })
+
+
+def build_request(flow: str, i: int, data: dict, rng: random.Random, run_id: str) -> tuple:
+    """Returns (method, url, request kwargs) for request `i` of `flow`."""
+    user = rng.randrange(len(data["tokens"]))
+    auth = {"Authorization": f"Bearer {data['tokens'][user]}"}
+    if flow == "register":
+        username = f"load-{run_id}-{i}"
+        return "POST", "/api/v1/users/register", {"json": {"username": username, "email": f"{username}@example.com", "password": PASSWORD}}
+    if flow == "login":
+        return "POST", "/api/v1/users/login", {"json": {"username": data["usernames"][user], "password": PASSWORD}}
+    if flow == "meal_create":
+        meal = make_meal(rng, data["ingredient_ids"])
+        return "POST", "/api/v1/meals/", {"headers": auth, "content": meal.model_dump_json(by_alias=True, exclude_none=True)}
+    if flow == "meal_list":
+        return "GET", "/api/v1/meals/?page_size=20", {"headers": auth}
+    if flow == "meal_detailed":
+        owner, meal_id = rng.choice(data["meals"])
+        return "GET", f"/api/v1/meals/{meal_id}/detailed", {"headers": {"Authorization": f"Bearer {data['tokens'][owner]}"}}
+    if flow == "ingredient_search":
+        words = ingredient_name(rng.randrange(len(data["ingredient_ids"]))).split()
+        return "GET", f"/api/v1/ingredients/search?query={words[0]}+{words[1]}", {"headers": auth}
+    raise ValueError(f"Unknown flow: {flow}")
+
+
+async def run_flow(client: httpx.AsyncClient, flow: str, requests: int, concurrency: int, data: dict, seed_value: int, run_id: str) -> dict:
+    rng = random.Random(seed_value)
+    prepared = [build_request(flow, i, data, rng, run_id) for i in range(requests)]
+    samples, statuses = [], collections.Counter()
+    queue = iter(prepared)
+
+    async def worker() -> None:
+        for method, url, kwargs in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        **summarize(samples),
+        "errors": errors,
+        "statuses": dict(statuses),
+        "seconds": elapsed,
+        "throughput_rps": len(samples) / elapsed,
+    }
+
+
+@asynccontextmanager
+async def serve(mode: str, port: int):
+    """Starts the app (with its lifespan) and yields the base URL and transport to reach it."""
+    if mode == "inprocess":
+        async with app.router.lifespan_context(app):
+            yield "http://loadtest", httpx.ASGITransport(app=app)
+        return
+
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        await asyncio.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}", None
+    finally:
+        server.should_exit = True
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+
+def memory_client():
+    from mongomock.collection import BulkOperationBuilder
+    from mongomock_motor import AsyncMongoMockClient
+
+    # pymongo >= 4.11 passes UpdateOne's (unset) sort to the bulk builder, which
+    # mongomock 4.3 does not accept yet
+    add_update = BulkOperationBuilder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock does not support UpdateOne(sort=...)")
+        return add_update(self, *args, **kwargs)
+
+    BulkOperationBuilder.add_update = add_update_without_sort
+    return AsyncMongoMockClient()
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["flows"]
+    print(f"\nCompared with {baseline_path}")
+    print(f"{'flow':<20} {'rps':>10} {'change':>8} {'p50 ms':>9} {'change':>8} {'p99 ms':>9} {'change':>8}")
+    for flow, result in current.items():
+        before = baseline.get(flow)
+        if before is None:
+            continue
+        change = lambda key: f"{(result[key] / before[key] - 1) * 100:+.0f}%" if before[key] else "n/a"
+        print(
+            f"{flow:<20} {result['throughput_rps']:>10.1f} {change('throughput_rps'):>8} "
+            f"{result['p50_ms']:>9.2f} {change('p50_ms'):>8} {result['p99_ms']:>9.2f} {change('p99_ms'):>8}"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["mongo", "memory"], default="mongo")
+    parser.add_argument("--uri", default=settings.MONGO_URI)
+    parser.add_argument("--db", default="meal_tracker_loadtest", help="Scratch database, dropped afterwards")
+    parser.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--ingredients", type=int, default=2_000)
+    parser.add_argument("--meals-per-user", type=int, default=20)
+    parser.add_argument("--flows", default=",".join(FLOWS), help="Comma-separated subset of: " + ", ".join(FLOWS))
+    parser.add_argument("--requests", type=int, default=1_000, help="Requests per flow")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per flow")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+    flows = [flow.strip() for flow in args.flows.split(",") if flow.strip()]
+    unknown = set(flows) - set(FLOWS)
+    if unknown:
+        parser.error(f"unknown flows: {', '.join(sorted(unknown))}")
+
+    settings.DB_NAME = args.db
+    if args.backend == "memory":
+        client = memory_client()
+        settings.INDEX_PLAN_CHECK = "off"  # mongomock has no query planner
+        set_mongo_client(client)
+    else:
+        settings.MONGO_URI = args.uri
+        client = AsyncIOMotorClient(args.uri)
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    data = await seed(client[args.db], args, rng)
+    print(f"Seeded {args.users} users, {args.ingredients} ingredients and {len(data['meals'])} meals in {time.perf_counter() - start:.1f}s")
+
+    run_id = f"{int(time.time())}"
+    results = {}
+    try:
+        async with serve(args.server, args.port) as (base_url, transport):
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=60) as http:
+                for n, flow in enumerate(flows):
+                    if args.warmup:
+                        await run_flow(http, flow, args.warmup, args.concurrency, data, args.seed + 1000 + n, f"{run_id}w")
+                    results[flow] = await run_flow(http, flow, args.requests, args.concurrency, data, args.seed + n, run_id)
+    finally:
+        if not args.keep:
+            await client.drop_database(args.db)
+        if args.backend == "mongo":
+            client.close()
+
+    print_table(f"{args.server} app, {args.backend} backend, {args.requests} requests per flow, {args.concurrency} concurrent", results)
+    print(f"\n{'flow':<20} {'rps':>10} {'errors':>8}  statuses")
+    for flow, result in results.items():
+        print(f"{flow:<20} {result['throughput_rps']:>10.1f} {result['errors']:>8}  {result['statuses']}")
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "config": {**config, "flows": flows, "bcrypt_rounds": settings.BCRYPT_ROUNDS},
+            "flows": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark: per-request logging overhead under concurrent load.
+
+Drives GET /ingredients/search in-process (httpx ASGI transport) with --concurrency
+requests in flight, with the database reads replaced by canned results so that the
+service and repository logging is a visible share of each request. The same load
+is run without sinks and with each logging configuration, writing to log files in
+a temporary directory (the stdout sink is redirected to a file there too):
+
+    sync       the previous setup: DEBUG file + INFO stdout, written on the event loop
+    enqueue    the same sinks behind loguru's queue (LOG_WRITER=enqueue)
+    thread     the same sinks behind BackgroundWriter threads (LOG_WRITER=thread)
+    sampled    thread plus LOG_SAMPLE_RATES for the per-request modules
+    json       thread with LOG_FORMAT=json
+
+    python -m benchmarks.logging_overhead --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.core.logger import configure_logging
+from app.dependencies.auth import get_current_user
+from app.main import app
+from benchmarks.common import print_table, summarize
+from benchmarks.response_serialization import make_documents
+
+CONFIGURATIONS = {
+    "no sinks": None,
+    "sync": {"LOG_WRITER": "sync"},
+    "enqueue": {"LOG_WRITER": "enqueue"},
+    "thread": {"LOG_WRITER": "thread"},
+    "sampled": {"LOG_WRITER": "thread", "LOG_SAMPLE_RATES": "app.services.ingredient=0.01,app.repositories=0.01"},
+    "json": {"LOG_WRITER": "thread", "LOG_FORMAT": "json"},
+}
+
+
+def apply_configuration(overrides, directory: str) -> None:
+    if overrides is None:
+        logger.remove()
+        return
+    values = {
+        "LOG_LEVEL": "INFO", "LOG_FILE": os.path.join(directory, "app.log"), "LOG_FILE_LEVEL": "DEBUG",
+        "LOG_WRITER": "sync", "LOG_FORMAT": "text", "LOG_SAMPLE_RATES": "", **overrides,
+    }
+    for name, value in values.items():
+        setattr(settings, name, value)
+    configure_logging()
+
+
+async def run_load(client: httpx.AsyncClient, requests: int, concurrency: int) -> tuple:
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(f"/api/v1/ingredients/search?query=ingredient+{i % 100}")
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return samples, time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--results", type=int, default=20, help="Ingredients per search response")
+    args = parser.parse_args()
+
+    results = make_documents(args.results, 10)
+    saved = {name: getattr(settings, name) for name in ("LOG_LEVEL", "LOG_FILE", "LOG_FILE_LEVEL", "LOG_WRITER", "LOG_FORMAT", "LOG_SAMPLE_RATES")}
+
+    async def current_user():
+        return "bench-user"
+
+    app.dependency_overrides[get_current_user] = current_user
+    rows, throughput = {}, {}
+    try:
+        with tempfile.TemporaryDirectory() as directory, \
+             open(os.path.join(directory, "stdout.log"), "w") as stdout, \
+             patch("sys.stdout", stdout), \
+             patch("app.services.ingredient.repo_get_catalog_version", new_callable=AsyncMock, return_value=None), \
+             patch("app.services.ingredient.repo_search_ingredients", new_callable=AsyncMock, side_effect=lambda *a, **k: [dict(d) for d in results]):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                for label, overrides in CONFIGURATIONS.items():
+                    apply_configuration(overrides, directory)
+                    await run_load(client, min(500, args.requests), args.concurrency)  # warm-up
+                    samples, elapsed = await run_load(client, args.requests, args.concurrency)
+                    await logger.complete()
+                    rows[label] = summarize(samples)
+                    throughput[label] = args.requests / elapsed
+                # Stop the writer threads while stdout still points at the file
+                logger.remove()
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+        for name, value in saved.items():
+            setattr(settings, name, value)
+        configure_logging()
+
+    print_table(f"GET /ingredients/search, {args.requests} requests, {args.concurrency} in flight", rows)
+    baseline = 1000 / throughput["no sinks"]
+    for label, rate in throughput.items():
+        print(f"  {label:<10} {rate:8.0f} req/s   logging cost {1000 / rate - baseline:+.3f} ms of loop time per request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
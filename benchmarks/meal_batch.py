@@ -0,0 +1,122 @@
+"""
+Benchmark: POST /meals/batch service path vs. creating the same meals one by one.
+
+Seeds a scratch database with synthetic ingredients, then creates the same synthetic
+offline-sync workload twice: through create_meal_entry once per meal, and through
+create_meal_entries in batches. The ingredient cache is emptied before each run so
+both start cold. Rollups and meal counters are updated as in production. Requires
+a running mongod.
+
+    python -m benchmarks.meal_batch --meals 2000 --batch-size 50 --uri mongodb://localhost:27017
+
+The scratch database is dropped afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.models.meal import Meal
+from app.repositories.indexes import ensure_indexes
+from app.repositories.ingredient import search_fields
+from app.services.ingredient_cache import ingredient_cache
+from app.services.meal import create_meal_entries, create_meal_entry
+from benchmarks.common import print_table, summarize
+
+
+async def seed(db, count: int) -> list:
+    rng = random.Random(42)
+    await db.ingredients.drop()
+    ingredients = []
+    for i in range(count):
+        name = f"Ingredient {i}"
+        ingredients.append({
+            "name": name,
+            "quantity": 100.0,
+            "unit": 1.0,
+            "reference_quantity": 100.0,
+            "reference_unit": "g",
+            "nutrients": {"Energy": rng.uniform(0, 900), "Protein": rng.uniform(0, 40)},
+            **search_fields(name),
+        })
+    result = await db.ingredients.insert_many(ingredients, ordered=False)
+    await ensure_indexes(db)
+    return [str(ingredient_id) for ingredient_id in result.inserted_ids]
+
+
+def make_meals(count: int, ingredient_ids: list, per_meal: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        Meal(**{
+            "_id": "",
+            "user_id": "",
+            "name": f"Meal {i}",
+            "ingredients": [
+                {"ingredient": rng.choice(ingredient_ids), "quantity": rng.uniform(5, 300)}
+                for _ in range(rng.randint(1, 2 * per_meal - 1))
+            ],
+        })
+        for i in range(count)
+    ]
+
+
+async def run_one_by_one(db, meals: list, user_id: str) -> list:
+    samples = []
+    for meal in meals:
+        start = time.perf_counter()
+        await create_meal_entry(db, meal, user_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run_batched(db, meals: list, user_id: str, batch_size: int) -> list:
+    samples = []
+    for start_index in range(0, len(meals), batch_size):
+        start = time.perf_counter()
+        await create_meal_entries(db, meals[start_index:start_index + batch_size], user_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="meal_tracker_bench_batch")
+    parser.add_argument("--ingredients", type=int, default=5_000)
+    parser.add_argument("--meals", type=int, default=2_000)
+    parser.add_argument("--per-meal", type=int, default=5, help="Average ingredients per meal")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client[args.db]
+    try:
+        print(f"Seeding {args.ingredients} ingredients into '{args.db}'...")
+        ingredient_ids = await seed(db, args.ingredients)
+        meals = make_meals(args.meals, ingredient_ids, args.per_meal)
+
+        rows, throughput = {}, {}
+        for label, run in (
+            ("one by one (per meal)", lambda: run_one_by_one(db, meals, "bench-single")),
+            (f"batched (per {args.batch_size} meals)", lambda: run_batched(db, meals, "bench-batch", args.batch_size)),
+        ):
+            await ingredient_cache.clear()
+            start = time.perf_counter()
+            samples = await run()
+            throughput[label] = args.meals / (time.perf_counter() - start)
+            rows[label] = summarize(samples)
+
+        print_table(f"Creating {args.meals} meals (~{args.per_meal} ingredients each)", rows)
+        for label, rate in throughput.items():
+            print(f"  {label}: {rate:.0f} meals/s")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.db)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
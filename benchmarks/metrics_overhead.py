@@ -0,0 +1,88 @@
+"""
+Benchmark: cost of the metrics middleware and Mongo listeners per request.
+
+Calls a bare ASGI app that answers immediately, directly and wrapped in
+MetricsMiddleware, with a scope that carries a route as the router would leave it.
+Then feeds the command and pool listeners synthetic events. The difference
+between the two ASGI cases is the per-request cost of the HTTP metrics; the
+listener timings are per Mongo command and per checkout.
+
+    python -m benchmarks.metrics_overhead --repeat 200000
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from pymongo import monitoring
+
+from app.core.metrics import MetricsMiddleware, MetricsRegistry, MongoCommandListener, MongoPoolListener
+
+
+class Route:
+    path = "/api/v1/meals/{meal_id}"
+
+
+async def endpoint(scope, receive, send) -> None:
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def time_asgi(app, repeat: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await app({"type": "http", "method": "GET", "path": "/api/v1/meals/1"}, receive, send)
+    return (time.perf_counter() - start) / repeat
+
+
+def time_listeners(registry: MetricsRegistry, repeat: int) -> tuple:
+    commands, pool = MongoCommandListener(registry), MongoPoolListener(registry)
+    address = ("localhost", 27017)
+    started = [monitoring.CommandStartedEvent({"find": "meals"}, "diet", i, address, None) for i in range(repeat)]
+    succeeded = [monitoring.CommandSucceededEvent(datetime.timedelta(microseconds=800), {"ok": 1}, "find", i, address, None) for i in range(repeat)]
+    start = time.perf_counter()
+    for begin, end in zip(started, succeeded):
+        commands.started(begin)
+        commands.succeeded(end)
+    command_cost = (time.perf_counter() - start) / repeat
+
+    checked_out = monitoring.ConnectionCheckedOutEvent(address, 1, 0.0001)
+    checked_in = monitoring.ConnectionCheckedInEvent(address, 1)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pool.connection_checked_out(checked_out)
+        pool.connection_checked_in(checked_in)
+    return command_cost, (time.perf_counter() - start) / repeat
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200_000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    await time_asgi(endpoint, 10_000)  # warm-up
+    bare = await time_asgi(endpoint, args.repeat)
+    wrapped = await time_asgi(MetricsMiddleware(endpoint, registry), args.repeat)
+    command_cost, checkout_cost = time_listeners(registry, min(args.repeat, 100_000))
+
+    print(f"\n{'case':<40} {'us per call':>12}")
+    print(f"{'bare ASGI app':<40} {bare * 1e6:>12.2f}")
+    print(f"{'with MetricsMiddleware':<40} {wrapped * 1e6:>12.2f}")
+    print(f"{'  middleware overhead per request':<40} {(wrapped - bare) * 1e6:>12.2f}")
+    print(f"{'command listener (started + succeeded)':<40} {command_cost * 1e6:>12.2f}")
+    print(f"{'pool listener (checked out + in)':<40} {checkout_cost * 1e6:>12.2f}")
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"\n/metrics render: {len(text):,} bytes in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
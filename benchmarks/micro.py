@@ -0,0 +1,258 @@
+"""
+Micro-benchmarks for the pure-Python hot spots, with a stored baseline.
+
+Each case times one operation on synthetic data (no database):
+
+    ingredient_page_validate   IngredientList.validate_python of a 100-ingredient catalog page
+    meal_page_validate         MealList.validate_python of a 20-meal history page
+    nutrient_annotation_cold   get_detailed_meal's NUTRIENT_UNITS annotation, 10 ingredients, nothing memoized
+    nutrient_annotation_warm   the same with every ingredient already memoized
+    access_token_create        create_access_token
+    access_token_decode        decode_token (signature and expiry check)
+    access_token_verify_cached verify_token served from the verified-token cache
+    routing_root               GET / through the full ASGI stack (middleware, router, endpoint)
+    routing_unmatched          GET of an unknown path: every route is tried before the 404
+
+Each case is run in loops of at least --min-time seconds, --repeat times, with
+log sinks removed so that LOG_* settings do not skew the timings. The best loop
+(per operation) is what gets compared, as with timeit: slower loops measure
+interference from the rest of the machine. Without --save the results are
+compared with the baseline file and any case slower by more than --threshold
+percent is flagged; the exit status is 1 if any is. Baselines are only
+comparable on the same machine and Python version.
+
+    python -m benchmarks.micro --save                  # record benchmarks/baseline.json
+    python -m benchmarks.micro --threshold 10          # check against it
+    python -m benchmarks.micro --cases access_token    # only cases containing this
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Union
+
+from bson import ObjectId
+from loguru import logger
+
+from app.core.security import create_access_token, decode_token, verify_token
+from app.main import app
+from app.models.ingredient import IngredientList
+from app.models.meal import MealList
+from app.services.meal import annotate_nutrients, clear_nutrient_annotations
+from benchmarks.response_serialization import make_documents
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+Operation = Union[Callable[[], object], Callable[[], Awaitable[object]]]
+CASES: Dict[str, Callable[[], Operation]] = {}
+
+
+def case(name: str):
+    """Registers a setup function returning the operation to time."""
+    def register(setup: Callable[[], Operation]) -> Callable[[], Operation]:
+        CASES[name] = setup
+        return setup
+    return register
+
+
+@case("ingredient_page_validate")
+def ingredient_page_validate() -> Operation:
+    documents = make_documents(100, 40)
+    return lambda: IngredientList.validate_python(documents)
+
+
+@case("meal_page_validate")
+def meal_page_validate() -> Operation:
+    start = datetime(2024, 1, 1)
+    meals = [
+        {
+            "_id": str(ObjectId()),
+            "user_id": "micro-user",
+            "name": f"Meal {i}",
+            "ingredients": [{"ingredient_id": str(ObjectId()), "quantity": 50.0 + n} for n in range(5)],
+            "timestamp": start + timedelta(hours=i),
+            "updated_at": start + timedelta(hours=i),
+        }
+        for i in range(20)
+    ]
+    return lambda: MealList.validate_python(meals)
+
+
+def _meal_ingredients() -> list:
+    return [(document["_id"], document["nutrients"]) for document in make_documents(10, 40)]
+
+
+@case("nutrient_annotation_cold")
+def nutrient_annotation_cold() -> Operation:
+    ingredients = _meal_ingredients()
+
+    def annotate() -> None:
+        clear_nutrient_annotations()
+        for ingredient_id, nutrients in ingredients:
+            annotate_nutrients(ingredient_id, nutrients)
+
+    return annotate
+
+
+@case("nutrient_annotation_warm")
+def nutrient_annotation_warm() -> Operation:
+    ingredients = _meal_ingredients()
+
+    def annotate() -> None:
+        for ingredient_id, nutrients in ingredients:
+            annotate_nutrients(ingredient_id, nutrients)
+
+    clear_nutrient_annotations()
+    annotate()
+    return annotate
+
+
+@case("access_token_create")
+def access_token_create() -> Operation:
+    return lambda: create_access_token({"sub": "64b7f0c2a1e4c3b2a1f0e9d8"})
+
+
+@case("access_token_decode")
+def access_token_decode() -> Operation:
+    token = create_access_token({"sub": "64b7f0c2a1e4c3b2a1f0e9d8"})
+    return lambda: decode_token(token)
+
+
+@case("access_token_verify_cached")
+def access_token_verify_cached() -> Operation:
+    token = create_access_token({"sub": "64b7f0c2a1e4c3b2a1f0e9d8"})
+    verify_token(token)
+    return lambda: verify_token(token)
+
+
+def _asgi_get(path: str) -> Operation:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"micro"), (b"accept-encoding", b"gzip")], "client": ("127.0.0.1", 1), "server": ("micro", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    return lambda: app(dict(scope), receive, send)
+
+
+@case("routing_root")
+def routing_root() -> Operation:
+    return _asgi_get("/")
+
+
+@case("routing_unmatched")
+def routing_unmatched() -> Operation:
+    return _asgi_get("/api/v1/no/such/route")
+
+
+def measure(operation: Operation, repeat: int, min_time: float) -> Dict[str, float]:
+    """Median and best time per operation in microseconds, timed in loops of at least min_time seconds."""
+    probe = operation()  # Lambdas wrapping a coroutine call only show what they are once called
+    if asyncio.iscoroutine(probe):
+        probe.close()
+        loop = asyncio.new_event_loop()
+
+        async def batch(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                await operation()
+            return time.perf_counter() - start
+
+        run = lambda number: loop.run_until_complete(batch(number))
+    else:
+        loop = None
+
+        def run(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                operation()
+            return time.perf_counter() - start
+
+    number = 1
+    while run(number) < min_time:
+        number *= 2
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = [run(number) / number * 1e6 for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+        if loop is not None:
+            loop.close()
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "loops": number}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per timed loop")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=15.0, help="Percent slowdown flagged as a regression")
+    parser.add_argument("--save", action="store_true", help="Write the results to the baseline file instead of comparing")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.cases in name]
+    if not names:
+        parser.error(f"no case matches {args.cases!r}; cases: {', '.join(CASES)}")
+    logger.remove()
+    results = {name: measure(CASES[name](), args.repeat, args.min_time) for name in names}
+
+    if args.save:
+        baseline = {"cases": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        })
+        baseline["cases"].update({name: {key: round(value, 3) for key, value in result.items()} for name, result in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        for name, result in results.items():
+            print(f"{name:<28} {result['min_us']:>12.2f} us (median {result['median_us']:.2f})")
+        print(f"\nSaved {len(results)} case(s) to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("python") != platform.python_version():
+        print(f"warning: baseline was recorded on Python {baseline.get('python')}, running {platform.python_version()}")
+    regressions = []
+    print(f"{'case':<28} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print(f"{name:<28} {'-':>12} {result['min_us']:>12.2f} {'new':>8}")
+            continue
+        change = (result["min_us"] / before["min_us"] - 1) * 100
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<28} {before['min_us']:>12.2f} {result['min_us']:>12.2f} {change:>+7.1f}%{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:g}%: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo case slower than the baseline by more than {args.threshold:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Benchmark: ingredient document size and decode time, nutrient map vs. packed storage.
+
+Encodes the same synthetic ingredients in both formats with the driver's BSON codec
+(no database needed) and reports the average document size plus the time to decode
+a batch of raw documents the way a find() would: BSON decode alone, and BSON decode
+followed by from_storage (which restores the plain nutrients map).
+
+    python -m benchmarks.nutrient_storage --ingredients 5000 --nutrients 40 --profiles 50
+"""
+import argparse
+import random
+import statistics
+
+import bson
+from bson import ObjectId
+
+from app.constants import NUTRIENT_UNITS
+from app.core.nutrients import pack_document_nutrients
+from app.repositories.ingredient import from_storage
+from benchmarks.common import print_table, summarize, time_sync
+
+
+def make_ingredients(count: int, nutrients_per_ingredient: int, profiles: int, seed: int = 42):
+    rng = random.Random(seed)
+    names = list(NUTRIENT_UNITS)
+    # Real catalogs report a few recurring nutrient sets (one per FDC data type and
+    # food group), not a random subset per food
+    nutrient_sets = [rng.sample(names, nutrients_per_ingredient) for _ in range(profiles)]
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Ingredient {i}, raw",
+            "quantity": 100.0,
+            "unit": 1.0,
+            "reference_quantity": 100.0,
+            "reference_unit": "g",
+            # FDC values carry at most three decimals
+            "nutrients": {name: round(rng.uniform(0, 50), 3) for name in rng.choice(nutrient_sets)},
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, default=5_000)
+    parser.add_argument("--nutrients", type=int, default=40, help=f"Nutrients per ingredient (max {len(NUTRIENT_UNITS)})")
+    parser.add_argument("--profiles", type=int, default=50, help="Distinct nutrient sets across the catalog")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    ingredients = make_ingredients(args.ingredients, args.nutrients, args.profiles)
+    encoded = {
+        "map": [bson.encode(ingredient) for ingredient in ingredients],
+        **{
+            f"packed {precision}": [bson.encode(pack_document_nutrients(ingredient, precision)) for ingredient in ingredients]
+            for precision in ("float64", "float32")
+        },
+    }
+
+    # Both packed layouts must decode back to exactly what was written
+    for storage, documents in encoded.items():
+        for ingredient, raw in zip(ingredients, documents):
+            assert from_storage(bson.decode(raw))["nutrients"] == ingredient["nutrients"], storage
+
+    rows = {}
+    for storage, documents in encoded.items():
+        rows[f"{storage:<14} bson decode"] = summarize(time_sync(lambda: [bson.decode(raw) for raw in documents], args.repeat))
+        rows[f"{storage:<14} + from_storage"] = summarize(
+            time_sync(lambda: [from_storage(bson.decode(raw)) for raw in documents], args.repeat)
+        )
+
+    print(f"\nAverage document size ({args.ingredients} ingredients, {args.nutrients} nutrients each)")
+    for storage, documents in encoded.items():
+        print(f"  {storage:<14} {statistics.fmean(len(raw) for raw in documents):8.1f} bytes")
+    print_table(f"Decoding {args.ingredients} documents", rows)
+
+
+if __name__ == "__main__":
+    main()
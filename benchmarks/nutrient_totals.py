@@ -0,0 +1,99 @@
+"""
+Benchmark: vectorized meal nutrient totals vs. a pure-dict loop.
+
+Generates synthetic ingredients and meals in memory (no database needed) and times
+app.services.nutrition against the straightforward per-meal dict accumulation the
+engine replaces. Both paths start from the same documents, so matrix construction
+is included in the vectorized timings.
+
+    python -m benchmarks.nutrient_totals --meals 10000
+"""
+import argparse
+import random
+
+import numpy as np
+from bson import ObjectId
+
+from app.constants import NUTRIENT_UNITS
+from app.core.nutrients import NUTRIENT_SLOTS
+from app.services.nutrition import build_ingredient_matrix, compute_meal_totals
+from benchmarks.common import print_table, summarize, time_sync
+
+
+def make_data(meal_count: int, ingredient_count: int, per_meal: int, nutrients_per_ingredient: int, seed: int = 42):
+    rng = random.Random(seed)
+    names = list(NUTRIENT_UNITS)
+    ingredients = [
+        {
+            "_id": ObjectId(),
+            "reference_quantity": rng.choice([1.0, 100.0, 250.0]),
+            "nutrients": {name: rng.uniform(0, 50) for name in rng.sample(names, nutrients_per_ingredient)},
+        }
+        for _ in range(ingredient_count)
+    ]
+    ids = [str(ingredient["_id"]) for ingredient in ingredients]
+    meals = [
+        {"ingredients": [
+            {"ingredient_id": rng.choice(ids), "quantity": rng.uniform(5, 300)}
+            for _ in range(rng.randint(1, 2 * per_meal - 1))
+        ]}
+        for _ in range(meal_count)
+    ]
+    return ingredients, meals
+
+
+def dict_loop_totals(meals, ingredients):
+    by_id = {str(ingredient["_id"]): ingredient for ingredient in ingredients}
+    results = []
+    for meal in meals:
+        totals = {}
+        for item in meal["ingredients"]:
+            ingredient = by_id.get(item["ingredient_id"])
+            if ingredient is None:
+                continue
+            scale = item["quantity"] / ingredient["reference_quantity"]
+            for name, value in ingredient["nutrients"].items():
+                totals[name] = totals.get(name, 0.0) + value * scale
+        results.append(totals)
+    return results
+
+
+def vectorized_totals(meals, ingredients):
+    columns, values, masks = build_ingredient_matrix(ingredients)
+    return compute_meal_totals(meals, columns, values, masks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meals", type=int, default=10_000)
+    parser.add_argument("--ingredients", type=int, default=2_000, help="Distinct ingredients referenced")
+    parser.add_argument("--per-meal", type=int, default=6, help="Average ingredients per meal")
+    parser.add_argument("--nutrients", type=int, default=25, help="Nutrients per ingredient")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    ingredients, meals = make_data(args.meals, args.ingredients, args.per_meal, args.nutrients)
+
+    # Both paths must agree before their timings mean anything
+    expected = dict_loop_totals(meals, ingredients)
+    totals, _, _ = vectorized_totals(meals, ingredients)
+    for position, meal_totals in enumerate(expected):
+        for name, value in meal_totals.items():
+            assert np.isclose(totals[position, NUTRIENT_SLOTS[name]], value), (position, name)
+
+    items = sum(len(meal["ingredients"]) for meal in meals)
+    matrix = build_ingredient_matrix(ingredients)
+    rows = {
+        "dict loop": summarize(time_sync(lambda: dict_loop_totals(meals, ingredients), args.repeat)),
+        "vectorized (numpy)": summarize(time_sync(lambda: vectorized_totals(meals, ingredients), args.repeat)),
+        "vectorized, matrix prebuilt": summarize(time_sync(lambda: compute_meal_totals(meals, *matrix), args.repeat)),
+    }
+    print_table(
+        f"Nutrient totals for {args.meals} meals ({items} meal ingredients, "
+        f"{args.ingredients} ingredients x {args.nutrients} nutrients)",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
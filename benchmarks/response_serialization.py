@@ -0,0 +1,89 @@
+"""
+Benchmark: serializing a large ingredient list response, before and after the fast path.
+
+"before" is what GET /ingredients used to do: validate each document with
+Ingredient.model_validate in the service, then let FastAPI validate the page again
+through response_model, run jsonable_encoder and render with json.dumps
+(JSONResponse). "after" validates the whole list once with the IngredientList
+TypeAdapter and renders the page with ModelJSONResponse (pydantic-core, straight
+to bytes). Both produce the same JSON. No database needed.
+
+    python -m benchmarks.response_serialization --ingredients 10000 --nutrients 40
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.constants import NUTRIENT_UNITS
+from app.core.responses import ModelJSONResponse
+from app.models.ingredient import Ingredient, IngredientList, PaginatedIngredients
+from benchmarks.common import print_table, summarize, time_sync
+
+
+def make_documents(count: int, nutrients_per_ingredient: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    names = list(NUTRIENT_UNITS)
+    return [
+        {
+            "_id": str(ObjectId()),
+            "name": f"Ingredient {i}, raw",
+            "quantity": 100.0,
+            "unit": 1.0,
+            "reference_quantity": 100.0,
+            "reference_unit": "g",
+            "nutrients": {name: round(rng.uniform(0, 50), 3) for name in rng.sample(names, nutrients_per_ingredient)},
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, default=10_000)
+    parser.add_argument("--nutrients", type=int, default=40, help=f"Nutrients per ingredient (max {len(NUTRIENT_UNITS)})")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    documents = make_documents(args.ingredients, args.nutrients)
+    response_field = create_model_field(name="Response", type_=PaginatedIngredients, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def before_validate():
+        return [Ingredient.model_validate(document) for document in documents]
+
+    def before_serialize(ingredients):
+        page = PaginatedIngredients(ingredients=ingredients, next_cursor=None, limit=args.ingredients)
+        content = loop.run_until_complete(serialize_response(field=response_field, response_content=page, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def after_validate():
+        return IngredientList.validate_python(documents)
+
+    def after_serialize(ingredients):
+        return ModelJSONResponse(PaginatedIngredients(ingredients=ingredients, next_cursor=None, limit=args.ingredients)).body
+
+    before_models, after_models = before_validate(), after_validate()
+    before_body, after_body = before_serialize(before_models), after_serialize(after_models)
+    assert json.loads(before_body) == json.loads(after_body)
+
+    rows = {
+        "before: validate (per document)": summarize(time_sync(before_validate, args.repeat)),
+        "before: response_model + json.dumps": summarize(time_sync(lambda: before_serialize(before_models), args.repeat)),
+        "before: total": summarize(time_sync(lambda: before_serialize(before_validate()), args.repeat)),
+        "after: validate (TypeAdapter)": summarize(time_sync(after_validate, args.repeat)),
+        "after: ModelJSONResponse": summarize(time_sync(lambda: after_serialize(after_models), args.repeat)),
+        "after: total": summarize(time_sync(lambda: after_serialize(after_validate()), args.repeat)),
+    }
+    loop.close()
+
+    print_table(f"{args.ingredients} ingredients, {args.nutrients} nutrients each ({len(after_body) / 1e6:.1f} MB of JSON)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.core.config import settings
+from app.dependencies import database
+from app.dependencies.database import (
+    connect_to_mongo,
+    close_mongo_connection,
+    get_mongo_client,
+    get_db,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    close_mongo_connection()
+    yield
+    close_mongo_connection()
+
+
+@pytest.mark.asyncio
+async def test_get_mongo_client_is_shared():
+    first = await get_mongo_client()
+    second = await get_mongo_client()
+
+    assert first is second
+    db = await get_db(first)
+    assert db.name == settings.DB_NAME
+
+
+@pytest.mark.asyncio
+async def test_client_uses_pool_settings():
+    with patch.object(settings, "MONGO_MAX_POOL_SIZE", 7), \
+         patch.object(settings, "MONGO_COMPRESSORS", "zlib"), \
+         patch("app.dependencies.database.AsyncIOMotorClient") as mock_client_cls:
+        await get_mongo_client()
+
+    _, kwargs = mock_client_cls.call_args
+    assert kwargs["maxPoolSize"] == 7
+    assert kwargs["compressors"] == "zlib"
+    assert kwargs["serverSelectionTimeoutMS"] == settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+
+
+@pytest.mark.asyncio
+async def test_connect_to_mongo_warms_up_pool():
+    mock_client = MagicMock()
+    mock_client.admin.command = AsyncMock(return_value={"ok": 1})
+    with patch.object(settings, "MONGO_WARMUP_CONNECTIONS", 3), \
+         patch("app.dependencies.database.AsyncIOMotorClient", return_value=mock_client):
+        client = await connect_to_mongo()
+
+        assert client is mock_client
+        assert mock_client.admin.command.await_count == 3
+        mock_client.admin.command.assert_awaited_with("ping")
+
+        close_mongo_connection()
+        mock_client.close.assert_called_once()
+        assert database._mongo_client is None
+
+
+@pytest.mark.asyncio
+async def test_connect_to_mongo_tolerates_failed_ping():
+    mock_client = MagicMock()
+    mock_client.admin.command = AsyncMock(side_effect=Exception("no server"))
+    with patch("app.dependencies.database.AsyncIOMotorClient", return_value=mock_client):
+        client = await connect_to_mongo()
+
+    assert client is mock_client
+
+
+def _explain_result(stage_tree):
+    return {"queryPlanner": {"winningPlan": stage_tree}}
+
+
+def test_plan_stages_walks_nested_plans():
+    from app.repositories.indexes import plan_stages
+    plan = {"queryPlan": {"stage": "LIMIT", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "IXSCAN"}, {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}},
+    ]}}}
+    assert plan_stages(plan) == ["LIMIT", "OR", "IXSCAN", "FETCH", "COLLSCAN"]
+
+
+@pytest.mark.asyncio
+async def test_find_collection_scans_reports_scanning_queries():
+    from app.repositories.indexes import HotQuery, find_collection_scans
+    mock_db = MagicMock()
+
+    async def explain(name, command, verbosity):
+        if command["find"] == "users":
+            return _explain_result({"stage": "COLLSCAN"})
+        return _explain_result({"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}})
+
+    mock_db.command = AsyncMock(side_effect=explain)
+    queries = [
+        HotQuery("user.get_user_by_username", "users", {"username": "x"}),
+        HotQuery("meal.page", "meals", {"user_id": "x"}, [("timestamp", -1), ("_id", -1)]),
+    ]
+
+    assert await find_collection_scans(mock_db, queries) == ["user.get_user_by_username"]
+    meal_command = mock_db.command.call_args_list[1].args[1]
+    assert meal_command["sort"] == {"timestamp": -1, "_id": -1}
+    assert mock_db.command.call_args.kwargs == {"verbosity": "queryPlanner"}
+
+
+@pytest.mark.asyncio
+async def test_maintain_indexes_creates_all_and_fails_on_collscan():
+    from pymongo.errors import OperationFailure
+    from app.repositories.indexes import INDEXES, maintain_indexes
+    collections = {name: MagicMock() for name in INDEXES}
+    for name, collection in collections.items():
+        collection.create_indexes = AsyncMock(return_value=[f"{name}_idx"])
+    # A unique index over duplicate data must not stop the other collections
+    collections["ingredients"].create_indexes.side_effect = OperationFailure("E11000 duplicate key")
+    mock_db = MagicMock()
+    mock_db.__getitem__.side_effect = collections.__getitem__
+    mock_db.command = AsyncMock(return_value=_explain_result({"stage": "COLLSCAN"}))
+
+    assert await maintain_indexes(mock_db, "off") == []
+    for name, collection in collections.items():
+        collection.create_indexes.assert_awaited_with(INDEXES[name])
+    mock_db.command.assert_not_called()
+
+    assert len(await maintain_indexes(mock_db, "log")) > 0
+    with pytest.raises(RuntimeError, match="COLLSCAN"):
+        await maintain_indexes(mock_db, "fail")
+
+
+@pytest.mark.asyncio
+async def test_verify_indexes_command_fails_when_plans_cannot_be_checked(capsys):
+    from pymongo.errors import ServerSelectionTimeoutError
+    from app import cli
+    from app.repositories.indexes import INDEXES
+    mock_db = MagicMock()
+    mock_db.command = AsyncMock(side_effect=ServerSelectionTimeoutError("localhost:27017: connection refused"))
+
+    with patch("app.cli.get_database", return_value=mock_db), \
+         patch("app.cli.ensure_indexes", new_callable=AsyncMock) as mock_ensure:
+        mock_ensure.return_value = {name: [] for name in INDEXES}
+        with pytest.raises(SystemExit) as exit_info:
+            await cli._verify_indexes(None)
+        assert exit_info.value.code == 2
+        assert "Could not verify query plans" in capsys.readouterr().out
+
+        # A collection whose indexes could not be created fails before the plans are checked
+        mock_ensure.return_value = {name: [] for name in INDEXES if name != "meals"}
+        with pytest.raises(SystemExit) as exit_info:
+            await cli._verify_indexes(None)
+        assert exit_info.value.code == 2
+        assert "Could not create indexes on: meals" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_startup_maintenance_runs_backfill_after_indexes():
+    from pymongo.errors import AutoReconnect
+    from app.main import _maintain_database
+    calls = []
+    with patch("app.main.maintain_indexes", new_callable=AsyncMock, side_effect=lambda db, mode: calls.append(mode)), \
+         patch("app.main.backfill_search_fields", new_callable=AsyncMock, side_effect=lambda db: calls.append("backfill")) as mock_backfill:
+        await _maintain_database(MagicMock(), "log")
+        assert calls == ["log", "backfill"]
+
+        # "fail" mode checked the indexes before serving; a failed backfill is logged, not raised
+        mock_backfill.side_effect = AutoReconnect("connection reset")
+        await _maintain_database(MagicMock(), "fail")
+        assert calls == ["log", "backfill"]
+        assert mock_backfill.await_count == 2
@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from bson import ObjectId
@@ -11,7 +12,7 @@ from app.exceptions.ingredient import (
 )
 from app.dependencies.auth import get_current_user
 # Import ANY from unittest.mock
-from unittest.mock import patch, MagicMock, ANY
+from unittest.mock import patch, MagicMock, AsyncMock, ANY
 
 client = TestClient(app)
 
@@ -101,6 +102,13 @@ mock_search_results_data = [
 mock_search_results = [Ingredient.model_validate(ing) for ing in mock_search_results_data]
 
 
+@pytest.fixture(autouse=True)
+def catalog_version():
+    # Endpoints and ingredient writes read or bump the catalog version document
+    with patch("app.services.ingredient.repo_get_catalog_version", new_callable=AsyncMock, return_value=None) as get_version, \
+         patch("app.services.ingredient.repo_bump_catalog_version", new_callable=AsyncMock) as bump_version:
+        yield get_version, bump_version
+
 # Fixture to override authentication dependency
 @pytest.fixture
 def override_auth():
@@ -217,17 +225,111 @@ async def test_create_ingredient_database_error(override_auth):
 @pytest.mark.asyncio
 async def test_list_ingredients_success(override_auth):
      # Mock the service layer function
-    with patch("app.api.v1.ingredient.get_ingredients", return_value=mock_ingredient_list) as mock_service_get:
+    with patch("app.api.v1.ingredient.get_ingredients", return_value=(mock_ingredient_list, None)) as mock_service_get:
         response = client.get("/api/v1/ingredients/")
 
-        mock_service_get.assert_awaited_once_with(ANY)
+        mock_service_get.assert_awaited_once_with(ANY, limit=100, after=None, order_by="_id")
         assert response.status_code == 200
         data = response.json()
-        assert len(data) == 2
-        assert data[0]["_id"] == mock_ingredient_list_data[0]["_id"]
-        assert data[0]["name"] == mock_ingredient_list_data[0]["name"]
-        assert data[1]["_id"] == mock_ingredient_list_data[1]["_id"]
-        assert data[1]["name"] == mock_ingredient_list_data[1]["name"]
+        assert len(data["ingredients"]) == 2
+        assert data["next_cursor"] is None
+        assert data["ingredients"][0]["_id"] == mock_ingredient_list_data[0]["_id"]
+        assert data["ingredients"][0]["name"] == mock_ingredient_list_data[0]["name"]
+        assert data["ingredients"][1]["_id"] == mock_ingredient_list_data[1]["_id"]
+        assert data["ingredients"][1]["name"] == mock_ingredient_list_data[1]["name"]
+
+# Test listing ingredients - the fast serializer matches what response_model would return
+@pytest.mark.asyncio
+async def test_list_ingredients_matches_response_model(override_auth):
+    from fastapi.encoders import jsonable_encoder
+    from app.models.ingredient import PaginatedIngredients
+
+    with patch("app.api.v1.ingredient.get_ingredients", return_value=(mock_ingredient_list, "next-token")):
+        response = client.get("/api/v1/ingredients/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    expected = PaginatedIngredients(ingredients=mock_ingredient_list, next_cursor="next-token", limit=100)
+    assert response.json() == jsonable_encoder(expected, by_alias=True)
+
+# Test listing ingredients - conditional GET is answered from the catalog version alone
+@pytest.mark.asyncio
+async def test_list_ingredients_not_modified(override_auth, catalog_version):
+    from datetime import datetime
+    get_version, _ = catalog_version
+    get_version.return_value = {"_id": "ingredients", "version": 3, "updated_at": datetime(2025, 1, 1, 8, 0, 0, 123000)}
+
+    with patch("app.api.v1.ingredient.get_ingredients", return_value=(mock_ingredient_list, None)) as mock_service_get:
+        response = client.get("/api/v1/ingredients/")
+        etag = response.headers["etag"]
+        assert response.headers["last-modified"] == "Wed, 01 Jan 2025 08:00:00 GMT"
+
+        response = client.get("/api/v1/ingredients/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+        response = client.get("/api/v1/ingredients/", headers={"If-Modified-Since": "Wed, 01 Jan 2025 08:00:00 GMT"})
+        assert response.status_code == 304
+        mock_service_get.assert_awaited_once()
+
+        # Another page, or the same page after a catalog write, is a different representation
+        assert client.get("/api/v1/ingredients/?limit=5", headers={"If-None-Match": etag}).status_code == 200
+        get_version.return_value = {"_id": "ingredients", "version": 4, "updated_at": datetime(2025, 1, 2)}
+        response = client.get("/api/v1/ingredients/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+# Test listing ingredients - large pages are compressed and still revalidate
+@pytest.mark.asyncio
+async def test_list_ingredients_compressed(override_auth):
+    page = [Ingredient.model_validate({**mock_ingredient_list_data[0], "_id": f"{i:024x}", "name": f"Ingredient {i}"}) for i in range(50)]
+
+    with patch("app.api.v1.ingredient.get_ingredients", return_value=(page, None)):
+        plain = client.get("/api/v1/ingredients/", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+        response = client.get("/api/v1/ingredients/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(plain.content) / 4
+        assert response.headers["etag"] == f"W/{plain.headers['etag']}"
+        assert response.json() == plain.json()  # httpx decodes the body
+
+        response = client.get("/api/v1/ingredients/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
+
+# Test listing ingredients - cursor is passed through in both directions
+@pytest.mark.asyncio
+async def test_list_ingredients_with_cursor(override_auth):
+    with patch("app.api.v1.ingredient.get_ingredients", return_value=(mock_ingredient_list[:1], "next-token")) as mock_service_get:
+        response = client.get("/api/v1/ingredients/?limit=1&after=prev-token&order_by=name")
+
+        mock_service_get.assert_awaited_once_with(ANY, limit=1, after="prev-token", order_by="name")
+        assert response.status_code == 200
+        assert response.json()["next_cursor"] == "next-token"
+        assert response.json()["limit"] == 1
+
+# Test listing ingredients - malformed cursor
+@pytest.mark.asyncio
+async def test_list_ingredients_invalid_cursor(override_auth):
+    response = client.get("/api/v1/ingredients/?after=not-a-cursor")
+    assert response.status_code == 400
+
+# Test listing ingredients - NDJSON streaming mode
+@pytest.mark.asyncio
+async def test_list_ingredients_stream(override_auth):
+    async def fake_stream():
+        for ing in mock_ingredient_list:
+            yield ing.model_dump_json(by_alias=True).encode() + b"\n"
+
+    with patch("app.api.v1.ingredient.stream_ingredients", return_value=fake_stream()) as mock_service_stream:
+        response = client.get("/api/v1/ingredients/?stream=true")
+
+        mock_service_stream.assert_called_once_with(ANY, after=None, order_by="_id")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.strip().split("\n")
+        assert [json.loads(line)["name"] for line in lines] == ["Chicken Breast", "Brown Rice"]
 
 
 # Test listing all ingredients - database error (via service layer)
@@ -238,10 +340,32 @@ async def test_list_ingredients_database_error(override_auth):
                side_effect=IngredientRetrievalError("Failed to retrieve ingredients due to a database error")) as mock_service_get:
         response = client.get("/api/v1/ingredients/")
         # Use assert_called_once_with for side_effect exceptions
-        mock_service_get.assert_called_once_with(ANY)
+        mock_service_get.assert_called_once_with(ANY, limit=100, after=None, order_by="_id")
         assert response.status_code == 500
         assert "Failed to retrieve ingredients" in response.json()["detail"]
 
+# Test ingredient paging service - next cursor resumes after the last item
+@pytest.mark.asyncio
+async def test_get_ingredients_service_pagination():
+    from app.services.ingredient import get_ingredients
+    mock_db = MagicMock()
+
+    with patch("app.services.ingredient.repo_get_ingredients", new_callable=AsyncMock) as mock_repo_get:
+        mock_repo_get.return_value = [dict(d) for d in mock_ingredient_list_data]
+        ingredients, next_cursor = await get_ingredients(mock_db, limit=1)
+
+        mock_repo_get.assert_awaited_once_with(mock_db, 2, None, "_id")
+        assert [i.name for i in ingredients] == ["Chicken Breast"]
+        assert next_cursor is not None
+
+        mock_repo_get.reset_mock()
+        mock_repo_get.return_value = [dict(mock_ingredient_list_data[1])]
+        ingredients, next_cursor = await get_ingredients(mock_db, limit=1, after=next_cursor)
+
+        mock_repo_get.assert_awaited_once_with(mock_db, 2, ObjectId(mock_ingredient_list_data[0]["_id"]), "_id")
+        assert [i.name for i in ingredients] == ["Brown Rice"]
+        assert next_cursor is None
+
 # Test searching ingredients - success case
 @pytest.mark.asyncio
 async def test_search_ingredients_success(override_auth):
@@ -249,7 +373,7 @@ async def test_search_ingredients_success(override_auth):
     with patch("app.api.v1.ingredient.search_ingredients", return_value=mock_search_results) as mock_service_search:
         response = client.get("/api/v1/ingredients/search?query=chicken")
 
-        mock_service_search.assert_awaited_once_with(ANY, query="chicken")
+        mock_service_search.assert_awaited_once_with(ANY, query="chicken", limit=20)
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 1
@@ -263,11 +387,58 @@ async def test_search_ingredients_empty_results(override_auth):
     with patch("app.api.v1.ingredient.search_ingredients", return_value=[]) as mock_service_search:
         response = client.get("/api/v1/ingredients/search?query=nonexistent")
 
-        mock_service_search.assert_awaited_once_with(ANY, query="nonexistent")
+        mock_service_search.assert_awaited_once_with(ANY, query="nonexistent", limit=20)
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 0
 
+# Test searching ingredients - limit is forwarded and bounded
+@pytest.mark.asyncio
+async def test_search_ingredients_limit(override_auth):
+    with patch("app.api.v1.ingredient.search_ingredients", return_value=mock_search_results) as mock_service_search:
+        response = client.get("/api/v1/ingredients/search?query=chicken&limit=5")
+        mock_service_search.assert_awaited_once_with(ANY, query="chicken", limit=5)
+        assert response.status_code == 200
+
+    response = client.get("/api/v1/ingredients/search?query=chicken&limit=1000")
+    assert response.status_code == 422
+
+# Test name normalization used for search fields
+def test_search_fields_normalization():
+    from app.repositories.ingredient import search_fields
+    fields = search_fields("  Crème   Brûlée, Vanilla crème ")
+    assert fields["name_normalized"] == "creme brulee, vanilla creme"
+    assert fields["name_tokens"] == ["creme", "brulee", "vanilla"]
+
+# Test search repository - input is escaped and tiers stop once the limit is reached
+@pytest.mark.asyncio
+async def test_search_ingredients_repository_tiers():
+    from app.repositories.ingredient import search_ingredients as repo_search
+    prefix_hit = {"_id": ObjectId(mock_ingredient_data["_id"]), "name": "Chicken (raw)"}
+    token_hit = {"_id": ObjectId(), "name": "Roast chicken"}
+
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(side_effect=[[prefix_hit], [token_hit]])
+    mock_db = MagicMock()
+    mock_db.ingredients.find.return_value = cursor
+
+    results = await repo_search(mock_db, "CHICKEN (r", limit=2)
+
+    assert [r["name"] for r in results] == ["Chicken (raw)", "Roast chicken"]
+    assert results[0]["_id"] == mock_ingredient_data["_id"]
+    # Only the prefix and token tiers ran; the substring tier was not needed
+    assert mock_db.ingredients.find.call_count == 2
+    first_filter = mock_db.ingredients.find.call_args_list[0].args[0]
+    assert first_filter == {"name_normalized": {"$regex": "^chicken\\ \\(r"}}
+    second_filter = mock_db.ingredients.find.call_args_list[1].args[0]
+    assert second_filter["$and"][0] == {"$and": [
+        {"name_tokens": {"$regex": "^chicken"}},
+        {"name_tokens": {"$regex": "^r"}},
+    ]}
+    assert second_filter["$and"][1] == {"_id": {"$nin": [ObjectId(mock_ingredient_data["_id"])]}}
+
 # Test searching ingredients - database error (via service layer)
 @pytest.mark.asyncio
 async def test_search_ingredients_database_error(override_auth):
@@ -276,7 +447,7 @@ async def test_search_ingredients_database_error(override_auth):
                side_effect=IngredientSearchError("Failed to search ingredients due to a database error")) as mock_service_search:
         response = client.get("/api/v1/ingredients/search?query=chicken")
         # Use assert_called_once_with for side_effect exceptions
-        mock_service_search.assert_called_once_with(ANY, query="chicken")
+        mock_service_search.assert_called_once_with(ANY, query="chicken", limit=20)
         assert response.status_code == 500
         assert "Failed to search ingredients" in response.json()["detail"]
 
@@ -297,4 +468,341 @@ def test_missing_authentication():
     assert response_post.status_code == 401
 
     response_search = client.get("/api/v1/ingredients/search?query=a")
-    assert response_search.status_code == 401
\ No newline at end of file
+    assert response_search.status_code == 401
+
+# Test autocomplete index - typo tolerance, prefix ranking and incremental adds
+def test_trigram_index_search():
+    from app.services.autocomplete import TrigramIndex
+    index = TrigramIndex()
+    index.build([
+        ("1", "Chicken Breast"),
+        ("2", "Roast chicken"),
+        ("3", "Chickpeas, canned"),
+        ("4", "Brown Rice"),
+    ])
+
+    assert index.ready
+    # Misspelled word still finds both chicken dishes, the one starting with it first
+    assert [s["name"] for s in index.search("chiken")][:2] == ["Chicken Breast", "Roast chicken"]
+    # A partially typed last word matches by prefix
+    assert [s["_id"] for s in index.search("chicken bre")] == ["1"]
+    assert index.search("rice")[0]["name"] == "Brown Rice"
+    assert index.search("xyzzy") == []
+
+    built_bytes = index.memory_bytes()
+    assert built_bytes == index._measure_memory()
+    index.add("5", "Chicken")
+    assert index.search("chicken", limit=1)[0]["_id"] == "5"
+    stats = index.stats()
+    assert stats["entries"] == 5
+    assert stats["memory_bytes"] > built_bytes
+
+# Test autocomplete endpoint - served from the index without touching the database
+@pytest.mark.asyncio
+async def test_autocomplete_from_index(override_auth):
+    from app.services.autocomplete import TrigramIndex
+    index = TrigramIndex()
+    index.build([(mock_ingredient_data["_id"], mock_ingredient_data["name"])])
+    with patch("app.api.v1.ingredient.autocomplete_index", index), \
+         patch("app.api.v1.ingredient.search_ingredients") as mock_service_search:
+        response = client.get("/api/v1/ingredients/autocomplete?query=chickn")
+
+        mock_service_search.assert_not_called()
+        assert response.status_code == 200
+        assert response.json()[0]["_id"] == mock_ingredient_data["_id"]
+        assert response.json()[0]["score"] > 0
+
+# Test autocomplete endpoint - falls back to the database search while the index is not built
+@pytest.mark.asyncio
+async def test_autocomplete_fallback(override_auth):
+    from app.services.autocomplete import TrigramIndex
+    with patch("app.api.v1.ingredient.autocomplete_index", TrigramIndex()), \
+         patch("app.api.v1.ingredient.search_ingredients", return_value=mock_search_results) as mock_service_search:
+        response = client.get("/api/v1/ingredients/autocomplete?query=chicken&limit=3")
+
+        mock_service_search.assert_awaited_once_with(ANY, query="chicken", limit=3)
+        assert response.status_code == 200
+        assert response.json() == [{"_id": mock_ingredient_data["_id"], "name": "Chicken Breast", "score": None}]
+
+# Test autocomplete index build - built off the loop, inserts made meanwhile are not lost
+@pytest.mark.asyncio
+async def test_build_autocomplete_index_keeps_concurrent_adds():
+    import asyncio
+    from pymongo.errors import PyMongoError
+    from app.services.autocomplete import TrigramIndex, build_autocomplete_index, index_ingredient
+    index = TrigramIndex()
+    to_thread = asyncio.to_thread
+
+    async def names(*added):
+        yield {"_id": ObjectId(mock_ingredient_data["_id"]), "name": "Chicken Breast"}
+        assert index.building
+        index_ingredient(*added)  # Inserted after the cursor passed it
+
+    async def build_in_thread(build, names):
+        index_ingredient("3", "Oat Milk")  # Inserted while the new index is built
+        return await to_thread(build, names)
+
+    mock_db = MagicMock()
+    mock_db.ingredients.find.return_value.batch_size.return_value = names("2", "Brown Rice")
+    with patch("app.services.autocomplete.autocomplete_index", index), \
+         patch("app.services.autocomplete.asyncio.to_thread", side_effect=build_in_thread) as mock_to_thread:
+        assert await build_autocomplete_index(mock_db) is index
+
+        mock_to_thread.assert_awaited_once()
+        assert index.ready and not index.building
+        assert [s["_id"] for s in index.search("rice")] == ["2"]
+        assert [s["_id"] for s in index.search("oat milk")] == ["3"]
+        assert index.search("chicken")[0]["_id"] == mock_ingredient_data["_id"]
+
+        # A rebuild keeps serving the current contents, including adds made meanwhile
+        mock_db.ingredients.find.return_value.batch_size.return_value = names("4", "Apple")
+        await build_autocomplete_index(mock_db)
+        assert [s["_id"] for s in index.search("apple")] == ["4"]
+        assert index.search("rice") == []  # Not in the new read
+
+        mock_db.ingredients.find.side_effect = PyMongoError("connection refused")
+        await build_autocomplete_index(mock_db)
+        assert index.ready and not index.building and len(index) == 3
+        failed = await build_autocomplete_index(mock_db, TrigramIndex())
+        assert not failed.ready and not failed.building
+
+# Test ingredient creation service - new ingredients are added to a built index
+@pytest.mark.asyncio
+async def test_create_ingredient_service_updates_index(catalog_version):
+    from app.services.ingredient import create_ingredient
+    from app.services.autocomplete import TrigramIndex
+    index = TrigramIndex()
+    index.build([])
+    with patch("app.services.ingredient.repo_create_ingredient", new_callable=AsyncMock) as mock_repo_create, \
+         patch("app.services.autocomplete.autocomplete_index", index):
+        mock_repo_create.return_value = ObjectId(mock_ingredient_data["_id"])
+        payload = {k: v for k, v in mock_ingredient_data.items() if k != "_id"}
+        await create_ingredient(MagicMock(), IngredientCreate(**payload))
+
+    assert index.search("chicken")[0]["_id"] == mock_ingredient_data["_id"]
+    catalog_version[1].assert_awaited_once()
+
+# Test bulk ingredient upsert - a duplicate-name race is not an error
+@pytest.mark.asyncio
+async def test_insert_missing_ingredients_tolerates_duplicate_race():
+    from pymongo.errors import BulkWriteError
+    from app.repositories.ingredient import insert_missing_ingredients
+    inserted_id = ObjectId()
+    mock_db = MagicMock()
+    mock_db.ingredients.bulk_write = AsyncMock(side_effect=BulkWriteError({
+        "writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}],
+        "upserted": [{"index": 1, "_id": inserted_id}],
+    }))
+
+    result = await insert_missing_ingredients(mock_db, [{"name": "Chicken Breast"}, {"name": "Brown Rice"}])
+
+    assert result == {"Brown Rice": inserted_id}
+
+    mock_db.ingredients.bulk_write = AsyncMock(side_effect=BulkWriteError({
+        "writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}],
+    }))
+    with pytest.raises(BulkWriteError):
+        await insert_missing_ingredients(mock_db, [{"name": "Chicken Breast"}])
+
+# Ingredient cache - local tier, Redis tier and Mongo fallback
+@pytest.mark.asyncio
+async def test_ingredient_cache_read_through_tiers():
+    import fakeredis
+    from app.services.ingredient_cache import IngredientCache
+    ingredient_id = ObjectId()
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"_id": ingredient_id, "name": "Oats", "nutrients": {"Energy": 389.0}}])
+    mock_db = MagicMock()
+    mock_db.ingredients.find = MagicMock(return_value=cursor)
+
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    cache = IngredientCache(max_size=10, ttl=60, redis_ttl=60)
+    cache.redis = redis
+    unknown_id = str(ObjectId())
+    first = await cache.get_many(mock_db, [str(ingredient_id), unknown_id, "not-an-id"])
+    assert first == {str(ingredient_id): {"_id": str(ingredient_id), "name": "Oats", "nutrients": {"Energy": 389.0}}}
+    assert await redis.ttl(f"ingredient:id:{ingredient_id}") > 0
+
+    # Served locally, then (from a fresh process) from Redis, without touching Mongo
+    assert await cache.get_many(mock_db, [str(ingredient_id)]) == first
+    other = IngredientCache(max_size=10, ttl=60, redis_ttl=60)
+    other.redis = redis
+    assert await other.get_many(mock_db, [str(ingredient_id)]) == first
+    assert mock_db.ingredients.find.call_count == 1
+    assert other.stats()["redis"]["hits"] == 1
+
+    await cache.invalidate([str(ingredient_id)])
+    assert await redis.exists(f"ingredient:id:{ingredient_id}") == 0
+
+@pytest.mark.asyncio
+async def test_ingredient_cache_falls_back_to_mongo_when_redis_fails():
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from app.services.ingredient_cache import IngredientCache
+    ingredient_id = ObjectId()
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"_id": ingredient_id, "name": "Oats"}])
+    mock_db = MagicMock()
+    mock_db.ingredients.find = MagicMock(return_value=cursor)
+
+    cache = IngredientCache(max_size=10, ttl=60, redis_ttl=60)
+    cache.redis = MagicMock()
+    cache.redis.mget = AsyncMock(side_effect=RedisConnectionError("down"))
+    cache.redis.pipeline = MagicMock(side_effect=RedisConnectionError("down"))
+
+    result = await cache.get_many(mock_db, [str(ingredient_id)])
+
+    assert result[str(ingredient_id)]["name"] == "Oats"
+    assert cache.stats()["redis"]["errors"] == 2
+    assert cache.stats()["db_loads"] == 1
+
+# Packed nutrient storage - round trip, writes and migration
+def test_packed_nutrients_round_trip():
+    from app.core.nutrients import PACKED_NUTRIENTS_FIELD, pack_document_nutrients, unpack_document_nutrients
+    nutrients = {"Energy": 165.0, "Protein": 31.02, "Selenium, Se": 0.0001, "Iron, Fe": 0.0, "Mystery": 1.5}
+    for precision, width in (("float64", 8), ("float32", 4)):
+        packed = pack_document_nutrients({"name": "Chicken Breast", "nutrients": nutrients}, precision)
+
+        assert packed["nutrients"] == {"Mystery": 1.5}
+        assert len(packed[PACKED_NUTRIENTS_FIELD]["values"]) == 4 * width
+        assert unpack_document_nutrients(packed) == {"name": "Chicken Breast", "nutrients": nutrients}
+    # Documents in the map format pass through untouched
+    assert unpack_document_nutrients({"nutrients": {"Energy": 1.0}}) == {"nutrients": {"Energy": 1.0}}
+
+@pytest.mark.asyncio
+async def test_create_ingredient_repo_writes_packed_nutrients():
+    from app.core.nutrients import PACKED_NUTRIENTS_FIELD
+    from app.repositories.ingredient import create_ingredient as repo_create_ingredient, from_storage
+    mock_db = MagicMock()
+    mock_db.ingredients.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+    payload = {k: v for k, v in mock_ingredient_data.items() if k != "_id"}
+
+    with patch("app.repositories.ingredient.settings.INGREDIENT_NUTRIENT_STORAGE", "packed"):
+        await repo_create_ingredient(mock_db, payload)
+
+    document = mock_db.ingredients.insert_one.call_args.args[0]
+    assert PACKED_NUTRIENTS_FIELD in document
+    # Names like "protein" are not registered nutrients ("Protein" is), so they stay in the map
+    assert document["nutrients"] == payload["nutrients"]
+    assert from_storage({**document, "_id": ObjectId()})["nutrients"] == payload["nutrients"]
+
+@pytest.mark.asyncio
+async def test_migrate_nutrient_storage_to_packed():
+    from app.core.nutrients import PACKED_NUTRIENTS_FIELD
+    from app.repositories.ingredient import migrate_nutrient_storage
+    documents = [
+        {"_id": ObjectId(), "nutrients": {"Energy": 52.0}},
+        {"_id": ObjectId(), "nutrients": {"Energy": 30.0, "Mystery": 1.0}},
+    ]
+    cursor = MagicMock()
+    cursor.__aiter__.return_value = documents
+    mock_db = MagicMock()
+    mock_db.ingredients.find.return_value.batch_size.return_value = cursor
+    mock_db.ingredients.bulk_write = AsyncMock(return_value=MagicMock(modified_count=2))
+
+    assert await migrate_nutrient_storage(mock_db, "packed") == 2
+
+    assert mock_db.ingredients.find.call_args.args[0][PACKED_NUTRIENTS_FIELD] == {"$exists": False}
+    first, second = mock_db.ingredients.bulk_write.call_args.args[0]
+    assert first._doc["$unset"] == {"nutrients": ""}
+    assert second._doc["$set"]["nutrients"] == {"Mystery": 1.0}
+
+# Bulk import - streaming parsers, FDC mapping and per-row error reports
+async def byte_chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+@pytest.mark.asyncio
+async def test_iter_json_records_streams_fdc_download():
+    from collections import Counter
+    from app.services.ingredient_import import fdc_food_to_ingredient, iter_json_records
+    foods = [
+        {"description": "Hummus, commercial", "foodCategory": {"description": "Legumes"}, "foodNutrients": [
+            {"nutrient": {"name": "Energy", "unitName": "kJ"}, "amount": 1000.0},
+            {"nutrient": {"name": "Energy", "unitName": "kcal"}, "amount": 229.0},
+            {"nutrient": {"name": "Vitamin C, total ascorbic acid", "unitName": "mg"}, "amount": 0.5},
+            {"nutrient": {"name": "Selenium, Se", "unitName": "mg"}, "amount": 0.0024},
+            {"nutrient": {"name": "Nitrogen", "unitName": "g"}, "amount": 1.2},
+        ]},
+        {"description": "Tomatoes [raw]", "foodNutrients": []},
+    ]
+    data = json.dumps({"FoundationFoods": foods}, ensure_ascii=False).encode()
+
+    # One-byte chunks split every token and multi-byte character
+    records = [record async for record in iter_json_records(byte_chunks(data, 1))]
+    assert records == foods
+
+    unmapped = Counter()
+    ingredient = fdc_food_to_ingredient(records[0], unmapped)
+    assert ingredient["name"] == "Hummus, commercial"
+    assert ingredient["description"] == "Legumes"
+    assert ingredient["reference_quantity"] == 100.0
+    assert ingredient["nutrients"] == {"Energy": 229.0, "Vitamin C, total ascorbic acid": 0.5, "Selenium, Se": pytest.approx(2.4)}
+    assert unmapped == {"Energy": 1, "Nitrogen": 1}
+
+    # Odd elements are skipped; an amount that is not a number fails only this record
+    odd = {"description": "Odd", "foodNutrients": [
+        "Protein", None, {"nutrient": "Protein", "amount": 1}, {"nutrient": {"name": ["Protein"], "unitName": "g"}, "amount": 1},
+        {"nutrient": {"name": "Protein", "unitName": "g"}, "amount": 3.5},
+    ]}
+    assert fdc_food_to_ingredient(odd, Counter())["nutrients"] == {"Protein": 3.5}
+    for amount in ([1], {"value": 1}, "n/a"):
+        with pytest.raises(ValueError):
+            fdc_food_to_ingredient({"description": "Bad", "foodNutrients": [{"nutrient": {"name": "Protein", "unitName": "g"}, "amount": amount}]}, Counter())
+    with pytest.raises(ValueError):
+        fdc_food_to_ingredient({"description": "Bad", "foodNutrients": {"Protein": 1}}, Counter())
+
+@pytest.mark.asyncio
+async def test_iter_json_records_reports_truncated_file():
+    from app.exceptions.ingredient import IngredientImportError
+    from app.services.ingredient_import import iter_json_records
+    with pytest.raises(IngredientImportError):
+        [record async for record in iter_json_records(byte_chunks(b'[{"description": "Oats"}, {"descr', 8))]
+
+@pytest.mark.asyncio
+async def test_import_ingredients_csv_reports_row_errors():
+    from pymongo.errors import BulkWriteError
+    from app.services.ingredient_import import import_ingredients
+    data = (
+        'name,description,Protein (g),"Sodium, Na (g)",Mystery\n'
+        'Oats,"Rolled, dry",13.2,0.002,1\n'
+        ',No name,1,,\n'
+        'Rice,"Long\ngrain",x,,\n'
+        'Oats,Duplicate,10,,\n'
+        'Lentils,,25.8,,\n'
+    ).encode()
+    mock_db = MagicMock()
+    mock_db.ingredients.bulk_write = AsyncMock(side_effect=[
+        BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"}]}),
+        MagicMock(bulk_api_result={"writeErrors": []}),
+    ])
+
+    with patch("app.services.ingredient_import.index_ingredient"):
+        report = await import_ingredients(mock_db, byte_chunks(data, 7), "csv", chunk_size=2)
+
+    assert report["rows"] == 5
+    assert report["inserted"] == 2
+    assert report["failed"] == 3
+    assert [(error["row"], error["name"]) for error in report["errors"]] == [(2, None), (3, None), (4, "Oats")]
+    assert "already exists" in report["errors"][2]["error"]
+    assert report["unmapped_nutrients"] == {"Mystery": 1}
+    first_chunk = mock_db.ingredients.bulk_write.call_args_list[0].args[0]
+    assert first_chunk[0]._doc["nutrients"] == {"Protein": 13.2, "Sodium, Na": pytest.approx(2.0)}
+    assert first_chunk[0]._doc["description"] == "Rolled, dry"
+    assert mock_db.ingredients.bulk_write.call_args.kwargs == {"ordered": False}
+
+@pytest.mark.asyncio
+async def test_bulk_import_endpoint(override_auth):
+    from app.exceptions.ingredient import IngredientImportError
+    summary = {"rows": 1, "inserted": 1, "updated": 0, "failed": 0, "elapsed_seconds": 0.1, "rows_per_second": 10.0,
+               "errors": [], "unmapped_nutrients": {}}
+    with patch("app.api.v1.ingredient.import_ingredients", new_callable=AsyncMock) as mock_import:
+        mock_import.return_value = summary
+        response = client.post("/api/v1/ingredients/bulk?format=csv&chunk_size=500", content=b"name\nOats\n")
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 1
+        assert mock_import.call_args.args[2] == "csv"
+        assert mock_import.call_args.kwargs == {"on_conflict": "skip", "chunk_size": 500}
+
+        mock_import.side_effect = IngredientImportError("No JSON array found")
+        response = client.post("/api/v1/ingredients/bulk?format=json", content=b"{}")
+        assert response.status_code == 400
@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import sys
+import threading
+from loguru import logger
+from app.core.logger import BackgroundWriter, SamplingFilter, configure_logging, parse_sample_rates
+
+
+def make_record(name, level="INFO"):
+    return {"name": name, "level": logger.level(level)}
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("app.services.ingredient=0.1, app.repositories=0") == {
+        "app.services.ingredient": 0.1,
+        "app.repositories": 0.0,
+    }
+
+
+def test_sampling_filter_by_module_prefix():
+    sampler = SamplingFilter({"app.repositories": 0.0, "app.repositories.user": 1.0, "app.services": 0.5})
+
+    assert not sampler(make_record("app.repositories.ingredient"))
+    assert not sampler(make_record("app.repositories.ingredient", "DEBUG"))
+    # Warnings and errors are never sampled away
+    assert sampler(make_record("app.repositories.ingredient", "WARNING"))
+    assert sampler(make_record("app.repositories.ingredient", "ERROR"))
+    # The longest prefix wins; unlisted modules and look-alike names are kept in full
+    assert sampler(make_record("app.repositories.user"))
+    assert sampler(make_record("app.repositories_extra"))
+    assert sampler(make_record("app.main"))
+
+    kept = sum(sampler(make_record("app.services.meal")) for _ in range(2000))
+    assert 800 < kept < 1200
+
+
+def test_lazy_messages_and_json_output():
+    records = []
+    logger.remove()
+    logger.add(records.append, level="INFO", serialize=True, filter=SamplingFilter({__name__: 0.0}, max_level="DEBUG"))
+    try:
+        class Expensive:
+            def __str__(self):
+                raise AssertionError("formatted although DEBUG is disabled")
+
+        logger.debug("Not formatted: {}", Expensive())
+        logger.info("Found {} ingredients matching '{}'", 3, "rice {with braces}")
+    finally:
+        configure_logging()
+
+    assert len(records) == 1
+    record = json.loads(records[0])["record"]
+    assert record["message"] == "Found 3 ingredients matching 'rice {with braces}'"
+    assert record["level"]["name"] == "INFO"
+
+
+def test_background_writer_rotates_and_flushes(tmp_path):
+    path = str(tmp_path / "app.log")
+    writer = BackgroundWriter(path=path, rotation_bytes=64)
+    for i in range(10):
+        writer.write(f"record {i:02d} {'x' * 60}\n")
+        writer._queue.join()  # One batch, and so one rotation, per record
+    writer.stop()
+
+    files = sorted(os.listdir(tmp_path))
+    assert "app.log" in files and len(files) == 11
+    lines = []
+    for name in files:
+        with open(tmp_path / name) as f:
+            lines += f.read().splitlines()
+    assert sorted(line[:9] for line in lines) == [f"record {i:02d}" for i in range(10)]
+
+
+def test_background_writer_follows_current_stdout(monkeypatch):
+    writer = BackgroundWriter()
+    captured = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", captured)
+    try:
+        writer.write("hello\n")
+        writer._queue.join()
+    finally:
+        writer.stop()
+    assert captured.getvalue() == "hello\n"
+
+
+def test_background_writer_counts_dropped_records():
+    entered, release = threading.Event(), threading.Event()
+
+    class StalledStream(io.StringIO):
+        def write(self, text):
+            entered.set()
+            release.wait(5)
+            return super().write(text)
+
+    stream = StalledStream()
+    writer = BackgroundWriter(stream=stream, max_queue=1)
+    try:
+        writer.write("first\n")
+        assert entered.wait(5)  # The writer thread is stuck on the first record
+        for i in range(4):
+            writer.write(f"queued {i}\n")
+        assert writer.dropped == 3
+        release.set()
+        writer._queue.join()
+    finally:
+        release.set()
+        writer.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == "first"
+    assert lines[1].endswith("Log queue full: dropped 3 records")
+    assert lines[2:] == ["queued 0"]
@@ -10,6 +10,7 @@ from app.models.ingredient import Ingredient
 from app.exceptions.meal import MealNotFoundError, MealCreationError, MealValidationError
 from app.dependencies.auth import get_current_user
 from app.dependencies.database import get_db
+from app.repositories.ingredient import SEARCH_FIELDS_PROJECTION
 
 # Mock data
 mock_ingredient_id = str(ObjectId())
@@ -114,6 +115,26 @@ mock_detailed_meal = {
     "updated_at": datetime.utcnow()
 }
 
+@pytest.fixture(autouse=True)
+def empty_ingredient_cache():
+    from app.services.ingredient_cache import ingredient_cache
+    ingredient_cache.local.clear()
+    yield
+    ingredient_cache.local.clear()
+
+@pytest.fixture(autouse=True)
+def catalog_version():
+    # Endpoints and ingredient writes read or bump the catalog version document
+    with patch("app.services.ingredient.repo_get_catalog_version", new_callable=AsyncMock, return_value=None) as get_version, \
+         patch("app.services.ingredient.repo_bump_catalog_version", new_callable=AsyncMock) as bump_version:
+        yield get_version, bump_version
+
+@pytest.fixture
+def meal_version():
+    with patch("app.api.v1.meal.get_meal_version", new_callable=AsyncMock,
+               return_value=(f"{mock_meal_id}:2025-01-01T08:00:00:0", datetime(2025, 1, 1, 8, 0))) as mock_version:
+        yield mock_version
+
 # Setup test client with mocked dependencies
 @pytest.fixture
 def client():
@@ -239,7 +260,7 @@ def test_get_meals_paginated_success(mock_get_meals, client):
     assert response.json()["page_size"] == 10
     assert len(response.json()["meals"]) == 1
     assert response.json()["meals"][0]["name"] == "Breakfast"
-    mock_get_meals.assert_called_once_with(ANY, mock_user_id, 1, 10)
+    mock_get_meals.assert_called_once_with(ANY, mock_user_id, 1, 10, total="counter")
 
 @patch("app.api.v1.meal.get_paginated_meals_by_user")
 def test_get_meals_database_error(mock_get_meals, client):
@@ -255,7 +276,7 @@ def test_get_meals_database_error(mock_get_meals, client):
 
 # Tests for GET /meals/{meal_id}/detailed
 @patch("app.api.v1.meal.get_detailed_meal")
-def test_get_detailed_meal_success(mock_get_detailed, client):
+def test_get_detailed_meal_success(mock_get_detailed, client, meal_version):
     # Setup mock
     mock_get_detailed.return_value = mock_detailed_meal
     
@@ -272,7 +293,7 @@ def test_get_detailed_meal_success(mock_get_detailed, client):
     mock_get_detailed.assert_called_once()
 
 @patch("app.api.v1.meal.get_detailed_meal")
-def test_get_detailed_meal_not_found(mock_get_detailed, client):
+def test_get_detailed_meal_not_found(mock_get_detailed, client, meal_version):
     # Setup mock
     mock_get_detailed.side_effect = MealNotFoundError("Meal not found")
     
@@ -284,7 +305,7 @@ def test_get_detailed_meal_not_found(mock_get_detailed, client):
     assert "Meal not found" in response.json()["detail"]
 
 @patch("app.api.v1.meal.get_detailed_meal")
-def test_get_detailed_meal_database_error(mock_get_detailed, client):
+def test_get_detailed_meal_database_error(mock_get_detailed, client, meal_version):
     # Setup mock
     mock_get_detailed.side_effect = MealCreationError("Database error")
     
@@ -295,16 +316,88 @@ def test_get_detailed_meal_database_error(mock_get_detailed, client):
     assert response.status_code == 500
     assert "Database error" in response.json()["detail"]
 
+@patch("app.api.v1.meal.get_detailed_meal")
+def test_get_detailed_meal_not_modified(mock_get_detailed, client, meal_version):
+    mock_get_detailed.return_value = mock_detailed_meal
+
+    response = client.get(f"/api/v1/meals/{mock_meal_id}/detailed")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["last-modified"] == "Wed, 01 Jan 2025 08:00:00 GMT"
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = client.get(f"/api/v1/meals/{mock_meal_id}/detailed", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    mock_get_detailed.assert_called_once()
+
+    # The nutrient totals of the same meal are a different representation
+    with patch("app.api.v1.meal.get_meal_nutrients", new_callable=AsyncMock, return_value={"totals": {}}):
+        response = client.get(f"/api/v1/meals/{mock_meal_id}/nutrients", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+@pytest.mark.asyncio
+async def test_get_meal_version_service(catalog_version):
+    from app.services.meal import get_meal_version
+    meal_id = ObjectId(mock_meal_id)
+    get_version, _ = catalog_version
+    get_version.return_value = {"_id": "ingredients", "version": 7, "updated_at": datetime(2025, 1, 3)}
+
+    with patch("app.services.meal.get_meals_by_ids", new_callable=AsyncMock) as mock_get_meals:
+        mock_get_meals.return_value = [{"_id": mock_meal_id, "timestamp": datetime(2025, 1, 1), "updated_at": datetime(2025, 1, 2)}]
+        key, last_modified = await get_meal_version(MagicMock(), meal_id, mock_user_id)
+
+        mock_get_meals.assert_awaited_once_with(ANY, [meal_id], mock_user_id, {"timestamp": 1, "updated_at": 1})
+        assert key == f"{mock_meal_id}:2025-01-02T00:00:00:7"
+        assert last_modified == datetime(2025, 1, 3)
+
+        mock_get_meals.return_value = []
+        with pytest.raises(MealNotFoundError):
+            await get_meal_version(MagicMock(), meal_id, mock_user_id)
+
+# Test meal version - an import by another worker (a new catalog version) drops memoized annotations
+@pytest.mark.asyncio
+async def test_get_meal_version_drops_stale_nutrient_annotations(catalog_version):
+    from app.services.meal import annotate_nutrients, get_meal_version, sync_nutrient_annotations
+    get_version, _ = catalog_version
+    stored = [{"_id": mock_meal_id, "timestamp": datetime(2025, 1, 1)}]
+    ingredient_id = str(ObjectId())
+
+    with patch("app.services.meal.get_meals_by_ids", new_callable=AsyncMock, return_value=stored):
+        try:
+            get_version.return_value = {"_id": "ingredients", "version": 3}
+            await get_meal_version(MagicMock(), ObjectId(mock_meal_id), mock_user_id)
+            assert annotate_nutrients(ingredient_id, {"Energy": 52.0})["Energy"]["value"] == 52.0
+
+            await get_meal_version(MagicMock(), ObjectId(mock_meal_id), mock_user_id)
+            assert annotate_nutrients(ingredient_id, {"Energy": 60.0})["Energy"]["value"] == 52.0  # Same version: memoized
+
+            get_version.return_value = {"_id": "ingredients", "version": 4}
+            await get_meal_version(MagicMock(), ObjectId(mock_meal_id), mock_user_id)
+            assert annotate_nutrients(ingredient_id, {"Energy": 60.0})["Energy"]["value"] == 60.0
+        finally:
+            sync_nutrient_annotations(0)
+
 # Service layer tests
+def mock_find_results(*results):
+    """Makes db.ingredients.find return cursors whose to_list yields each result in turn."""
+    cursors = []
+    for result in results:
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(return_value=result)
+        cursors.append(cursor)
+    return MagicMock(side_effect=cursors)
+
 @pytest.mark.asyncio
 async def test_create_meal_entry_service():
     # Mock database
     mock_db = MagicMock()
-    mock_db.ingredients.find_one = AsyncMock(return_value=mock_ingredient)
-    mock_db.ingredients.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId(mock_ingredient_id)))
+    mock_db.ingredients.find = mock_find_results([{"_id": ObjectId(mock_ingredient_id)}])
     
     # Mock repository function
-    with patch("app.services.meal.create_meal", new_callable=AsyncMock) as mock_create:
+    with patch("app.services.meal.create_meal", new_callable=AsyncMock) as mock_create, \
+         patch("app.services.meal.record_meal_rollup", new_callable=AsyncMock) as mock_rollup, \
+         patch("app.services.meal.increment_meal_count", new_callable=AsyncMock) as mock_increment:
         mock_create.return_value = mock_meal_id
         
         # Create meal object
@@ -317,7 +410,72 @@ async def test_create_meal_entry_service():
         # Assertions
         assert result.id == mock_meal_id
         assert result.name == "Breakfast"
+        assert result.ingredients[0].ingredient_id == mock_ingredient_id
         mock_create.assert_called_once()
+        mock_rollup.assert_called_once()
+        assert mock_rollup.call_args.args[1]["user_id"] == mock_user_id
+        mock_increment.assert_called_once_with(mock_db, mock_user_id)
+        mock_db.ingredients.find.assert_called_once_with({"_id": {"$in": [ObjectId(mock_ingredient_id)]}}, SEARCH_FIELDS_PROJECTION)
+
+        # The ingredient is now cached, so a second meal needs no ingredient query
+        await create_meal_entry(mock_db, meal, mock_user_id)
+        assert mock_db.ingredients.find.call_count == 1
+
+@pytest.mark.asyncio
+async def test_create_meal_entry_service_batches_ingredient_resolution():
+    existing_id = ObjectId()
+    banana_id = ObjectId()
+    meal_input = {
+        **mock_meal_with_new_ingredient_input,
+        "ingredients": [
+            {"ingredient": str(existing_id), "quantity": 10.0},
+            {"ingredient": {**mock_meal_with_new_ingredient_input["ingredients"][0]["ingredient"], "name": "Banana"}, "quantity": 20.0},
+            {"ingredient": {**mock_meal_with_new_ingredient_input["ingredients"][0]["ingredient"], "name": "Apple"}, "quantity": 30.0},
+            {"ingredient": str(existing_id), "quantity": 40.0},
+        ],
+    }
+    mock_db = MagicMock()
+    # One $in lookup by ID, one lookup by name (Apple already exists)
+    mock_db.ingredients.find = mock_find_results(
+        [{"_id": existing_id}],
+        [{"_id": ObjectId(mock_ingredient_id), "name": "Apple"}],
+    )
+    mock_db.ingredients.bulk_write = AsyncMock(return_value=MagicMock(upserted_ids={0: banana_id}))
+
+    with patch("app.services.meal.create_meal", new_callable=AsyncMock) as mock_create, \
+         patch("app.services.meal.record_meal_rollup", new_callable=AsyncMock), \
+         patch("app.services.meal.increment_meal_count", new_callable=AsyncMock):
+        mock_create.return_value = mock_meal_id
+        from app.services.meal import create_meal_entry
+        result = await create_meal_entry(mock_db, Meal(**meal_input), mock_user_id)
+
+    assert [(i.ingredient_id, i.quantity) for i in result.ingredients] == [
+        (str(existing_id), 10.0),
+        (str(banana_id), 20.0),
+        (mock_ingredient_id, 30.0),
+        (str(existing_id), 40.0),
+    ]
+    assert mock_db.ingredients.find.call_count == 2
+    # Only the missing ingredient is upserted, keyed on its name
+    operations = mock_db.ingredients.bulk_write.call_args.args[0]
+    assert len(operations) == 1
+    assert operations[0]._filter == {"name": "Banana"}
+    assert operations[0]._doc["$setOnInsert"]["name_normalized"] == "banana"
+    assert "id" not in operations[0]._doc["$setOnInsert"]
+    assert mock_db.ingredients.bulk_write.call_args.kwargs == {"ordered": False}
+
+@pytest.mark.asyncio
+async def test_create_meal_entry_service_unknown_ingredient():
+    mock_db = MagicMock()
+    mock_db.ingredients.find = mock_find_results([])
+
+    with patch("app.services.meal.create_meal", new_callable=AsyncMock) as mock_create:
+        from app.services.meal import create_meal_entry
+        with pytest.raises(MealValidationError):
+            await create_meal_entry(mock_db, Meal(**mock_meal_input), mock_user_id)
+        with pytest.raises(MealValidationError):
+            await create_meal_entry(mock_db, Meal(**{**mock_meal_input, "ingredients": [{"ingredient": "not-an-id", "quantity": 1.0}]}), mock_user_id)
+        mock_create.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_get_last_meal_entry_service():
@@ -348,7 +506,7 @@ async def test_get_paginated_meals_service():
         
         # Call service
         from app.services.meal import get_paginated_meals_by_user
-        meals, total = await get_paginated_meals_by_user(mock_db, mock_user_id, 1, 10)
+        meals, total = await get_paginated_meals_by_user(mock_db, mock_user_id, 1, 10, total="exact")
         
         # Assertions
         assert len(meals) == 1
@@ -357,20 +515,439 @@ async def test_get_paginated_meals_service():
         mock_get_paginated.assert_called_once_with(mock_db, mock_user_id, 1, 10)
 
 @pytest.mark.asyncio
+async def test_get_paginated_meals_service_counter_total():
+    mock_db = MagicMock()
+    mock_db.meal_counters.find_one = AsyncMock(return_value={"_id": mock_user_id, "count": 42})
+    mock_db.meals.count_documents = AsyncMock()
+
+    with patch("app.services.meal.get_meals_by_user_page", new_callable=AsyncMock) as mock_page:
+        mock_page.return_value = [mock_meal_data] * 10
+        from app.services.meal import get_paginated_meals_by_user
+        meals, total = await get_paginated_meals_by_user(mock_db, mock_user_id, 1, 10)
+        assert total == 42
+        mock_db.meals.count_documents.assert_not_called()
+
+        meals, total = await get_paginated_meals_by_user(mock_db, mock_user_id, 1, 10, total="none")
+        assert total is None and len(meals) == 10
+        mock_db.meal_counters.find_one.assert_called_once()
+
+# Test meal pagination - a drifted counter is clamped to what the page shows
+@pytest.mark.asyncio
+async def test_get_paginated_meals_service_clamps_counter_total():
+    from app.services.meal import get_paginated_meals_by_user
+    mock_db = MagicMock()
+    mock_db.meal_counters.find_one = AsyncMock(return_value={"_id": mock_user_id, "count": 12})
+
+    with patch("app.services.meal.get_meals_by_user_page", new_callable=AsyncMock) as mock_page:
+        # Overcounted: the short second page shows there are 11 meals
+        mock_page.return_value = [mock_meal_data]
+        assert (await get_paginated_meals_by_user(mock_db, mock_user_id, 2, 10))[1] == 11
+        # Overcounted past a full last page: the empty page caps the total
+        mock_page.return_value = []
+        assert (await get_paginated_meals_by_user(mock_db, mock_user_id, 3, 5))[1] == 10
+        assert (await get_paginated_meals_by_user(mock_db, mock_user_id, 1, 10))[1] == 0
+        # Undercounted: a full page shows at least that many meals
+        mock_page.return_value = [mock_meal_data] * 10
+        assert (await get_paginated_meals_by_user(mock_db, mock_user_id, 2, 10))[1] == 20
+
+@pytest.mark.asyncio
+async def test_get_meal_count_seeds_missing_counter():
+    mock_db = MagicMock()
+    mock_db.meal_counters.find_one = AsyncMock(return_value=None)
+    # A meal is created between the first count and the seed
+    mock_db.meals.count_documents = AsyncMock(side_effect=[7, 8])
+    mock_db.meal_counters.find_one_and_update = AsyncMock(side_effect=[
+        {"_id": mock_user_id, "count": 7},
+        {"_id": mock_user_id, "count": 8},
+    ])
+
+    from app.services.meal import get_meal_count_by_user
+    assert await get_meal_count_by_user(mock_db, mock_user_id) == 8
+    updates = [call.args for call in mock_db.meal_counters.find_one_and_update.call_args_list]
+    assert updates == [({"_id": mock_user_id}, {"$max": {"count": 7}}), ({"_id": mock_user_id}, {"$max": {"count": 8}})]
+
+@patch("app.api.v1.meal.get_paginated_meals_by_user")
+def test_get_meals_without_total(mock_get_meals, client):
+    mock_get_meals.return_value = ([MealListItem(**mock_meal_data)], None)
+
+    response = client.get("/api/v1/meals/?page_size=1&with_total=false")
+
+    assert response.status_code == 200
+    assert response.json()["total"] is None
+    assert response.json()["next_cursor"] is not None
+    mock_get_meals.assert_called_once_with(ANY, mock_user_id, 1, 1, total="none")
+
+def mock_aggregate_result(result):
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=result)
+    return MagicMock(return_value=cursor)
+
+@pytest.mark.asyncio
+@patch("app.services.meal.settings.INGREDIENT_CACHE_ENABLED", False)
 async def test_get_detailed_meal_service():
-    # Mock database
+    # Mock database: the aggregation returns the meal with its joined ingredients
     mock_db = MagicMock()
-    mock_db.meals.find_one = AsyncMock(return_value=mock_meal_data)
-    mock_db.ingredients.find_one = AsyncMock(return_value=mock_ingredient)
+    mock_db.meals.aggregate = mock_aggregate_result([{
+        **mock_meal_data,
+        "_id": ObjectId(mock_meal_id),
+        "_ingredient_docs": [{**mock_ingredient, "_id": ObjectId(mock_ingredient_id)}],
+    }])
     
     # Call service
     from app.services.meal import get_detailed_meal
-    result = await get_detailed_meal(mock_db, mock_meal_id, mock_user_id)
+    result = await get_detailed_meal(mock_db, ObjectId(mock_meal_id), mock_user_id)
     
     # Assertions
     assert result["_id"] == mock_meal_id
     assert result["name"] == "Breakfast"
     assert len(result["ingredients"]) == 1
-    assert "nutrients" in result["ingredients"][0]
-    
-    mock_db.meals.find_one.assert_called_once_with({"_id": mock_meal_id, "user_id": mock_user_id})
\ No newline at end of file
+    assert "_ingredient_docs" not in result
+    assert result["ingredients"][0]["name"] == "Apple"
+    assert result["ingredients"][0]["nutrients"]["protein"] == {"value": 0.3, "unit": "unknown"}
+    
+    mock_db.meals.aggregate.assert_called_once()
+    pipeline = mock_db.meals.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$match": {"_id": ObjectId(mock_meal_id), "user_id": mock_user_id}}
+    assert any("$lookup" in stage for stage in pipeline)
+
+@pytest.mark.asyncio
+@patch("app.services.meal.settings.INGREDIENT_CACHE_ENABLED", False)
+async def test_get_detailed_meal_service_many_ingredients_one_round_trip():
+    ingredient_docs = [
+        {"_id": ObjectId(), "name": f"Ingredient {i}", "nutrients": {"Protein": float(i), "Mystery": 1.0}}
+        for i in range(60)
+    ]
+    meal_doc = {
+        **mock_meal_data,
+        "_id": ObjectId(mock_meal_id),
+        # Every ingredient twice, plus one that no longer exists
+        "ingredients": [{"ingredient_id": str(doc["_id"]), "quantity": 1.0} for doc in ingredient_docs * 2]
+                       + [{"ingredient_id": str(ObjectId()), "quantity": 1.0}],
+        "_ingredient_docs": ingredient_docs,
+    }
+    mock_db = MagicMock()
+    mock_db.meals.aggregate = mock_aggregate_result([meal_doc])
+    mock_db.ingredients.find_one = AsyncMock()
+
+    from app.services.meal import get_detailed_meal
+    result = await get_detailed_meal(mock_db, ObjectId(mock_meal_id), mock_user_id)
+
+    assert len(result["ingredients"]) == 120
+    assert result["ingredients"][5]["name"] == "Ingredient 5"
+    assert result["ingredients"][5]["nutrients"]["Protein"] == {"value": 5.0, "unit": "g"}
+    assert result["ingredients"][5]["nutrients"]["Mystery"]["unit"] == "unknown"
+    mock_db.meals.aggregate.assert_called_once()
+    mock_db.ingredients.find_one.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("app.services.meal.settings.INGREDIENT_CACHE_ENABLED", False)
+async def test_get_detailed_meal_service_not_found():
+    mock_db = MagicMock()
+    mock_db.meals.aggregate = mock_aggregate_result([])
+
+    from app.services.meal import get_detailed_meal
+    with pytest.raises(MealNotFoundError):
+        await get_detailed_meal(mock_db, ObjectId(mock_meal_id), mock_user_id)
+
+@pytest.mark.asyncio
+async def test_get_detailed_meal_service_uses_ingredient_cache():
+    mock_db = MagicMock()
+    mock_db.meals.find = mock_find_results(*([{**mock_meal_data, "_id": ObjectId(mock_meal_id)}] for _ in range(2)))
+    mock_db.ingredients.find = mock_find_results([{**mock_ingredient, "_id": ObjectId(mock_ingredient_id)}])
+
+    from app.services.meal import get_detailed_meal
+    first = await get_detailed_meal(mock_db, ObjectId(mock_meal_id), mock_user_id)
+    second = await get_detailed_meal(mock_db, ObjectId(mock_meal_id), mock_user_id)
+
+    assert first == second
+    assert first["ingredients"][0]["name"] == "Apple"
+    assert mock_db.meals.find.call_args.args[0] == {"_id": {"$in": [ObjectId(mock_meal_id)]}, "user_id": mock_user_id}
+    mock_db.ingredients.find.assert_called_once()
+
+def test_get_detailed_meal_invalid_id(client):
+    response = client.get("/api/v1/meals/not-an-object-id/detailed")
+    assert response.status_code == 404
+
+def test_compute_meal_totals_scales_by_reference_quantity():
+    from app.services.nutrition import build_ingredient_matrix, compute_meal_totals
+    from app.core.nutrients import NUTRIENT_SLOTS
+    ingredients = [
+        {"_id": "a", "reference_quantity": 100.0, "nutrients": {"Energy": 50.0, "Protein": 2.0}},
+        {"_id": "b", "reference_quantity": 50.0, "nutrients": {"Energy": 100.0, "Mystery": 9.0}},
+    ]
+    meals = [
+        {"ingredients": [{"ingredient_id": "a", "quantity": 200.0}, {"ingredient_id": "b", "quantity": 25.0}]},
+        {"ingredients": []},
+        {"ingredients": [{"ingredient_id": "gone", "quantity": 10.0}, {"ingredient_id": "a", "quantity": 50.0}]},
+    ]
+    unknown = set()
+    columns, values, masks = build_ingredient_matrix(ingredients, unknown)
+    totals, meal_masks, missing = compute_meal_totals(meals, columns, values, masks)
+
+    energy, protein = NUTRIENT_SLOTS["Energy"], NUTRIENT_SLOTS["Protein"]
+    assert totals[0, energy] == pytest.approx(150.0)
+    assert totals[0, protein] == pytest.approx(4.0)
+    assert meal_masks[0] == (1 << energy) | (1 << protein)
+    assert meal_masks[1] == 0 and not totals[1].any()
+    assert totals[2, energy] == pytest.approx(25.0)
+    assert missing == [[], [], ["gone"]]
+    assert unknown == {"Mystery"}
+
+@pytest.mark.asyncio
+async def test_get_meals_nutrients_service_two_round_trips():
+    ingredient_oid = ObjectId(mock_ingredient_id)
+    other_meal_id = ObjectId()
+    mock_db = MagicMock()
+    mock_db.meals.find = mock_find_results([
+        {"_id": ObjectId(mock_meal_id), "ingredients": [{"ingredient_id": mock_ingredient_id, "quantity": 150.0}]},
+    ])
+    mock_db.ingredients.find = mock_find_results([
+        {"_id": ingredient_oid, "reference_quantity": 100.0, "nutrients": {"Energy": 52.0, "calories": 52.0}},
+    ])
+
+    from app.services.nutrition import get_meals_nutrients
+    result = await get_meals_nutrients(mock_db, [ObjectId(mock_meal_id), other_meal_id], mock_user_id)
+
+    assert result["meals"][0]["meal_id"] == mock_meal_id
+    assert result["meals"][0]["nutrients"] == {"Energy": {"value": pytest.approx(78.0), "unit": "kcal"}}
+    assert result["totals"]["Energy"]["value"] == pytest.approx(78.0)
+    assert result["missing_meals"] == [str(other_meal_id)]
+    assert result["unmapped_nutrients"] == ["calories"]
+    assert mock_db.meals.find.call_args.args[0]["user_id"] == mock_user_id
+    assert mock_db.ingredients.find.call_args.args[0] == {"_id": {"$in": [ingredient_oid]}}
+
+@pytest.mark.asyncio
+async def test_get_meal_nutrients_service_not_found():
+    mock_db = MagicMock()
+    mock_db.meals.find = mock_find_results([])
+
+    from app.services.nutrition import get_meal_nutrients
+    with pytest.raises(MealNotFoundError):
+        await get_meal_nutrients(mock_db, ObjectId(mock_meal_id), mock_user_id)
+
+def test_get_meals_nutrients_batch_endpoint(client):
+    other_meal_id = str(ObjectId())
+    with patch("app.api.v1.meal.get_meals_nutrients", new_callable=AsyncMock) as mock_totals:
+        mock_totals.return_value = {"meals": [], "totals": {}, "missing_meals": [], "unmapped_nutrients": []}
+        response = client.get(f"/api/v1/meals/nutrients?meal_id={mock_meal_id}&meal_id={other_meal_id}")
+        assert response.status_code == 200
+        mock_totals.assert_called_once_with(ANY, [ObjectId(mock_meal_id), ObjectId(other_meal_id)], mock_user_id)
+
+    response = client.get("/api/v1/meals/nutrients?meal_id=nope")
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_record_meal_rollup_increments_day():
+    mock_db = MagicMock()
+    mock_db.ingredients.find = mock_find_results([
+        {"_id": ObjectId(mock_ingredient_id), "reference_quantity": 100.0, "nutrients": {"Energy": 52.0, "Protein": 0.0}},
+    ])
+    mock_db.daily_rollups.update_one = AsyncMock()
+    meal = {
+        "user_id": mock_user_id,
+        "timestamp": datetime(2025, 3, 1, 23, 30),
+        "ingredients": [{"ingredient_id": mock_ingredient_id, "quantity": 200.0}],
+    }
+
+    from app.services.rollup import record_meal_rollup
+    await record_meal_rollup(mock_db, meal)
+
+    key, update = mock_db.daily_rollups.update_one.call_args.args
+    assert key == {"user_id": mock_user_id, "date": "2025-03-01"}
+    assert update == {"$inc": {"nutrients.Energy": pytest.approx(104.0), "nutrients.Protein": 0.0, "meal_count": 1}}
+    assert mock_db.daily_rollups.update_one.call_args.kwargs == {"upsert": True}
+
+@pytest.mark.asyncio
+async def test_create_meal_entry_survives_rollup_failure():
+    from pymongo.errors import PyMongoError
+    mock_db = MagicMock()
+    mock_db.ingredients.find = mock_find_results([{"_id": ObjectId(mock_ingredient_id)}])
+
+    with patch("app.services.meal.create_meal", new_callable=AsyncMock) as mock_create, \
+         patch("app.services.meal.record_meal_rollup", new_callable=AsyncMock) as mock_rollup, \
+         patch("app.services.meal.increment_meal_count", new_callable=AsyncMock) as mock_increment:
+        mock_create.return_value = mock_meal_id
+        mock_rollup.side_effect = PyMongoError("write conflict")
+        from app.services.meal import create_meal_entry
+        result = await create_meal_entry(mock_db, Meal(**mock_meal_input), mock_user_id)
+
+    assert result.id == mock_meal_id
+    mock_increment.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_get_nutrient_summary_groups_weeks():
+    from datetime import date
+    mock_db = MagicMock()
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[
+        {"date": "2025-03-03", "meal_count": 2, "nutrients": {"Energy": 500.0}},
+        {"date": "2025-03-09", "meal_count": 1, "nutrients": {"Energy": 250.0, "Protein": 10.0}},
+        {"date": "2025-03-10", "meal_count": 3, "nutrients": {"Energy": 900.0}},
+    ])
+    mock_db.daily_rollups.find = MagicMock(return_value=cursor)
+
+    from app.services.rollup import get_nutrient_summary
+    summary = await get_nutrient_summary(mock_db, mock_user_id, date(2025, 3, 1), date(2025, 3, 31), "week")
+
+    assert [(p["start"], p["meal_count"]) for p in summary["periods"]] == [("2025-03-03", 3), ("2025-03-10", 3)]
+    assert summary["periods"][0]["nutrients"]["Energy"] == {"value": 750.0, "unit": "kcal"}
+    assert summary["totals"]["Protein"] == {"value": 10.0, "unit": "g"}
+    assert summary["meal_count"] == 6
+    query = mock_db.daily_rollups.find.call_args.args[0]
+    assert query == {"user_id": mock_user_id, "date": {"$gte": "2025-03-01", "$lte": "2025-03-31"}}
+
+def test_get_meal_summary_endpoint(client):
+    with patch("app.api.v1.meal.get_nutrient_summary", new_callable=AsyncMock) as mock_summary:
+        mock_summary.return_value = {"periods": [], "totals": {}, "meal_count": 0}
+        response = client.get("/api/v1/meals/summary?from=2025-03-01&to=2025-03-07&period=week")
+        assert response.status_code == 200
+        from datetime import date
+        mock_summary.assert_called_once_with(ANY, mock_user_id, date(2025, 3, 1), date(2025, 3, 7), "week")
+
+    assert client.get("/api/v1/meals/summary?from=2025-03-07&to=2025-03-01").status_code == 422
+    assert client.get("/api/v1/meals/summary?from=2020-01-01&to=2025-01-01").status_code == 422
+
+@pytest.mark.asyncio
+async def test_get_meals_after_by_user_keyset_query():
+    timestamps = [datetime(2025, 3, 1, 12 - i) for i in range(3)]
+    docs = [{**mock_meal_data, "_id": ObjectId(), "timestamp": ts} for ts in timestamps]
+    mock_db = MagicMock()
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(side_effect=lambda length: [dict(doc) for doc in docs[:length]])
+    mock_db.meals.find = MagicMock(return_value=cursor)
+
+    from app.services.meal import get_meals_after_by_user
+    meals, next_cursor = await get_meals_after_by_user(mock_db, mock_user_id, limit=2)
+    assert [meal.id for meal in meals] == [str(doc["_id"]) for doc in docs[:2]]
+    assert next_cursor is not None
+    assert mock_db.meals.find.call_args.args[0] == {"user_id": mock_user_id}
+    cursor.sort.assert_called_with([("timestamp", -1), ("_id", -1)])
+    cursor.limit.assert_called_with(3)
+
+    await get_meals_after_by_user(mock_db, mock_user_id, limit=2, after=next_cursor)
+    assert mock_db.meals.find.call_args.args[0] == {
+        "user_id": mock_user_id,
+        "$or": [
+            {"timestamp": {"$lt": timestamps[1]}},
+            {"timestamp": timestamps[1], "_id": {"$lt": docs[1]["_id"]}},
+        ],
+    }
+
+@patch("app.api.v1.meal.get_meals_after_by_user")
+def test_get_meals_by_cursor(mock_get_meals, client):
+    mock_get_meals.return_value = ([MealListItem(**mock_meal_data)], "next-token")
+
+    response = client.get("/api/v1/meals/?after=some-token&page_size=5")
+
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "next-token"
+    assert response.json()["total"] is None
+    mock_get_meals.assert_called_once_with(ANY, mock_user_id, 5, "some-token")
+
+def test_get_meals_invalid_cursor(client):
+    response = client.get("/api/v1/meals/?after=not-a-cursor")
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_create_meal_entries_resolves_batch_once():
+    from pymongo.errors import BulkWriteError
+    banana_id = ObjectId()
+    unknown_id = str(ObjectId())
+    meals = [
+        Meal(**mock_meal_input),
+        Meal(**{**mock_meal_input, "ingredients": [{"ingredient": unknown_id, "quantity": 1.0}]}),
+        Meal(**mock_meal_with_new_ingredient_input),
+        Meal(**mock_meal_input),
+    ]
+    mock_db = MagicMock()
+    # One $in lookup by ID for the whole batch, one lookup by name
+    mock_db.ingredients.find = mock_find_results([{"_id": ObjectId(mock_ingredient_id)}], [])
+    mock_db.ingredients.bulk_write = AsyncMock(return_value=MagicMock(upserted_ids={0: banana_id}))
+    mock_db.meals.insert_many = AsyncMock(side_effect=BulkWriteError({
+        "writeErrors": [{"index": 2, "code": 121, "errmsg": "Document failed validation"}],
+    }))
+
+    with patch("app.services.meal.record_meal_rollups", new_callable=AsyncMock) as mock_rollups, \
+         patch("app.services.meal.increment_meal_count", new_callable=AsyncMock) as mock_increment:
+        from app.services.meal import create_meal_entries
+        results = await create_meal_entries(mock_db, meals, mock_user_id)
+
+    assert [result["status"] for result in results] == ["created", "error", "created", "error"]
+    assert unknown_id in results[1]["error"]
+    assert results[2]["meal"].ingredients[0].ingredient_id == str(banana_id)
+    assert results[0]["meal"].user_id == mock_user_id
+    assert mock_db.ingredients.find.call_count == 2
+    # Only the three resolvable meals are inserted, in one unordered call
+    inserted = mock_db.meals.insert_many.call_args.args[0]
+    assert len(inserted) == 3
+    assert mock_db.meals.insert_many.call_args.kwargs == {"ordered": False}
+    assert results[0]["meal"].id == str(inserted[0]["_id"])
+    assert len(mock_rollups.call_args.args[1]) == 2
+    mock_increment.assert_called_once_with(mock_db, mock_user_id, 2)
+
+# Test batch meal creation - a stored meal failing validation on the way out is not a 500
+@pytest.mark.asyncio
+async def test_create_meal_entries_reports_stored_meal_failing_validation():
+    from app.models.meal import MealListItem
+    from app.services.meal import create_meal_entries
+    mock_db = MagicMock()
+    mock_db.ingredients.find = mock_find_results([{"_id": ObjectId(mock_ingredient_id)}])
+    mock_db.meals.insert_many = AsyncMock()
+
+    def list_item(**meal):
+        if meal["name"] == "Broken":
+            return MealListItem()  # Raises ValidationError
+        return MealListItem(**meal)
+
+    with patch("app.services.meal.record_meal_rollups", new_callable=AsyncMock) as mock_rollups, \
+         patch("app.services.meal.increment_meal_count", new_callable=AsyncMock) as mock_increment, \
+         patch("app.services.meal.MealListItem", side_effect=list_item):
+        results = await create_meal_entries(mock_db, [Meal(**{**mock_meal_input, "name": "Broken"}), Meal(**mock_meal_input)], mock_user_id)
+
+    assert [result["status"] for result in results] == ["created", "created"]
+    assert "meal" not in results[0] and results[0]["error"].startswith("Meal stored but could not be returned")
+    assert results[1]["meal"].name == "Breakfast"
+    assert len(mock_rollups.call_args.args[1]) == 2
+    mock_increment.assert_called_once_with(mock_db, mock_user_id, 2)
+
+def test_create_meals_batch_endpoint(client):
+    with patch("app.api.v1.meal.create_meal_entries", new_callable=AsyncMock) as mock_create:
+        mock_create.return_value = [
+            {"index": 0, "status": "created", "meal": MealListItem(**mock_meal_data)},
+            {"index": 1, "status": "error", "error": "Ingredient with ID x not found"},
+        ]
+        response = client.post("/api/v1/meals/batch", json=[mock_meal_input, mock_meal_input])
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["created"], body["failed"]) == (1, 1)
+        assert body["results"][0]["meal"]["_id"] == mock_meal_id
+        assert len(mock_create.call_args.args[1]) == 2
+
+    assert client.post("/api/v1/meals/batch", json=[]).status_code == 422
+
+@pytest.mark.asyncio
+async def test_record_meal_rollups_groups_by_day():
+    mock_db = MagicMock()
+    mock_db.ingredients.find = mock_find_results([
+        {"_id": ObjectId(mock_ingredient_id), "reference_quantity": 100.0, "nutrients": {"Energy": 50.0}},
+    ])
+    mock_db.daily_rollups.bulk_write = AsyncMock()
+    item = [{"ingredient_id": mock_ingredient_id, "quantity": 100.0}]
+    meals = [
+        {"user_id": mock_user_id, "timestamp": datetime(2025, 3, 1, 8), "ingredients": item},
+        {"user_id": mock_user_id, "timestamp": datetime(2025, 3, 1, 20), "ingredients": item},
+        {"user_id": mock_user_id, "timestamp": datetime(2025, 3, 2, 8), "ingredients": item},
+    ]
+
+    from app.services.rollup import record_meal_rollups
+    await record_meal_rollups(mock_db, meals)
+
+    operations = mock_db.daily_rollups.bulk_write.call_args.args[0]
+    assert [(op._filter["date"], op._doc["$inc"]["meal_count"], op._doc["$inc"]["nutrients.Energy"]) for op in operations] == [
+        ("2025-03-01", 2, pytest.approx(100.0)),
+        ("2025-03-02", 1, pytest.approx(50.0)),
+    ]
+    mock_db.ingredients.find.assert_called_once()
@@ -0,0 +1,94 @@
+import datetime
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pymongo import monitoring
+from app.core.metrics import Histogram, MetricsMiddleware, MetricsRegistry, MongoCommandListener, MongoPoolListener
+from app.main import app as main_app
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def metrics_client(registry):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/meals/{meal_id}")
+    async def get_meal(meal_id: str):
+        if meal_id == "missing":
+            raise HTTPException(status_code=404, detail="Meal not found")
+        return {"id": meal_id}
+
+    return TestClient(app)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.01, 0.1))
+    for value in (0.005, 0.01, 0.05, 2.0):
+        histogram.observe(value)
+
+    assert histogram.samples("latency", 'route="/x"') == [
+        'latency_bucket{route="/x",le="0.01"} 2',
+        'latency_bucket{route="/x",le="0.1"} 3',
+        'latency_bucket{route="/x",le="+Inf"} 4',
+        'latency_sum{route="/x"} 2.065',
+        'latency_count{route="/x"} 4',
+    ]
+
+
+def test_middleware_labels_requests_by_route_template(metrics_client, registry):
+    metrics_client.get("/meals/a")
+    metrics_client.get("/meals/b")
+    metrics_client.get("/meals/missing")
+    metrics_client.get("/nowhere")
+
+    assert registry.requests == {
+        ("GET", "/meals/{meal_id}", 200): 2,
+        ("GET", "/meals/{meal_id}", 404): 1,
+        ("GET", "unmatched", 404): 1,
+    }
+    assert registry.request_latency[("GET", "/meals/{meal_id}")].count == 3
+    assert registry.in_flight == {"GET": 0}
+
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/meals/{meal_id}",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/meals/{meal_id}"} 3' in text
+
+
+def test_mongo_listeners_record_commands_and_checkouts(registry):
+    commands = MongoCommandListener(registry)
+    address = ("localhost", 27017)
+    commands.started(monitoring.CommandStartedEvent({"find": "ingredients", "filter": {}}, "diet", 1, address, None))
+    commands.succeeded(monitoring.CommandSucceededEvent(datetime.timedelta(milliseconds=3), {"ok": 1}, "find", 1, address, None))
+    commands.started(monitoring.CommandStartedEvent({"getMore": 42, "collection": "meals"}, "diet", 2, address, None))
+    commands.failed(monitoring.CommandFailedEvent(datetime.timedelta(milliseconds=1), {"ok": 0}, "getMore", 2, address, None))
+
+    pool = MongoPoolListener(registry)
+    pool.connection_created(monitoring.ConnectionCreatedEvent(address, 1))
+    pool.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1, 0.002))
+    pool.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+
+    assert registry.commands[("ingredients", "find")].sum == pytest.approx(0.003)
+    assert registry.command_failures == {("meals", "getMore"): 1}
+    assert registry.checkout_wait.count == 1
+    assert (registry.connections_open, registry.connections_checked_out) == (1, 0)
+    assert commands._collections == {}
+
+    text = registry.render()
+    assert 'mongodb_command_duration_seconds_count{collection="ingredients",command="find"} 1' in text
+    assert "mongodb_pool_checkout_wait_seconds_count 1" in text
+
+
+def test_metrics_endpoint_exports_component_stats():
+    response = TestClient(main_app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "app_password_hash_pool_workers " in response.text
+    assert "app_token_cache_hits " in response.text
+    assert "app_ingredient_cache_local_hits " in response.text
+    assert "app_autocomplete_index_entries " in response.text
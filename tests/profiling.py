@@ -0,0 +1,73 @@
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import admin
+from app.core.config import settings
+from app.core.profiling import PROFILE_ID_HEADER, ProfilingMiddleware, list_profiles
+
+
+@pytest.fixture
+def profiling_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), token="s3cret", max_files=2)
+    app.include_router(admin.router, prefix="/api/v1")
+
+    @app.get("/meals/{meal_id}")
+    async def get_meal(meal_id: str):
+        return {"total": sum(range(1000))}
+
+    return tmp_path, TestClient(app)
+
+
+def test_only_requests_with_the_token_are_profiled(profiling_client):
+    directory, client = profiling_client
+
+    assert PROFILE_ID_HEADER not in client.get("/meals/1").headers
+    assert PROFILE_ID_HEADER not in client.get("/meals/1", headers={"X-Profile": "wrong"}).headers
+    assert os.listdir(directory) == []
+
+    response = client.get("/meals/1", headers={"X-Profile": "s3cret"})
+    assert response.status_code == 200
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert sorted(os.listdir(directory)) == [f"{profile_id}.json", f"{profile_id}.prof"]
+    [profile] = list_profiles(str(directory))
+    assert (profile["method"], profile["route"], profile["status"]) == ("GET", "/meals/{meal_id}", 200)
+
+
+def test_old_profiles_are_pruned(profiling_client):
+    directory, client = profiling_client
+
+    ids = [client.get(f"/meals/{i}", headers={"X-Profile": "s3cret"}).headers[PROFILE_ID_HEADER] for i in range(3)]
+
+    assert [profile["id"] for profile in list_profiles(str(directory))] == sorted(ids, reverse=True)[:2]
+
+
+def test_admin_profile_summary(profiling_client):
+    _, client = profiling_client
+    profile_id = client.get("/meals/1", headers={"X-Profile": "s3cret"}).headers[PROFILE_ID_HEADER]
+
+    assert client.get("/api/v1/admin/profiles").status_code == 403
+
+    response = client.get(f"/api/v1/admin/profiles/{profile_id}?sort=tottime&limit=5", headers={"X-Profile": "s3cret"})
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["route"] == "/meals/{meal_id}"
+    assert len(summary["functions"]) == 5
+    assert summary["functions"][0]["tottime_ms"] >= summary["functions"][-1]["tottime_ms"]
+    assert any("get_meal" in entry["function"] for entry in client.get(
+        f"/api/v1/admin/profiles/{profile_id}?limit=500", headers={"X-Profile": "s3cret"}
+    ).json()["functions"])
+    # Admin requests carry the token, so by now they have pruned the profile above
+    assert client.get(f"/api/v1/admin/profiles/{profile_id}", headers={"X-Profile": "s3cret"}).status_code == 404
+    assert client.get("/api/v1/admin/profiles/missing", headers={"X-Profile": "s3cret"}).status_code == 404
+
+
+def test_admin_profile_summary_of_partially_pruned_profile(profiling_client):
+    directory, client = profiling_client
+    profile_id = client.get("/meals/1", headers={"X-Profile": "s3cret"}).headers[PROFILE_ID_HEADER]
+    os.remove(directory / f"{profile_id}.json")
+
+    assert client.get(f"/api/v1/admin/profiles/{profile_id}", headers={"X-Profile": "s3cret"}).status_code == 404
@@ -0,0 +1,74 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.compression import negotiate_encoding
+from app.core.static import StaticAssets, fingerprinted_name
+
+
+@pytest.fixture
+def static_client(tmp_path):
+    (tmp_path / "index.html").write_text("<html>" + "<p>Meal tracker</p>" * 200 + "</html>")
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log(1);")
+    assets = StaticAssets(str(tmp_path), max_age=600, minimum_size=1024)
+    app = FastAPI()
+    app.mount("/static", assets, name="static")
+    return assets, TestClient(app)
+
+
+def test_fingerprinted_name():
+    assert fingerprinted_name("js/app.min.js", "abc123") == "js/app.min.abc123.js"
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0, *;q=0") is None
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("br, gzip", codings=("identity", "gzip")) == "gzip"
+    assert negotiate_encoding("br, gzip", codings=("identity",)) is None
+
+
+def test_static_assets_precompressed(static_client):
+    assets, client = static_client
+    original = assets.assets["index.html"].bodies["identity"]
+
+    response = client.get("/static/index.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/html")
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert response.content == original
+    assert int(response.headers["content-length"]) == len(gzip.compress(original, compresslevel=9, mtime=0))
+
+    # Without a br variant (brotli missing or no gain), a client accepting both still gets gzip
+    assets.assets["index.html"].bodies.pop("br", None)
+    with patch("app.core.compression.brotli", object()):  # br preferred, whether installed or not
+        response = client.get("/static/index.html", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+    identity = client.get("/static/index.html", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] != response.headers["etag"]
+
+    # Small files are served as they are
+    small = client.get("/static/js/app.js", headers={"Accept-Encoding": "gzip"})
+    assert small.text == "console.log(1);"
+    assert "content-encoding" not in small.headers
+
+
+def test_static_assets_fingerprinted_and_revalidated(static_client):
+    assets, client = static_client
+    url = assets.url_for("js/app.js")
+    assert url != "js/app.js"
+
+    response = client.get(f"/static/{url}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=600, immutable"
+
+    response = client.get("/static/js/app.js", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert client.get("/static/missing.js").status_code == 404
+    assert client.post("/static/js/app.js").status_code == 405
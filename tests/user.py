@@ -235,4 +235,216 @@ async def test_get_user_by_username_not_found_repository():
     
     # Assert
     assert result is None
-    mock_db.users.find_one.assert_called_once_with({"username": "nonexistent"})
\ No newline at end of file
+    mock_db.users.find_one.assert_called_once_with({"username": "nonexistent"})
+# Test password hashing pool
+@pytest.mark.asyncio
+async def test_password_hash_pool_runs_off_loop_and_rejects_when_full():
+    import asyncio
+    import threading
+    from app.core.security import PasswordHashPool
+    from app.exceptions.user import PasswordHashingBusyError
+
+    pool = PasswordHashPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    loop_thread = threading.get_ident()
+    try:
+        blocker = asyncio.ensure_future(pool.run(lambda: (release.wait(5), threading.get_ident())[1]))
+        await asyncio.sleep(0.05)  # let the worker pick it up
+        waiting = asyncio.ensure_future(pool.run(lambda: "done"))
+        await asyncio.sleep(0)
+        assert pool.stats()["running"] == 1 and pool.stats()["queued"] == 1
+        with pytest.raises(PasswordHashingBusyError):
+            await pool.run(lambda: "rejected")
+
+        release.set()
+        assert await blocker != loop_thread
+        assert await waiting == "done"
+        stats = pool.stats()
+        assert stats["completed"] == 2 and stats["rejected"] == 1 and stats["max_queued"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_releases_slot_of_cancelled_job():
+    import asyncio
+    import threading
+    from app.core.security import PasswordHashPool
+
+    pool = PasswordHashPool(max_workers=1, max_queue=2)
+    release = threading.Event()
+    ran = []
+    try:
+        blocker = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)  # let the worker pick it up
+        waiting = asyncio.ensure_future(pool.run(lambda: ran.append("cancelled job")))
+        await asyncio.sleep(0)
+        assert pool.stats()["queued"] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert pool.stats()["queued"] == 0
+
+        release.set()
+        await blocker
+        assert await pool.run(lambda: "done") == "done"
+        stats = pool.stats()
+        assert stats["queued"] == 0 and stats["running"] == 0
+        assert ran == []
+    finally:
+        release.set()
+        pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password_round_trip():
+    from passlib.context import CryptContext
+    from app.core import security
+
+    with patch.object(security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)):
+        hashed = await security.hash_password("secret")
+        assert hashed.startswith("$2b$04$")
+        assert await security.verify_password("secret", hashed)
+        assert not await security.verify_password("wrong", hashed)
+        assert not security.password_needs_rehash(hashed)
+
+    with patch.object(security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=5)):
+        assert security.password_needs_rehash(hashed)
+
+@pytest.mark.asyncio
+@patch('app.services.user.update_user_password')
+@patch('app.services.user.hash_password')
+@patch('app.services.user.password_needs_rehash', return_value=True)
+@patch('app.services.user.verify_password', return_value=True)
+@patch('app.services.user.get_user_by_username')
+async def test_login_user_service_rehashes_on_cost_change(mock_get_user, mock_verify, mock_needs_rehash, mock_hash, mock_update):
+    from app.services.user import login_user
+
+    mock_get_user.return_value = mock_user_in_db
+    mock_hash.return_value = "$2b$13$rehashed"
+    mock_db = AsyncMock()
+
+    await login_user(mock_db, mock_user_data["username"], mock_user_data["password"])
+
+    mock_hash.assert_awaited_once_with(mock_user_data["password"])
+    mock_update.assert_awaited_once_with(mock_db, mock_user_in_db["_id"], "$2b$13$rehashed")
+
+@pytest.mark.asyncio
+@patch('app.services.user.update_user_password')
+@patch('app.services.user.password_needs_rehash', return_value=True)
+@patch('app.services.user.verify_password', return_value=True)
+@patch('app.services.user.get_user_by_username')
+async def test_login_user_service_skips_rehash_when_pool_is_full(mock_get_user, mock_verify, mock_needs_rehash, mock_update):
+    from app.core import security
+    from app.core.security import PasswordHashPool
+    from app.services.user import login_user
+
+    mock_get_user.return_value = mock_user_in_db
+    saturated = PasswordHashPool(max_workers=1, max_queue=1)
+    saturated.queued = 1  # as if another job were already waiting
+
+    with patch.object(security, "password_hash_pool", saturated):
+        token = await login_user(AsyncMock(), mock_user_data["username"], mock_user_data["password"])
+
+    assert security.decode_token(token)["sub"] == mock_user_id
+    assert saturated.stats()["rejected"] == 1
+    mock_update.assert_not_awaited()
+
+@patch('app.api.v1.user.login_user')
+def test_login_returns_503_when_hashing_busy(mock_login_user):
+    from app.exceptions.user import PasswordHashingBusyError
+    mock_login_user.side_effect = PasswordHashingBusyError("busy")
+
+    response = client.post("/api/v1/users/login", json={
+        "username": mock_user_data["username"],
+        "password": mock_user_data["password"]
+    })
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+# Test verified-token cache
+def test_verify_token_caches_until_exp():
+    import time
+    from app.core import security
+    from app.core.config import settings
+
+    cache = security.VerifiedTokenCache(max_size=2)
+    with patch.object(security, "token_cache", cache), \
+         patch.object(security, "decode_token", wraps=security.decode_token) as mock_decode:
+        token = security.create_access_token({"sub": mock_user_id})
+        assert security.verify_token(token)["sub"] == mock_user_id
+        assert security.verify_token(token)["sub"] == mock_user_id
+        assert mock_decode.call_count == 1
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+        # Entries die with the token's exp claim
+        cache._entries[token] = (cache._entries[token][0], time.time() - 1)
+        security.verify_token(token)
+        assert mock_decode.call_count == 2
+
+        with patch.object(settings, "TOKEN_CACHE_ENABLED", False):
+            security.verify_token(token)
+        assert mock_decode.call_count == 3
+
+def test_verified_token_cache_is_bounded_lru():
+    import time
+    from app.core.security import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.put("a", {"exp": exp})
+    cache.put("b", {"exp": exp})
+    cache.get("a")
+    cache.put("c", {"exp": exp})
+    cache.put("no-exp", {"sub": "x"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get("no-exp") is None
+
+def test_verified_token_cache_is_thread_safe():
+    import sys
+    import threading
+    import time
+    from app.core.security import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(max_size=8)
+    errors = []
+
+    def hammer(worker):
+        try:
+            for i in range(20_000):
+                token = f"t{(i * 7 + worker) % 16}"
+                # Every fourth entry is already expired, so lookups also evict
+                cache.put(token, {"exp": time.time() + (60 if i % 4 else -1)})
+                cache.get(token)
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=hammer, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 4 * 20_000
+    assert stats["size"] <= 8
+
+def test_tokens_round_trip_across_backends():
+    from app.core import security
+    from app.core.config import settings
+
+    for issuer in ("jose", "pyjwt"):
+        with patch.object(settings, "JWT_BACKEND", issuer):
+            token = security.create_access_token({"sub": mock_user_id})
+        for verifier in ("jose", "pyjwt"):
+            with patch.object(settings, "JWT_BACKEND", verifier):
+                assert security.decode_token(token)["sub"] == mock_user_id